@@ -0,0 +1,157 @@
+"""Sales Analytics
+
+This file contains the maintenance of the daily sales rollups. A report of a
+period reads one row per product or category and per day, whatever the
+number of orders. The checkout enqueues a record_order_sales job and the
+worker adds the units and the revenue of the order to the rows of the day
+of its products and of their categories, so the checkouts of the same
+products do not wait for each other on the rows of the day, and the
+rollups are late by the lag of the job queue. The missing rows of the day
+are inserted first with the conflicts ignored, then all the rows of a table
+are incremented with one UPDATE, so two concurrent jobs never lose an
+increment. The sales_recorded flag of the order is set in the same
+transaction, so a job run again after a failure does not count an order
+twice. rebuild_rollups computes all the rows
+again from the order items. The sales of a category are the sales of the
+order items ordered in it, a product moved to another category leaves its
+past sales in its old category, in the live and in the rebuilt rollups.
+"""
+
+# pylint: disable=no-member
+
+import itertools
+from django.db import transaction
+from django.db.models import Case, F, Sum, When
+from .models import CategoryDailySales, Order, OrderItem, ProductDailySales
+
+
+def _increment(model, key, date, totals):
+    """Add the units and revenue of totals, a dict of (units, revenue) by
+    the id of key, to the rows of the day of the model.
+    """
+
+    model.objects.bulk_create(
+        [model(date=date, **{key: row_id}) for row_id in totals],
+        ignore_conflicts=True,
+    )
+    units = []
+    revenue = []
+    for row_id, (quantity, price) in totals.items():
+        units.append(When(**{key: row_id}, then=F("units") + quantity))
+        revenue.append(When(**{key: row_id}, then=F("revenue") + price))
+    model.objects.filter(date=date, **{key + "__in": list(totals)}).update(
+        units=Case(*units, default=F("units")),
+        revenue=Case(*revenue, default=F("revenue")),
+    )
+
+
+def _bulk_create(model, objects, batch_size):
+    """Insert the objects batch by batch without keeping them in memory"""
+
+    objects = iter(objects)
+    while True:
+        batch = list(itertools.islice(objects, batch_size))
+        if not batch:
+            return
+        model.objects.bulk_create(batch)
+
+
+def record_sales(date, lines):
+    """Add the sales of an order to the rollups of the day
+
+    lines is a list of (product id, category id, units, revenue), the
+    category of a line is None when it was deleted. This function must be
+    called inside a transaction.
+    """
+
+    products = {}
+    categories = {}
+    for product_id, category_id, units, revenue in lines:
+        for totals, row_id in (
+            (products, product_id),
+            (categories, category_id),
+        ):
+            if row_id is not None:
+                quantity, price = totals.get(row_id, (0, 0))
+                totals[row_id] = (quantity + units, price + revenue)
+    if products:
+        _increment(ProductDailySales, "product_id", date, products)
+    if categories:
+        _increment(CategoryDailySales, "category_id", date, categories)
+
+
+@transaction.atomic
+def record_order_sales(order_id):
+    """Add the sales of an order to the rollups of its day, unless they
+    were already added, and return whether they were added.
+    """
+
+    date = (
+        Order.objects.filter(pk=order_id)
+        .values_list("date_created", flat=True)
+        .first()
+    )
+    if not Order.objects.filter(pk=order_id, sales_recorded=False).update(
+        sales_recorded=True
+    ):
+        return False
+    record_sales(
+        date,
+        OrderItem.objects.filter(order_id=order_id).values_list(
+            "product_id", "category_id", "quantity", "price"
+        ),
+    )
+    return True
+
+
+@transaction.atomic
+def rebuild_rollups(batch_size=1000):
+    """Compute all the rollups again from the order items and return the
+    number of product and category rows.
+    """
+
+    # The jobs of the orders that are not recorded yet are then skipped, a
+    # running job is waited for by the UPDATE
+    Order.objects.filter(sales_recorded=False).update(sales_recorded=True)
+    ProductDailySales.objects.all().delete()
+    CategoryDailySales.objects.all().delete()
+    items = OrderItem.objects.order_by()
+    rows = items.values("date_created", "product_id").annotate(
+        units=Sum("quantity"), revenue=Sum("price")
+    )
+    _bulk_create(
+        ProductDailySales,
+        (
+            ProductDailySales(
+                date=row["date_created"],
+                product_id=row["product_id"],
+                units=row["units"],
+                revenue=row["revenue"],
+            )
+            for row in rows.iterator()
+        ),
+        batch_size,
+    )
+    # The items of a deleted category have no category anymore
+    rows = (
+        items.filter(category__isnull=False)
+        .values("date_created", "category_id")
+        .annotate(units=Sum("quantity"), revenue=Sum("price"))
+    )
+    _bulk_create(
+        CategoryDailySales,
+        (
+            CategoryDailySales(
+                date=row["date_created"],
+                category_id=row["category_id"],
+                units=row["units"],
+                revenue=row["revenue"],
+            )
+            for row in rows.iterator()
+        ),
+        batch_size,
+    )
+    return (
+        ProductDailySales.objects.count(),
+        CategoryDailySales.objects.count(),
+    )
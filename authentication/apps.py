@@ -7,3 +7,8 @@ class AuthenticationConfig(AppConfig):
     """Authentication Configrations"""
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'authentication'
+
+    def ready(self):
+        """Connect the signal receivers and register the job handlers"""
+        # pylint: disable=import-outside-toplevel,unused-import
+        from . import signals, tasks
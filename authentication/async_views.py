@@ -0,0 +1,214 @@
+"""Async Views of the authentication Application
+
+This file contains the async versions of the read-heavy catalog and cart
+views. They are served under auth/async/ and are meant for the ASGI
+application of django_ecommerce/asgi.py: a sync view is sent to a thread of
+its own for the whole request, an async view stays on the event loop and
+only sends its database work to the threads of the executor.
+
+Django 4.0 has no async ORM yet (aget, acount and aiterator come with Django
+4.1), so the queries run in sync_to_async calls made by run_in_thread. The
+threads of the executor are reused by the next requests and so are their
+persistent connections, the connections are closed like at the end of a
+request when they are too old or broken. The independent queries of a view
+run at the same time in two threads: the page and the category facets of a
+product list.
+
+The async views reuse the DRF views for the authentication, the
+permissions, the querysets, the pagination, the serializers and the catalog
+cache, so they answer exactly like the sync views.
+"""
+
+import asyncio
+from abc import ABC, abstractmethod
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import MethodNotAllowed
+from rest_framework.response import Response
+from django.db import close_old_connections
+from .cache import catalog_cache
+from .metrics import current_metrics, measure_queries
+from .routers import replica_reads
+from .views import (
+    AllProductViewSet,
+    CartSummaryView,
+    CartView,
+    CategoryProductView,
+    ProductViewSet,
+    ReplicaReadMixin,
+)
+
+
+def run_in_thread(func, *args, **kwargs):
+    """Run func in a thread of the executor and return the awaitable of its
+    result. The queries are added to the metrics of the request.
+    """
+
+    metrics = current_metrics.get()
+
+    def run():
+        try:
+            with measure_queries(metrics):
+                return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(run, thread_sensitive=False)()
+
+
+class AsyncView(ABC):
+    """Async View
+
+    This class is used to serve the GET requests of a DRF view from an async
+    function. The DRF view is set up like its as_view would do but it is not
+    dispatched: the get coroutine of the subclass builds the response with
+    the methods of the DRF view and the errors are handled by the DRF view.
+    The subclasses must implement get. The reads are sent to the replica for
+    the views with the ReplicaReadMixin.
+    """
+
+    view_class = None
+    initkwargs = {}
+
+    @classmethod
+    def as_view(cls):
+        """Return the async function view"""
+
+        async def view(request, *args, **kwargs):
+            return await cls().dispatch(request, *args, **kwargs)
+
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        """Authenticate the request and build the response"""
+
+        # pylint: disable=not-callable
+        view = self.view_class(**self.initkwargs)
+        view.setup(request, *args, **kwargs)
+        request = view.initialize_request(request, *args, **kwargs)
+        view.request = request
+        view.headers = view.default_response_headers
+
+        try:
+            if request.method not in ("GET", "HEAD"):
+                raise MethodNotAllowed(request.method)
+            if isinstance(view, ReplicaReadMixin):
+                with replica_reads():
+                    response = await self.get(view, request, *args, **kwargs)
+            else:
+                response = await self.get(view, request, *args, **kwargs)
+        except Exception as exc:  # pylint: disable=broad-except
+            response = view.handle_exception(exc)
+        return view.finalize_response(request, response, *args, **kwargs)
+
+    @abstractmethod
+    async def get(self, view, request, *args, **kwargs):
+        """Return the response of the request"""
+
+
+class AsyncHandlerView(AsyncView):
+    """Async Handler View
+
+    This class is used for the views made of a single query. The
+    authentication and the handler of the DRF view run together in one
+    thread.
+    """
+
+    handler = "get"
+
+    async def get(self, view, request, *args, **kwargs):
+        def run():
+            view.initial(request, *args, **kwargs)
+            return getattr(view, self.handler)(request, *args, **kwargs)
+
+        return await run_in_thread(run)
+
+
+class AsyncProductListView(AsyncView):
+    """Async Product List View
+
+    This class is used to serve the pages of the product lists from the
+    catalog cache. On a miss the page and the category facets are loaded at
+    the same time in two threads and the page is cached.
+    """
+
+    view_class = AllProductViewSet
+    initkwargs = {"action": "list", "action_map": {"get": "list"}}
+
+    @staticmethod
+    def cached_page(view, request, *args, **kwargs):
+        """Authenticate the request and return the scope, its version, the
+        URL and the cached data of the page.
+        """
+
+        view.initial(request, *args, **kwargs)
+        scope = view.get_cache_scope()
+        version = catalog_cache.version(scope)
+        url = request.build_absolute_uri()
+        return scope, version, url, catalog_cache.get_page(scope, version, url)
+
+    @staticmethod
+    def page(view):
+        """Return the data of the page of the products"""
+
+        queryset = view.filter_queryset(view.get_queryset())
+        page = view.paginate_queryset(queryset)
+        serializer = view.get_serializer(page, many=True)
+        return view.get_paginated_response(serializer.data).data
+
+    async def get(self, view, request, *args, **kwargs):
+        scope, version, url, data = await run_in_thread(
+            self.cached_page, view, request, *args, **kwargs
+        )
+        if data is None:
+            data, facets = await asyncio.gather(
+                run_in_thread(self.page, view),
+                run_in_thread(view.get_category_facets),
+            )
+            data["facets"] = {"categories": facets}
+            await run_in_thread(
+                catalog_cache.set_page, scope, version, url, data
+            )
+        return Response(data)
+
+
+class AsyncCategoryProductView(AsyncProductListView):
+    """Async Category Product View
+
+    This class is used to serve the products of a category like the
+    AsyncProductListView.
+    """
+
+    view_class = CategoryProductView
+    initkwargs = {}
+
+
+class AsyncProductView(AsyncHandlerView):
+    """Async Product View
+
+    This class is used to retrieve a product from the catalog cache or the
+    database.
+    """
+
+    view_class = ProductViewSet
+    initkwargs = {"action": "retrieve", "action_map": {"get": "retrieve"}}
+    handler = "retrieve"
+
+
+class AsyncCartView(AsyncHandlerView):
+    """Async Cart View
+
+    This class is used to retrieve the cart of the user.
+    """
+
+    view_class = CartView
+    handler = "list"
+
+
+class AsyncCartSummaryView(AsyncHandlerView):
+    """Async Cart Summary View
+
+    This class is used to retrieve the summary of the cart of the user.
+    """
+
+    view_class = CartSummaryView
@@ -0,0 +1,122 @@
+"""JWT Authentication of the authentication Application
+
+This file contains the JWT authentication used by the views. The validated
+tokens are kept in an in-process LRU cache keyed by the raw token, so the
+signature of a hot token is verified only once until it expires. When the
+JWT_STATELESS_READS setting is on, the GET, HEAD and OPTIONS requests trust
+the signed claims of the token (user id, is_superuser and is_active) and get
+a TokenUser instead of loading the User from the database. The other
+requests always load the User.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (
+    AuthenticationFailed,
+    InvalidToken,
+)
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+
+class TokenCache:
+    """Token Cache
+
+    This class is a thread safe LRU cache of the validated tokens. A token
+    is dropped from the cache when it expires, so an expired token is always
+    validated again and rejected.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._tokens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, raw_token):
+        """Return the validated token or None"""
+
+        with self._lock:
+            token = self._tokens.get(raw_token)
+            if token is None:
+                return None
+            if token.get("exp", 0) <= time.time():
+                del self._tokens[raw_token]
+                return None
+            self._tokens.move_to_end(raw_token)
+            return token
+
+    def set(self, raw_token, token):
+        """Cache a validated token and drop the least recently used one"""
+
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._tokens[raw_token] = token
+            self._tokens.move_to_end(raw_token)
+            while len(self._tokens) > self.max_size:
+                self._tokens.popitem(last=False)
+
+    def clear(self):
+        """Remove all the tokens"""
+
+        with self._lock:
+            self._tokens.clear()
+
+
+token_cache = TokenCache(settings.JWT_TOKEN_CACHE_SIZE)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """Cached JWT Authentication
+
+    This class authenticates the requests like the JWTAuthentication but
+    reuses the validated tokens of the token cache. The read requests are
+    authenticated with the claims of the token when the JWT_STATELESS_READS
+    setting is on.
+    """
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        if settings.JWT_STATELESS_READS and request.method in SAFE_METHODS:
+            return self.get_token_user(validated_token), validated_token
+        return self.get_user(validated_token), validated_token
+
+    def get_validated_token(self, raw_token):
+        """Return the cached validated token or validate and cache it"""
+
+        token = token_cache.get(raw_token)
+        if token is None:
+            token = super().get_validated_token(raw_token)
+            token_cache.set(raw_token, token)
+        return token
+
+    @staticmethod
+    def get_token_user(validated_token):
+        """Return a TokenUser built from the claims of the token
+
+        The is_active claim is a snapshot taken when the token was created,
+        a deactivated user keeps the read access until the token expires.
+        """
+
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            )
+        if not validated_token.get("is_active", True):
+            raise AuthenticationFailed(
+                _("User is inactive"), code="user_inactive"
+            )
+        return TokenUser(validated_token)
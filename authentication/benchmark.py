@@ -0,0 +1,261 @@
+"""Benchmark helpers
+
+This file contains the helpers shared by the benchmark commands. The
+benchmarks never touch the data of the project: benchmark_database creates
+throwaway databases with the test database machinery of Django (a temporary
+file for SQLite so concurrent threads share it, benchmark_<pid>_<name> for
+PostgreSQL so a running test suite keeps test_<name>) and destroys them at
+the end. The seed function fills them with a
+configurable volume of users, categories, products, cart lines, orders and
+order items using bulk inserts. sqlite_profile switches the SQLite profile
+of the connections opened in its block and query_latency delays their
+queries like a database server on the network.
+"""
+
+# pylint: disable=no-member
+
+import contextlib
+import math
+import os
+import random
+import tempfile
+import time
+from django.contrib.auth.hashers import make_password
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test.utils import (
+    override_settings,
+    setup_databases,
+    teardown_databases,
+)
+from .inventory import sync_counters
+from .models import Cart, Category, Order, OrderItem, Product, User
+from .search import search_backend
+
+BENCHMARK_PASSWORD = "Password@123"
+
+
+@contextlib.contextmanager
+def benchmark_database(aliases=None):
+    """Create the benchmark databases and destroy them on exit, a replica
+    reads the benchmark database of the primary like in the tests.
+    """
+
+    aliases = list(connections) if aliases is None else aliases
+    with tempfile.TemporaryDirectory() as directory:
+        for alias in aliases:
+            settings_dict = connections[alias].settings_dict
+            if connections[alias].vendor == "sqlite":
+                settings_dict["TEST"]["NAME"] = os.path.join(
+                    directory, alias + ".sqlite3"
+                )
+            else:
+                # test_<name> is the database of a running test suite
+                settings_dict["TEST"]["NAME"] = (
+                    "benchmark_"
+                    + str(os.getpid())
+                    + "_"
+                    + settings_dict["NAME"]
+                )
+        config = setup_databases(
+            verbosity=0,
+            interactive=False,
+            aliases=set(aliases),
+            serialized_aliases=set(),
+        )
+        try:
+            yield
+        finally:
+            teardown_databases(config, verbosity=0)
+
+
+@contextlib.contextmanager
+def sqlite_profile(pragmas, options, conn_max_age, alias="default"):
+    """Open the connections of the block with the given SQLite pragmas,
+    connection options and CONN_MAX_AGE. The settings of the connection are
+    shared by all the threads, they are restored on exit.
+    """
+
+    settings_dict = connections[alias].settings_dict
+    saved = settings_dict["OPTIONS"], settings_dict["CONN_MAX_AGE"]
+    connections[alias].close()
+    settings_dict["OPTIONS"] = options
+    settings_dict["CONN_MAX_AGE"] = conn_max_age
+    try:
+        with override_settings(SQLITE_PRAGMAS=pragmas):
+            yield
+    finally:
+        connections[alias].close()
+        settings_dict["OPTIONS"], settings_dict["CONN_MAX_AGE"] = saved
+
+
+@contextlib.contextmanager
+def query_latency(milliseconds):
+    """Sleep for the given milliseconds before every query of the
+    connections opened in the block.
+    """
+
+    def delay(execute, sql, params, many, context):
+        time.sleep(milliseconds / 1000)
+        return execute(sql, params, many, context)
+
+    # pylint: disable=unused-argument
+    def add_delay(sender, connection, **kwargs):
+        if delay not in connection.execute_wrappers:
+            connection.execute_wrappers.append(delay)
+
+    if milliseconds <= 0:
+        yield
+        return
+    connection_created.connect(add_delay, weak=False)
+    try:
+        yield
+    finally:
+        connection_created.disconnect(add_delay)
+
+
+def _batches(objects, batch_size):
+    """Split an iterable of objects into lists of batch_size objects"""
+
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _bulk_create(model, objects, batch_size):
+    """Insert the objects batch by batch without keeping them in memory"""
+
+    for batch in _batches(objects, batch_size):
+        model.objects.bulk_create(batch)
+
+
+# pylint: disable=too-many-arguments,too-many-locals
+def seed(
+    users=100,
+    categories=10,
+    products=1000,
+    cart_lines=5,
+    order_items=10000,
+    items_per_order=5,
+    batch_size=5000,
+):
+    """Seed the benchmark database
+
+    Every user gets cart_lines distinct products in the cart and the order
+    items are split into orders of items_per_order items placed by random
+    users. All the users share the BENCHMARK_PASSWORD so the benchmarks can
+    ask for tokens. The ids of the users, the products and the names of the
+    categories are returned to pick the parameters of the lookups.
+    """
+
+    rand = random.Random(0)
+    password = make_password(BENCHMARK_PASSWORD)
+    _bulk_create(
+        User,
+        (
+            User(
+                username="user" + str(index),
+                email="user" + str(index) + "@example.com",
+                password=password,
+            )
+            for index in range(users)
+        ),
+        batch_size,
+    )
+    _bulk_create(
+        Category,
+        (
+            Category(
+                name="category" + str(index), slug="category" + str(index)
+            )
+            for index in range(categories)
+        ),
+        batch_size,
+    )
+    user_ids = list(User.objects.values_list("id", flat=True))
+    category_ids = list(Category.objects.values_list("id", flat=True))
+
+    _bulk_create(
+        Product,
+        (
+            Product(
+                name="product" + str(index),
+                price=rand.randint(1, 1000),
+                category_id=rand.choice(category_ids),
+                stock=1000000,
+                description="Description of product " + str(index),
+            )
+            for index in range(products)
+        ),
+        batch_size,
+    )
+    product_ids = list(Product.objects.values_list("id", flat=True))
+    search_backend("default").add(product_ids)
+    prices = dict(Product.objects.values_list("id", "price"))
+    product_categories = dict(Product.objects.values_list("id", "category_id"))
+
+    _bulk_create(
+        Cart,
+        (
+            Cart(
+                user_id=user_id,
+                product_id=product_id,
+                quantity=1,
+                price=prices[product_id],
+            )
+            for user_id in user_ids
+            for product_id in rand.sample(
+                product_ids, min(cart_lines, len(product_ids))
+            )
+        ),
+        batch_size,
+    )
+
+    _bulk_create(
+        Order,
+        (
+            Order(user_id=rand.choice(user_ids))
+            for _ in range(math.ceil(order_items / items_per_order))
+        ),
+        batch_size,
+    )
+    order_ids = list(Order.objects.values_list("id", flat=True))
+    item_products = (rand.choice(product_ids) for _ in range(order_items))
+    _bulk_create(
+        OrderItem,
+        (
+            OrderItem(
+                order_id=order_ids[index // items_per_order],
+                product_id=product_id,
+                category_id=product_categories[product_id],
+                quantity=1,
+                price=prices[product_id],
+            )
+            for index, product_id in enumerate(item_products)
+        ),
+        batch_size,
+    )
+    sync_counters()
+    return {
+        "users": user_ids,
+        "products": product_ids,
+        "categories": category_ids,
+    }
+
+
+def time_calls(func, arguments):
+    """Call the function with every argument and return the durations in
+    milliseconds.
+    """
+
+    durations = []
+    for argument in arguments:
+        start = time.perf_counter()
+        func(argument)
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
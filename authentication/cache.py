@@ -0,0 +1,150 @@
+"""Catalog Cache
+
+This file contains the read-through cache of the product catalog. The
+serialized products are cached by their id and the serialized pages of the
+product lists are cached by the scope of the list ("products" for all the
+products or "category:<id>" for the products of a category) and the full
+URL of the request. Every scope has a version stored in the cache which is a
+part of the keys of its pages, so all the pages of a scope are invalidated at
+once by changing its version. The cache backend is the Django cache named by
+the CATALOG_CACHE_ALIAS setting. The number of hits and misses of the current
+process are counted to see how many queries the cache saves.
+"""
+
+import hashlib
+import threading
+import uuid
+from django.conf import settings
+from django.core.cache import caches
+
+
+class CatalogCache:
+    """Catalog Cache
+
+    This class is used to get, set and invalidate the cached representation
+    of the products and of the pages of the product lists. The get methods
+    return None on a miss, the caller then builds the data from the database
+    and stores it with the matching set method.
+    """
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        """Django cache backend of the catalog"""
+        return caches[self.alias]
+
+    def _count(self, data):
+        """Count a hit or a miss and return the data"""
+
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return data
+
+    @staticmethod
+    def product_key(product_id):
+        """Cache key of a product"""
+        return "catalog:product:" + str(product_id)
+
+    def version(self, scope):
+        """Current version of the pages of a scope
+
+        A random version is stored when the scope has none so the pages
+        cached before an eviction of the version are never served again.
+        A backend that keeps no value, such as the dummy cache, gets a new
+        version every time so nothing cached under it is ever served.
+        """
+
+        key = "catalog:version:" + scope
+        version = self.cache.get(key)
+        if version is None:
+            version = uuid.uuid4().hex
+            self.cache.add(key, version, timeout=None)
+            version = self.cache.get(key) or version
+        return version
+
+    @staticmethod
+    def page_key(scope, version, url):
+        """Cache key of the page of a scope version returned for an URL"""
+
+        digest = hashlib.md5(url.encode()).hexdigest()
+        return "catalog:page:" + ":".join([scope, version, digest])
+
+    def get_product(self, product_id):
+        """Return the cached product or None"""
+        return self._count(self.cache.get(self.product_key(product_id)))
+
+    def set_product(self, product_id, data):
+        """Cache the representation of a product"""
+        self.cache.set(self.product_key(product_id), data)
+
+    def get_page(self, scope, version, url):
+        """Return the cached page of a scope version or None"""
+        return self._count(self.cache.get(self.page_key(scope, version, url)))
+
+    def set_page(self, scope, version, url, data):
+        """Cache a page of a scope under the version read before building
+        the page, so a page built before an invalidation is never served
+        under the new version.
+        """
+
+        self.cache.set(self.page_key(scope, version, url), data)
+
+    def invalidate_products(self, product_ids):
+        """Remove the products from the cache"""
+        self.cache.delete_many(
+            [self.product_key(product_id) for product_id in product_ids]
+        )
+
+    def invalidate_scopes(self, *scopes):
+        """Invalidate all the cached pages of the scopes"""
+
+        self.cache.set_many(
+            {"catalog:version:" + scope: uuid.uuid4().hex for scope in scopes},
+            timeout=None,
+        )
+
+    def invalidate_catalog(self, product_ids, category_ids):
+        """Remove the products from the cache and invalidate the pages of
+        all the products and of the categories listing them.
+        """
+
+        self.invalidate_products(product_ids)
+        self.invalidate_scopes(
+            "products",
+            *(
+                "category:" + str(category_id)
+                for category_id in category_ids
+                if category_id
+            ),
+        )
+
+    def stats(self):
+        """Return the number of hits and misses of this process"""
+
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / total if total else 0,
+        }
+
+    def clear(self):
+        """Remove everything from the cache and reset the counters"""
+
+        self.cache.clear()
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+catalog_cache = CatalogCache(settings.CATALOG_CACHE_ALIAS)
@@ -0,0 +1,307 @@
+"""Catalog Import and Export
+
+This file contains the helpers of the import_catalog and export_catalog
+commands. The catalog files are CSV files with a header or JSON Lines files
+with one product per line, both with the fields of CATALOG_FIELDS. The
+category of a product is given by its name. The rows are streamed: they are
+read, validated and written batch by batch so the memory does not grow with
+the size of the file.
+"""
+
+# pylint: disable=no-member,protected-access
+
+import csv
+import itertools
+import json
+from django.db import connection, transaction
+from .cache import catalog_cache
+from .categories import CATEGORIES_SCOPE
+from .inventory import sync_counters
+from .models import Category, Product, ProductStripe, unique_slug
+from .search import search_backend
+from .stripes import stripe_totals
+
+CATALOG_FIELDS = ["name", "price", "category", "stock", "sold", "description"]
+CATALOG_FORMATS = ("csv", "jsonl")
+UPDATED_FIELDS = ["price", "category", "stock", "sold", "description"]
+# The longest values of the text fields of a row
+MAX_LENGTHS = {
+    "name": Product._meta.get_field("name").max_length,
+    "category": Category._meta.get_field("name").max_length,
+    "description": Product._meta.get_field("description").max_length,
+}
+
+
+def read_rows(stream, file_format):
+    """Yield the rows of a catalog file as dictionaries"""
+
+    if file_format == "csv":
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def write_rows(stream, file_format, rows):
+    """Write the rows to a catalog file and return the number of rows"""
+
+    count = 0
+    if file_format == "csv":
+        writer = csv.DictWriter(stream, fieldnames=CATALOG_FIELDS)
+        writer.writeheader()
+        write = writer.writerow
+    else:
+        def write(row):
+            stream.write(json.dumps(row) + "\n")
+
+    for row in rows:
+        write(row)
+        count += 1
+    return count
+
+
+def export_rows(chunk_size):
+    """Yield the products as rows, chunk_size products are fetched at once
+
+    The stock and sold of a striped product are its columns plus the sums
+    of its stripes, the stripes of a chunk are summed with one query.
+    """
+
+    products = (
+        Product.objects.order_by("id")
+        .values_list(
+            "id",
+            "stripe_count",
+            "name",
+            "price",
+            "category__name",
+            "stock",
+            "sold",
+            "description",
+        )
+        .iterator(chunk_size=chunk_size)
+    )
+    while True:
+        chunk = list(itertools.islice(products, chunk_size))
+        if not chunk:
+            return
+        striped = [product[0] for product in chunk if product[1]]
+        totals = stripe_totals(striped) if striped else {}
+        for product_id, _, *fields in chunk:
+            row = dict(zip(CATALOG_FIELDS, fields))
+            stock, sold = totals.get(product_id, (0, 0))
+            row["stock"] += stock
+            row["sold"] += sold
+            yield row
+
+
+class CatalogImporter:
+    """Catalog Importer
+
+    This class is used to import the rows of a catalog file batch by batch.
+    The categories are resolved with a name to id map loaded once, the
+    missing categories are created with one bulk insert per batch. The
+    products are matched by their unique name: the new ones are created with
+    bulk_create and the existing ones are updated with a single prepared
+    UPDATE executed for the whole batch. Every
+    batch is imported in its own transaction with the update of the search
+    index and of the stock counters. The invalid rows are skipped and kept
+    in errors with their row number.
+    """
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.categories = dict(Category.objects.values_list("name", "id"))
+        self.created = 0
+        self.errors = []
+        self.updated_ids = []
+        self.touched_categories = set()
+        self.created_categories = False
+
+    @property
+    def updated(self):
+        """Number of updated products"""
+        return len(self.updated_ids)
+
+    @staticmethod
+    def clean(row):
+        """Return the fields of a product from a row or raise ValueError"""
+
+        name = (row.get("name") or "").strip()
+        category = (row.get("category") or "").strip()
+        if not name or not category:
+            raise ValueError("name and category are required")
+        product = {
+            "name": name,
+            "category": category,
+            "price": int(row.get("price") or 0),
+            "stock": int(row.get("stock") or 0),
+            "sold": int(row.get("sold") or 0),
+            "description": row.get("description") or "",
+        }
+        # A too long value would abort the whole import on the databases
+        # that check the length of the columns
+        for field, max_length in MAX_LENGTHS.items():
+            if len(product[field]) > max_length:
+                raise ValueError(
+                    field
+                    + " is longer than "
+                    + str(max_length)
+                    + " characters"
+                )
+        return product
+
+    def import_rows(self, rows):
+        """Import the rows batch by batch and invalidate the catalog cache,
+        even when the import stops at an invalid file.
+        """
+
+        batch = {}
+        try:
+            for number, row in enumerate(rows, start=1):
+                try:
+                    product = self.clean(row)
+                except (AttributeError, TypeError, ValueError) as error:
+                    self.errors.append((number, str(error)))
+                    continue
+                batch[product["name"]] = product
+                if len(batch) == self.batch_size:
+                    self.import_batch(list(batch.values()))
+                    batch = {}
+            if batch:
+                self.import_batch(list(batch.values()))
+        finally:
+            # The batches committed before an error are invalidated too
+            self.invalidate_cache()
+
+    @transaction.atomic
+    def import_batch(self, products):
+        """Create or update the products of a batch"""
+
+        missing = {
+            product["category"]
+            for product in products
+            if product["category"] not in self.categories
+        }
+        if missing:
+            taken = set(Category.objects.values_list("slug", flat=True))
+            categories = []
+            for name in sorted(missing):
+                slug = unique_slug(name, taken)
+                taken.add(slug)
+                categories.append(Category(name=name, slug=slug))
+            Category.objects.bulk_create(categories, ignore_conflicts=True)
+            self.created_categories = True
+            self.categories.update(
+                Category.objects.filter(name__in=missing).values_list(
+                    "name", "id"
+                )
+            )
+
+        existing = {
+            name: (product_id, category_id)
+            for name, product_id, category_id in Product.objects.filter(
+                name__in=[product["name"] for product in products]
+            ).values_list("name", "id", "category_id")
+        }
+        new_products = []
+        changed_products = []
+        for product in products:
+            product_id, previous_category_id = existing.get(
+                product["name"], (None, None)
+            )
+            self.touched_categories.add(self.categories[product["category"]])
+            if previous_category_id is not None:
+                # The product may move out of its category
+                self.touched_categories.add(previous_category_id)
+            instance = Product(
+                id=product_id,
+                name=product["name"],
+                price=product["price"],
+                category_id=self.categories[product["category"]],
+                stock=product["stock"],
+                sold=product["sold"],
+                description=product["description"],
+            )
+            if instance.id is None:
+                new_products.append(instance)
+            else:
+                changed_products.append(instance)
+
+        Product.objects.bulk_create(new_products, batch_size=self.batch_size)
+        self.update_products(changed_products)
+        if changed_products:
+            # The imported stock and sold are the whole counts, the stripes
+            # of the striped products start again from zero
+            ProductStripe.objects.filter(
+                product_id__in=[product.id for product in changed_products]
+            ).exclude(stock=0, sold=0).update(stock=0, sold=0)
+        self.index_products(new_products, changed_products)
+        sync_counters(
+            Product.objects.filter(
+                name__in=[product["name"] for product in products]
+            ).values("id")
+        )
+        self.created += len(new_products)
+        self.updated_ids += [product.id for product in changed_products]
+
+    @staticmethod
+    def update_products(products):
+        """Update the products with one prepared UPDATE executed for all of
+        them. QuerySet.bulk_update builds a CASE WHEN expression with a
+        branch per product and per field, building and compiling it costs
+        more than the update itself for big batches.
+        """
+
+        if not products:
+            return
+        columns = [Product._meta.get_field(name) for name in UPDATED_FIELDS]
+        quote = connection.ops.quote_name
+        sql = (
+            "UPDATE "
+            + quote(Product._meta.db_table)
+            + " SET "
+            + ", ".join(quote(field.column) + " = %s" for field in columns)
+            + " WHERE "
+            + quote(Product._meta.pk.column)
+            + " = %s"
+        )
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                sql,
+                [
+                    [getattr(product, field.attname) for field in columns]
+                    + [product.pk]
+                    for product in products
+                ],
+            )
+
+    @staticmethod
+    def index_products(new_products, changed_products):
+        """Copy the products in the search index, the bulk queries send no
+        signal.
+        """
+
+        backend = search_backend(connection.alias)
+        ids = [product.id for product in new_products]
+        if None in ids:
+            # The database does not return the ids of the inserted rows
+            ids = Product.objects.filter(
+                name__in=[product.name for product in new_products]
+            ).values_list("id", flat=True)
+        backend.add(ids)
+        backend.index([product.id for product in changed_products])
+
+    def invalidate_cache(self):
+        """Invalidate the catalog cache, the bulk queries send no signal"""
+
+        scopes = ["products"]
+        scopes += [
+            "category:" + str(category_id)
+            for category_id in self.touched_categories
+        ]
+        if self.created_categories:
+            scopes.append(CATEGORIES_SCOPE)
+        catalog_cache.invalidate_products(self.updated_ids)
+        catalog_cache.invalidate_scopes(*scopes)
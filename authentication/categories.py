@@ -0,0 +1,63 @@
+"""Category Map
+
+This file contains the in-memory map of the categories. The products of a
+category are requested by the slug of the category, or by its name or its id
+for the older links, and the map resolves it to the id of the category
+without a query so the products are filtered by the indexed category_id
+column alone. The map is loaded with one query and loaded again when the
+version of the "categories" scope of the catalog cache changes, the signals
+change it whenever a category is saved or deleted so every process sees the
+change.
+"""
+
+# pylint: disable=no-member
+
+import threading
+from .cache import catalog_cache
+from .models import Category
+
+CATEGORIES_SCOPE = "categories"
+
+
+class CategoryMap:
+    """Category Map
+
+    This class is used to find the id of a category by its slug, its name or
+    its id. A slug wins over a name and a name wins over an id when the same
+    string is used by two categories.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.ids = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def load():
+        """Return the ids of all the categories by slug, name and id"""
+
+        categories = list(Category.objects.values_list("id", "name", "slug"))
+        ids = {str(pk): pk for pk, _, _ in categories}
+        ids.update((name, pk) for pk, name, _ in categories)
+        ids.update((slug, pk) for pk, _, slug in categories)
+        return ids
+
+    def get(self, key):
+        """Return the id of the category or None if there is no category"""
+
+        version = catalog_cache.version(CATEGORIES_SCOPE)
+        with self._lock:
+            if version != self.version:
+                self.ids = self.load()
+                self.version = version
+            return self.ids.get(key)
+
+    def clear(self):
+        """Forget the categories, they are loaded again on the next get"""
+
+        with self._lock:
+            self.version = None
+            self.ids = {}
+
+
+category_map = CategoryMap()
@@ -0,0 +1,106 @@
+"""Filters for the authentication Application
+
+This file contains the filter backends of the product lists. The
+ProductFilterBackend filters the products by a price range, by their stock
+and by their categories with the query parameters min_price, max_price,
+in_stock and category. The ProductOrderingFilter orders them by price, sold
+or name with the ordering query parameter, the id is always added as the last
+ordering so the order of the pages is stable. Every filter and ordering is
+served by an index of the Product model.
+"""
+
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+TRUE_VALUES = ("1", "true", "yes")
+
+
+def _integer(request, name):
+    """Return the integer query parameter or None if it is not provided"""
+
+    value = request.query_params.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        return int(value)
+    except ValueError as error:
+        raise ValidationError(
+            {name: "A valid integer is required."}
+        ) from error
+
+
+def _category_ids(request):
+    """Return the category ids of the category query parameters, they are
+    repeated or separated by commas.
+    """
+
+    values = ",".join(request.query_params.getlist("category"))
+    try:
+        return [int(value) for value in values.split(",") if value.strip()]
+    except ValueError as error:
+        raise ValidationError(
+            {"category": "A list of valid integers is required."}
+        ) from error
+
+
+class ProductFilterBackend(BaseFilterBackend):
+    """Product Filter Backend
+
+    This class is used to filter the products with the query parameters:
+
+    - min_price and max_price: the price range, both are included
+    - in_stock: only the products with a stock when it is 1, true or yes
+    - category: the ids of the categories, repeated or separated by commas
+    """
+
+    @staticmethod
+    def get_conditions(request):
+        """Return the conditions of the query parameters by facet name"""
+
+        conditions = {}
+        min_price = _integer(request, "min_price")
+        if min_price is not None:
+            conditions["min_price"] = Q(price__gte=min_price)
+        max_price = _integer(request, "max_price")
+        if max_price is not None:
+            conditions["max_price"] = Q(price__lte=max_price)
+        if request.query_params.get("in_stock", "").lower() in TRUE_VALUES:
+            conditions["in_stock"] = Q(stock__gt=0)
+        categories = _category_ids(request)
+        if categories:
+            conditions["category"] = Q(category_id__in=categories)
+        return conditions
+
+    def filter_queryset(self, request, queryset, view):
+        """Filter the products with all the conditions"""
+        return queryset.filter(*self.get_conditions(request).values())
+
+    def facet_queryset(self, request, queryset, facet):
+        """Filter the products with all the conditions but the condition of
+        the facet, so the counts of a facet show the other choices.
+        """
+
+        conditions = self.get_conditions(request)
+        conditions.pop(facet, None)
+        return queryset.filter(*conditions.values())
+
+
+class ProductOrderingFilter(OrderingFilter):
+    """Product Ordering Filter
+
+    This class is used to order the products by price, sold, name or id with
+    the ordering query parameter, for example ordering=-price. The id is
+    added in the same direction as the first ordering to break the ties.
+    """
+
+    ordering_fields = ["price", "sold", "name", "id"]
+
+    def get_ordering(self, request, queryset, view):
+        """Return the ordering with the id as the last field"""
+
+        ordering = list(super().get_ordering(request, queryset, view) or [])
+        if not any(field.lstrip("-") == "id" for field in ordering):
+            descending = bool(ordering) and ordering[0].startswith("-")
+            ordering.append("-id" if descending else "id")
+        return ordering
@@ -0,0 +1,247 @@
+"""Inventory Reservations
+
+This file contains the holds of the stock. Every product has a StockCounter
+with its available stock: the stock minus the quantities held by the cart
+lines. Adding a product to the cart holds its quantity for STOCK_HOLD_TTL
+seconds with one conditional UPDATE of the counter, which checks and takes
+the stock at once, so the flash sales fail at the cart instead of the
+checkout. The checkout converts the holds of the cart: it only takes from
+the counters the quantities that are not held any longer and gives back the
+surplus, the product rows are not locked before they are updated.
+
+The expired holds are given back in batches by release_expired_holds, run by
+the release_stock_holds command. The counters of the products created with
+bulk_create are made on their first use, sync_counters computes them again
+from the stock and the holds.
+"""
+
+# pylint: disable=no-member
+
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, F, OuterRef, Q, Subquery, Sum, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import Cart, Product, ProductStripe, StockCounter
+
+
+class OutOfStockError(Exception):
+    """Raised to roll back an order or a hold when a product has not enough
+    stock. available is the stock that could be taken.
+    """
+
+    def __init__(self, product, available=0):
+        super().__init__(product)
+        self.product = product
+        self.available = available
+
+
+def _apply(changes):
+    """Take the quantities of changes from the counters with one UPDATE and
+    return the number of updated counters. A counter is not updated when
+    its available stock is lower than the quantity taken.
+    """
+
+    condition = Q()
+    cases = []
+    for product_id, change in changes.items():
+        if change > 0:
+            condition |= Q(product_id=product_id, available__gte=change)
+        else:
+            condition |= Q(product_id=product_id)
+        cases.append(
+            When(product_id=product_id, then=F("available") - change)
+        )
+    return StockCounter.objects.filter(condition).update(
+        available=Case(*cases, default=F("available"))
+    )
+
+
+def reserve(changes):
+    """Take the quantities of changes, a dict of quantities by product id,
+    from the available stock, the negative quantities are given back.
+
+    This function must be called inside a transaction. It raises
+    OutOfStockError if a product has not enough available stock, the
+    transaction must then be rolled back.
+    """
+
+    changes = {pk: change for pk, change in changes.items() if change}
+    if not changes:
+        return
+    # Only the products whose stock is taken can fail. When the stock of
+    # several products is taken a partial update is undone, so the counters
+    # are read as they were.
+    several = sum(1 for change in changes.values() if change > 0) > 1
+    for attempt in range(2):
+        savepoint = transaction.savepoint() if several else None
+        updated = _apply(changes)
+        if updated == len(changes):
+            if savepoint:
+                transaction.savepoint_commit(savepoint)
+            return
+        if savepoint:
+            transaction.savepoint_rollback(savepoint)
+        available = dict(
+            StockCounter.objects.filter(product_id__in=changes).values_list(
+                "product_id", "available"
+            )
+        )
+        missing = {
+            pk: change
+            for pk, change in changes.items()
+            if pk not in available
+        }
+        if not missing or attempt:
+            break
+        if not several:
+            if updated < len(changes) - len(missing):
+                break
+            # The counters that exist are updated
+            changes = missing
+        sync_counters(list(missing))
+    product_id = next(
+        (
+            pk
+            for pk, change in changes.items()
+            if available.get(pk, 0) < change
+        ),
+        None,
+    )
+    if product_id is not None:
+        raise OutOfStockError(
+            Product.objects.get(pk=product_id),
+            max(available.get(product_id, 0), 0),
+        )
+
+
+def hold(user, product, quantity):
+    """Set the quantity of the cart line of the user and the product, hold
+    it for STOCK_HOLD_TTL seconds and return the line.
+
+    It raises OutOfStockError if the quantity is more than the available
+    stock and the quantity already held by the line.
+    """
+
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                line = (
+                    Cart.objects.select_for_update()
+                    .filter(user=user, product=product)
+                    .first()
+                ) or Cart(user=user, product=product)
+                try:
+                    reserve({product.pk: quantity - line.reserved})
+                except OutOfStockError as error:
+                    error.available += line.reserved
+                    raise
+                line.quantity = quantity
+                line.price = product.price * quantity
+                line.reserved = quantity
+                line.reserved_until = timezone.now() + timedelta(
+                    seconds=settings.STOCK_HOLD_TTL
+                )
+                line.save()
+                return line
+        except IntegrityError:
+            # A concurrent request has created the line, it is updated now
+            if attempt:
+                raise
+    return None
+
+
+def _held(rows):
+    """Return the quantities held by rows of (id, product id, reserved)"""
+
+    quantities = {}
+    for _, product_id, reserved in rows:
+        quantities[product_id] = quantities.get(product_id, 0) + reserved
+    return quantities
+
+
+def release(lines):
+    """Delete the cart lines of the queryset, give back their holds and
+    return the number of deleted lines.
+    """
+
+    with transaction.atomic():
+        rows = list(
+            lines.select_for_update().values_list(
+                "id", "product_id", "reserved"
+            )
+        )
+        reserve({pk: -reserved for pk, reserved in _held(rows).items()})
+        Cart.objects.filter(pk__in=[row[0] for row in rows]).delete()
+    return len(rows)
+
+
+def release_expired_holds(batch_size=1000):
+    """Give back the expired holds in batches and return their number. The
+    cart lines are kept, their quantities are taken again at the checkout
+    if there is still enough stock.
+    """
+
+    released = 0
+    while True:
+        with transaction.atomic():
+            expired = Cart.objects.filter(
+                reserved__gt=0, reserved_until__lte=timezone.now()
+            ).order_by("reserved_until")
+            if connection.features.has_select_for_update_skip_locked:
+                # The lines of a running checkout are released later
+                expired = expired.select_for_update(skip_locked=True)
+            rows = list(
+                expired.values_list("id", "product_id", "reserved")[
+                    :batch_size
+                ]
+            )
+            if not rows:
+                return released
+            reserve({pk: -reserved for pk, reserved in _held(rows).items()})
+            Cart.objects.filter(pk__in=[row[0] for row in rows]).update(
+                reserved=0, reserved_until=None
+            )
+        released += len(rows)
+
+
+def sync_counters(product_ids=None):
+    """Create the missing counters of the products, or of all the products,
+    and compute their available stock again from the stock and the holds.
+    """
+
+    products = Product.objects.order_by()
+    counters = StockCounter.objects.all()
+    if product_ids is not None:
+        products = products.filter(pk__in=product_ids)
+        counters = counters.filter(product_id__in=product_ids)
+    StockCounter.objects.bulk_create(
+        [
+            StockCounter(product_id=pk)
+            for pk in products.values_list("id", flat=True)
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    stock = Product.objects.filter(pk=OuterRef("product_id")).values("stock")
+    # The stock of a striped product is also in its stripes
+    striped = (
+        ProductStripe.objects.filter(product_id=OuterRef("product_id"))
+        .order_by()
+        .values("product_id")
+        .annotate(total=Sum("stock"))
+        .values("total")
+    )
+    held = (
+        Cart.objects.filter(product_id=OuterRef("product_id"))
+        .order_by()
+        .values("product_id")
+        .annotate(total=Sum("reserved"))
+        .values("total")
+    )
+    counters.update(
+        available=Subquery(stock)
+        + Coalesce(Subquery(striped), 0)
+        - Coalesce(Subquery(held), 0)
+    )
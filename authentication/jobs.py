@@ -0,0 +1,283 @@
+"""Background Jobs
+
+This file contains the queue of the jobs that run after a request, off its
+path. The views enqueue the jobs with enqueue: the rows of the jobs are
+inserted with one query once the transaction of the request is committed,
+so a job never runs for rows that were rolled back and the transaction does
+not hold its locks any longer. The handlers of the jobs are registered by
+name with the job decorator and called with the payload of the job.
+
+The run_jobs command runs a JobWorker: it claims a batch of the jobs that
+are due with a conditional UPDATE, so two workers never run the same job,
+and runs them in a pool of threads. A failed job is retried later with an
+exponential backoff until JOBS_MAX_ATTEMPTS, a job whose worker died is
+claimed again after JOBS_TIMEOUT seconds. The worker keeps the number of
+jobs run, retried and failed, the waiting time of the jobs in the queue and
+their running time to report its throughput.
+"""
+
+# pylint: disable=no-member
+
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import (
+    DatabaseError,
+    close_old_connections,
+    connection,
+    transaction,
+)
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+from .metrics import percentile
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+handlers = {}
+
+
+def job(name):
+    """Register the decorated function as the handler of the jobs of name"""
+
+    def register(func):
+        handlers[name] = func
+        return func
+
+    return register
+
+
+def enqueue(*jobs):
+    """Insert the jobs, (name, payload) pairs, after the commit of the
+    current transaction, or at once outside of a transaction.
+    """
+
+    rows = [Job(name=name, payload=payload) for name, payload in jobs]
+
+    def insert():
+        try:
+            Job.objects.bulk_create(rows)
+        except DatabaseError:
+            # The request has succeeded, its jobs are lost but not its data
+            logger.exception("The jobs %s were not enqueued", jobs)
+
+    transaction.on_commit(insert)
+
+
+def retry_delay(attempts):
+    """Return the delay before the next attempt of a job in seconds"""
+
+    return min(
+        settings.JOBS_RETRY_DELAY * 2 ** max(attempts - 1, 0),
+        settings.JOBS_RETRY_MAX_DELAY,
+    )
+
+
+def queue_stats():
+    """Return the number of jobs by status and the age of the oldest
+    pending job in seconds.
+    """
+
+    counts = dict(
+        Job.objects.order_by()
+        .values_list("status")
+        .annotate(count=Count("id"))
+    )
+    stats = {status: counts.get(status, 0) for status, _ in Job.STATUSES}
+    oldest = Job.objects.filter(status=Job.PENDING).aggregate(
+        oldest=Min("created_at")
+    )["oldest"]
+    stats["lag"] = (
+        (timezone.now() - oldest).total_seconds() if oldest else 0
+    )
+    return stats
+
+
+def purge_jobs(days):
+    """Delete the jobs done more than days ago and return their number"""
+
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = Job.objects.filter(
+        status=Job.DONE, finished_at__lt=cutoff
+    ).delete()
+    return deleted
+
+
+class JobWorker:
+    """Job Worker
+
+    This class is used to claim the jobs that are due and run them in a pool
+    of threads, or in the current thread when threads is 0. Every thread
+    uses its own database connection. The latest max_samples wait times and
+    durations of the jobs are kept for the stats, JOB_METRICS_MAX_SAMPLES by
+    default.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, threads=4, batch_size=None, max_samples=None):
+        self.threads = threads
+        self.batch_size = batch_size or max(threads, 1) * 5
+        self.max_samples = max_samples or settings.JOB_METRICS_MAX_SAMPLES
+        self.executor = (
+            ThreadPoolExecutor(max_workers=threads) if threads else None
+        )
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Forget the counters and the samples"""
+
+        with self._lock:
+            self.start = time.perf_counter()
+            self.counts = {"succeeded": 0, "retried": 0, "failed": 0}
+            self.waits = deque(maxlen=self.max_samples)
+            self.durations = deque(maxlen=self.max_samples)
+
+    def claim(self):
+        """Claim a batch of the jobs that are due and return them"""
+
+        now = timezone.now()
+        token = uuid.uuid4().hex
+        ready = Q(status=Job.PENDING, run_at__lte=now) | Q(
+            status=Job.RUNNING,
+            started_at__lt=now - timedelta(seconds=settings.JOBS_TIMEOUT),
+        )
+        with transaction.atomic():
+            queryset = Job.objects.filter(ready).order_by("run_at", "id")
+            if connection.features.has_select_for_update_skip_locked:
+                queryset = queryset.select_for_update(skip_locked=True)
+            ids = list(
+                queryset.values_list("id", flat=True)[: self.batch_size]
+            )
+            if not ids:
+                return []
+            # The condition is checked again so a job claimed by another
+            # worker in the meantime is left to it.
+            Job.objects.filter(ready, pk__in=ids).update(
+                status=Job.RUNNING,
+                claimed_by=token,
+                started_at=now,
+                attempts=F("attempts") + 1,
+            )
+        return list(
+            Job.objects.filter(pk__in=ids, claimed_by=token).order_by(
+                "run_at", "id"
+            )
+        )
+
+    def run(self, item):
+        """Run the handler of a claimed job and record its outcome"""
+
+        start = time.perf_counter()
+        try:
+            handlers[item.name](**item.payload)
+        except Exception as error:  # pylint: disable=broad-except
+            outcome = self.retry(item, error)
+        else:
+            outcome = "succeeded"
+            Job.objects.filter(pk=item.pk, claimed_by=item.claimed_by).update(
+                status=Job.DONE, finished_at=timezone.now(), last_error=""
+            )
+        duration = (time.perf_counter() - start) * 1000
+        wait = (item.started_at - item.run_at).total_seconds() * 1000
+        with self._lock:
+            self.counts[outcome] += 1
+            self.waits.append(max(wait, 0))
+            self.durations.append(duration)
+        return outcome
+
+    @staticmethod
+    def retry(item, error):
+        """Schedule the next attempt of a failed job, or give it up after
+        the last attempt. Return the outcome.
+        """
+
+        now = timezone.now()
+        jobs = Job.objects.filter(pk=item.pk, claimed_by=item.claimed_by)
+        message = type(error).__name__ + ": " + str(error)
+        if item.attempts >= settings.JOBS_MAX_ATTEMPTS:
+            logger.error(
+                "Job %s %s failed after %s attempts: %s",
+                item.pk, item.name, item.attempts, message,
+            )
+            jobs.update(status=Job.FAILED, finished_at=now, last_error=message)
+            return "failed"
+        delay = retry_delay(item.attempts)
+        logger.warning(
+            "Job %s %s failed, retried in %ss: %s",
+            item.pk, item.name, delay, message,
+        )
+        jobs.update(
+            status=Job.PENDING,
+            run_at=now + timedelta(seconds=delay),
+            last_error=message,
+        )
+        return "retried"
+
+    def run_in_thread(self, item):
+        """Run a job in a thread of the pool"""
+
+        try:
+            return self.run(item)
+        finally:
+            close_old_connections()
+
+    def run_batch(self):
+        """Claim a batch of jobs, run them and return their number"""
+
+        jobs = self.claim()
+        if self.executor is None:
+            for item in jobs:
+                self.run(item)
+        else:
+            list(self.executor.map(self.run_in_thread, jobs))
+        return len(jobs)
+
+    def work(self, poll_interval=1.0, once=False, stop=None):
+        """Run the jobs until stop is set, or until the queue is empty when
+        once is True. The queue is polled every poll_interval seconds when
+        it is empty.
+        """
+
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            if self.run_batch():
+                continue
+            if once:
+                break
+            stop.wait(poll_interval)
+
+    def stats(self):
+        """Return the counters, the throughput in jobs per second and the
+        percentiles of the waiting and running times in milliseconds.
+        """
+
+        with self._lock:
+            elapsed = time.perf_counter() - self.start
+            processed = sum(self.counts.values())
+            waits = list(self.waits)
+            durations = list(self.durations)
+            stats = dict(self.counts)
+        stats.update(
+            {
+                "processed": processed,
+                "throughput": processed / elapsed if elapsed else 0,
+                "wait_p50": percentile(waits, 50),
+                "wait_p95": percentile(waits, 95),
+                "run_p50": percentile(durations, 50),
+                "run_p95": percentile(durations, 95),
+            }
+        )
+        return stats
+
+    def close(self):
+        """Stop the threads of the pool"""
+
+        if self.executor is not None:
+            self.executor.shutdown()
@@ -0,0 +1,316 @@
+"""Benchmark API Command
+
+This command benchmarks the hot endpoints of the API on a seeded throwaway
+database. Every endpoint is called by concurrent clients, each client is a
+thread with its own Django test client and database connection, and the
+throughput, the p50, p95 and p99 latencies and the number of queries of the
+requests are reported.
+
+    python manage.py benchmark_api --concurrency 8 --requests 500
+"""
+
+# pylint: disable=no-member
+
+import contextlib
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connections
+from django.test import Client
+from django.test.utils import (
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.urls import reverse
+from authentication.benchmark import (
+    BENCHMARK_PASSWORD,
+    benchmark_database,
+    seed,
+)
+from authentication.cache import catalog_cache
+from authentication.inventory import sync_counters
+from authentication.metrics import RequestMetrics, percentile
+from authentication.models import Product, User
+from authentication.serializers import CreateTokneSerialzer
+
+
+class Endpoints:
+    """Endpoints
+
+    This class drives the benchmarked endpoints. Every call sends one request
+    to an endpoint with a test client. The users are taken in turn so every
+    user checks out its seeded cart once as long as the number of requests
+    is not greater than the number of users, the next checkouts of a user
+    find an empty cart.
+    """
+
+    names = (
+        "register",
+        "token",
+        "products",
+        "search",
+        "add-to-cart",
+        "cart",
+        "checkout",
+        "order-detail",
+    )
+
+    def __init__(self, users, products, admin_token):
+        self.users = users
+        self.products = products
+        self.admin_token = admin_token
+        self.usernames = itertools.count()
+        self.rand = random.Random(2)
+        self.lock = threading.Lock()
+
+    def arguments(self, index):
+        """Return the user and a random product id of a request"""
+
+        with self.lock:
+            product_id = self.rand.choice(self.products)
+        return self.users[index % len(self.users)], product_id
+
+    def search_query(self):
+        """Return the prefix of a random product name"""
+
+        with self.lock:
+            number = self.rand.randrange(len(self.products))
+        return "product" + str(number)
+
+    @staticmethod
+    def succeeded(response):
+        """Return whether the request succeeded, the checkout answers a
+        failed transaction with a status 200 and an error message.
+        """
+
+        data = getattr(response, "data", None)
+        return response.status_code < 400 and not (
+            isinstance(data, dict)
+            and data.get("message") == "Something went wrong"
+        )
+
+    # pylint: disable=too-many-return-statements
+    def call(self, name, client, user, product_id):
+        """Send the request of the endpoint"""
+
+        auth = {"HTTP_AUTHORIZATION": "Bearer " + user["token"]}
+        if name == "register":
+            username = "bench" + str(next(self.usernames))
+            return client.post(
+                reverse("authentication:register-user"),
+                {
+                    "username": username,
+                    "password": BENCHMARK_PASSWORD,
+                    "confirm_password": BENCHMARK_PASSWORD,
+                },
+                content_type="application/json",
+            )
+        if name == "token":
+            return client.post(
+                reverse("authentication:create-token"),
+                {"username": user["username"], "password": BENCHMARK_PASSWORD},
+                content_type="application/json",
+            )
+        if name == "products":
+            return client.get(
+                reverse("authentication:products-view-list"),
+                HTTP_AUTHORIZATION="Bearer " + self.admin_token,
+            )
+        if name == "search":
+            return client.get(
+                reverse("authentication:product-search"),
+                {"q": self.search_query()},
+                **auth,
+            )
+        if name == "add-to-cart":
+            return client.post(
+                reverse("authentication:add-to-cart"),
+                {"user": user["id"], "product": product_id},
+                content_type="application/json",
+                **auth,
+            )
+        if name == "cart":
+            return client.get(
+                reverse(
+                    "authentication:cart-view", kwargs={"user_id": user["id"]}
+                ),
+                **auth,
+            )
+        if name == "checkout":
+            return client.post(
+                reverse("authentication:place-order-view")
+                + "?user_id="
+                + str(user["id"]),
+                **auth,
+            )
+        return client.get(
+            reverse("authentication:order-detail-view"),
+            {"user_id": user["id"]},
+            **auth,
+        )
+
+
+def run_requests(endpoints, name, requests, concurrency):
+    """Send the requests of an endpoint with concurrent clients and return
+    the throughput, the latencies and the queries of the requests.
+    """
+
+    local = threading.local()
+    thread_connections = []
+
+    def request(index):
+        if not hasattr(local, "client"):
+            local.client = Client(raise_request_exception=False)
+            thread_connections.extend(connections.all())
+        arguments = endpoints.arguments(index)
+        metrics = RequestMetrics()
+        start = time.perf_counter()
+        with contextlib.ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(metrics))
+            response = endpoints.call(name, local.client, *arguments)
+        latency = (time.perf_counter() - start) * 1000
+        # Close the connection like the request_finished signal does
+        close_old_connections()
+        return latency, metrics.queries, endpoints.succeeded(response)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(request, range(requests)))
+    duration = time.perf_counter() - start
+    # The persistent connections of the threads are closed from here
+    for thread_connection in thread_connections:
+        thread_connection.inc_thread_sharing()
+        thread_connection.close()
+        thread_connection.dec_thread_sharing()
+
+    latencies = [sample[0] for sample in samples]
+    queries = [sample[1] for sample in samples]
+    return {
+        "name": name,
+        "duration": duration,
+        "requests": len(samples),
+        "errors": sum(1 for sample in samples if not sample[2]),
+        "throughput": len(samples) / duration,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "queries_p50": percentile(queries, 50),
+        "queries_max": max(queries),
+    }
+
+
+def results_table(results):
+    """Return the lines of the table of the results"""
+
+    lines = [
+        f"{'endpoint':<24}{'requests':>9}{'errors':>8}{'req/s':>10}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'q p50':>9}{'q max':>9}"
+    ]
+    for result in results:
+        lines.append(
+            f"{result['name']:<24}{result['requests']:>9}"
+            f"{result['errors']:>8}{result['throughput']:>10.1f}"
+            f"{result['p50']:>10.2f}{result['p95']:>10.2f}"
+            f"{result['p99']:>10.2f}{result['queries_p50']:>9}"
+            f"{result['queries_max']:>9}"
+        )
+    return lines
+
+
+class Command(BaseCommand):
+    """Benchmark the hot endpoints of the API"""
+
+    help = "Drive the hot endpoints with concurrent clients and report them."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--categories", type=int, default=20)
+        parser.add_argument("--products", type=int, default=5000)
+        parser.add_argument("--cart-lines", type=int, default=5)
+        parser.add_argument("--order-items", type=int, default=50000)
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, default=4)
+        parser.add_argument(
+            "--endpoints",
+            nargs="+",
+            choices=Endpoints.names,
+            default=Endpoints.names,
+        )
+
+    def handle(self, *args, **options):
+        if options["concurrency"] < 1 or options["requests"] < 1:
+            raise CommandError("The concurrency and requests must be positive")
+
+        self.write_results(self.benchmark(options))
+
+    def benchmark(self, options):
+        """Seed a benchmark database and benchmark the endpoints"""
+
+        setup_test_environment()
+        try:
+            with benchmark_database():
+                self.stdout.write("Seeding the benchmark database...")
+                return self.run_endpoints(self.seed(options), options)
+        finally:
+            teardown_test_environment()
+
+    def run_endpoints(self, endpoints, options):
+        """Benchmark every endpoint of the options"""
+
+        return [
+            self.run_endpoint(endpoints, name, options)
+            for name in options["endpoints"]
+        ]
+
+    def write_results(self, results):
+        """Write the table of the results"""
+
+        self.stdout.write("")
+        for line in results_table(results):
+            self.stdout.write(line)
+
+    def seed(self, options):
+        """Seed the database and return the endpoints driver"""
+
+        data = seed(
+            users=options["users"],
+            categories=options["categories"],
+            products=options["products"],
+            cart_lines=options["cart_lines"],
+            order_items=options["order_items"],
+        )
+        Product.objects.update(stock=10**9)
+        sync_counters()
+        catalog_cache.clear()
+        admin = User.objects.create_superuser(
+            username="benchadmin", password=BENCHMARK_PASSWORD
+        )
+        users = [
+            {
+                "id": user.id,
+                "username": user.username,
+                "token": self.get_access_token(user),
+            }
+            for user in User.objects.filter(pk__in=data["users"])
+        ]
+        return Endpoints(
+            users, data["products"], self.get_access_token(admin)
+        )
+
+    @staticmethod
+    def get_access_token(user):
+        """Return the access token issued to the user by the token view"""
+        return str(CreateTokneSerialzer.get_token(user).access_token)
+
+    def run_endpoint(self, endpoints, name, options):
+        """Send the requests of an endpoint with concurrent clients"""
+
+        result = run_requests(
+            endpoints, name, options["requests"], options["concurrency"]
+        )
+        self.stdout.write(f"{name} done in {result['duration']:.2f}s")
+        return result
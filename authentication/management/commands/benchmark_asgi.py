@@ -0,0 +1,246 @@
+"""Benchmark ASGI Command
+
+This command compares the throughput of the read-heavy catalog and cart
+endpoints served in three ways on a seeded throwaway database:
+
+- wsgi: the sync views, every concurrent client is a thread like the
+  workers of a threaded WSGI server.
+- asgi: the sync views served by the ASGI application, every request is
+  sent to a thread of its own with a new database connection.
+- asgi-async: the async views served by the ASGI application, the queries
+  run in a pool of as many threads as concurrent clients.
+
+The ASGI application is called directly with the HTTP scopes, without a
+server, and the concurrent clients are tasks of one event loop. Every query
+sleeps for --query-latency milliseconds like on a database server across
+the network, so the endpoints are I/O bound. The catalog cache is cleared
+before every mode, --dummy-cache replaces it by a dummy cache so every page
+is loaded from the database. Only the 2xx responses are successful, the
+command fails after the table of the results when a request failed.
+
+    python manage.py benchmark_asgi --concurrency 16 --query-latency 2
+"""
+
+import asyncio
+import contextlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management.base import CommandError
+from django.test.utils import override_settings
+from django.urls import reverse
+from authentication.benchmark import query_latency
+from authentication.cache import catalog_cache
+from authentication.metrics import percentile
+from . import benchmark_api
+
+MODES = ("wsgi", "asgi", "asgi-async")
+
+# The URL names of the sync and the async view of every endpoint
+URL_NAMES = {
+    "products": ("products-view-list", "async-products-view"),
+    "category": ("category-products-view", "async-category-products-view"),
+    "product": ("product-view-detail", "async-product-view"),
+    "cart": ("cart-view", "async-cart-view"),
+    "cart-summary": ("cart-summary-view", "async-cart-summary-view"),
+}
+
+
+class Endpoints(benchmark_api.Endpoints):
+    """Endpoints
+
+    This class drives the GET requests of the sync and the async views. The
+    catalog endpoints are called by the superuser, the cart endpoints by the
+    owner of the cart.
+    """
+
+    names = tuple(URL_NAMES)
+
+    def __init__(self, users, products, admin_token, categories):
+        super().__init__(users, products, admin_token)
+        self.categories = categories
+
+    def path(self, name, user, product_id, asynchronous):
+        """Return the path and the token of a request"""
+
+        kwargs = {}
+        token = self.admin_token
+        if name == "category":
+            with self.lock:
+                number = self.rand.randrange(self.categories)
+            kwargs = {"gategory_name": "category" + str(number)}
+        elif name == "product":
+            kwargs = {"pk": product_id}
+        elif name in ("cart", "cart-summary"):
+            kwargs = {"user_id": user["id"]}
+            token = user["token"]
+        url_name = URL_NAMES[name][1 if asynchronous else 0]
+        return reverse("authentication:" + url_name, kwargs=kwargs), token
+
+    @staticmethod
+    def succeeded(response):
+        """Return whether the response has a 2xx status"""
+        return successful(response.status_code)
+
+    def call(self, name, client, user, product_id):
+        path, token = self.path(name, user, product_id, False)
+        return client.get(path, HTTP_AUTHORIZATION="Bearer " + token)
+
+
+def successful(status):
+    """Return whether an HTTP status is a 2xx status"""
+    return 200 <= status < 300
+
+
+async def asgi_get(application, path, token):
+    """Send a GET request to the ASGI application and return the status"""
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", b"testserver"),
+            (b"authorization", ("Bearer " + token).encode()),
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": ("testserver", 80),
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await application(scope, receive, send)
+    return messages[0]["status"]
+
+
+class Command(benchmark_api.Command):
+    """Compare the WSGI and the ASGI views under concurrent I/O bound load"""
+
+    help = "Compare the sync views under WSGI and ASGI with the async views."
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--query-latency", type=float, default=2.0)
+        parser.add_argument("--dummy-cache", action="store_true")
+        parser.add_argument(
+            "--modes", nargs="+", choices=MODES, default=list(MODES)
+        )
+        parser.set_defaults(
+            endpoints=list(Endpoints.names),
+            concurrency=16,
+            requests=400,
+            order_items=10000,
+        )
+        for action in parser._actions:  # pylint: disable=protected-access
+            if action.dest == "endpoints":
+                action.choices = Endpoints.names
+
+    def handle(self, *args, **options):
+        if options["concurrency"] < 1 or options["requests"] < 1:
+            raise CommandError("The concurrency and requests must be positive")
+
+        caches = dict(settings.CACHES)
+        if options["dummy_cache"]:
+            caches[settings.CATALOG_CACHE_ALIAS] = {
+                "BACKEND": "django.core.cache.backends.dummy.DummyCache"
+            }
+        with override_settings(CACHES=caches):
+            results = self.benchmark(options)
+        self.write_results(results)
+        errors = sum(result["errors"] for result in results)
+        if errors:
+            raise CommandError(
+                f"{errors} requests failed, the results are not comparable"
+            )
+
+    def run_endpoints(self, endpoints, options):
+        """Benchmark every endpoint of the options in every mode"""
+
+        results = []
+        with query_latency(options["query_latency"]):
+            for name in options["endpoints"]:
+                for mode in options["modes"]:
+                    catalog_cache.clear()
+                    result = self.run_mode(endpoints, name, mode, options)
+                    result["name"] = mode + " " + name
+                    results.append(result)
+        return results
+
+    def seed(self, options):
+        endpoints = super().seed(options)
+        return Endpoints(
+            endpoints.users,
+            endpoints.products,
+            endpoints.admin_token,
+            options["categories"],
+        )
+
+    def run_mode(self, endpoints, name, mode, options):
+        """Send the requests of an endpoint in a mode"""
+
+        if mode == "wsgi":
+            return self.run_endpoint(endpoints, name, options)
+        return self.run_asgi(endpoints, name, mode == "asgi-async", options)
+
+    def run_asgi(self, endpoints, name, asynchronous, options):
+        """Send the requests of an endpoint to the ASGI application with
+        concurrent tasks.
+        """
+
+        application = get_asgi_application()
+        indexes = iter(range(options["requests"]))
+        samples = []
+
+        async def client():
+            for index in indexes:
+                user, product_id = endpoints.arguments(index)
+                path, token = endpoints.path(
+                    name, user, product_id, asynchronous
+                )
+                start = time.perf_counter()
+                status = await asgi_get(application, path, token)
+                samples.append(
+                    (
+                        (time.perf_counter() - start) * 1000,
+                        successful(status),
+                    )
+                )
+
+        async def run():
+            executor = ThreadPoolExecutor(max_workers=options["concurrency"])
+            asyncio.get_running_loop().set_default_executor(executor)
+            await asyncio.gather(
+                *(client() for _ in range(options["concurrency"]))
+            )
+
+        start = time.perf_counter()
+        with contextlib.closing(asyncio.new_event_loop()) as loop:
+            loop.run_until_complete(run())
+            loop.run_until_complete(loop.shutdown_default_executor())
+        duration = time.perf_counter() - start
+
+        latencies = [sample[0] for sample in samples]
+        self.stdout.write(f"{name} done in {duration:.2f}s")
+        return {
+            "name": name,
+            "requests": len(samples),
+            "errors": sum(1 for sample in samples if not sample[1]),
+            "throughput": len(samples) / duration,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "queries_p50": "-",
+            "queries_max": "-",
+        }
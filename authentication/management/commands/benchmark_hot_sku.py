@@ -0,0 +1,173 @@
+"""Benchmark Hot SKU Command
+
+This command measures the checkouts of a single hot product, like during a
+flash sale, on a seeded throwaway database. Every user has one held cart
+line of the product and the checkouts are sent by concurrent clients in two
+modes:
+
+- row: the stock and sold of the product are updated in the product row,
+  so the concurrent checkouts wait for the lock of the same row.
+- striped: the product is split into --stripes stripes and every checkout
+  updates a random stripe.
+
+The stripes are folded back at the end and the stock and sold of the
+product are checked against the ordered quantities. Every query can sleep
+for --query-latency milliseconds like on a database server across the
+network. SQLite locks the whole database for a write, so the two modes only
+differ on a database with row locks such as PostgreSQL.
+
+    python manage.py benchmark_hot_sku --concurrency 16 --stripes 8
+"""
+
+# pylint: disable=no-member
+
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Sum
+from django.test.utils import (
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.utils import timezone
+from authentication.benchmark import benchmark_database, query_latency, seed
+from authentication.inventory import sync_counters
+from authentication.models import Cart, Order, OrderItem, Product, User
+from authentication.stripes import fold_stripes, set_stripes
+from .benchmark_api import Command as ApiCommand
+from .benchmark_api import Endpoints, results_table, run_requests
+
+MODES = ("row", "striped")
+
+
+class Command(BaseCommand):
+    """Benchmark the checkouts of a single hot product"""
+
+    help = "Compare the checkouts of one hot product with and without stripes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--stripes", type=int, default=8)
+        parser.add_argument("--query-latency", type=float, default=0.0)
+        parser.add_argument(
+            "--modes", nargs="+", choices=MODES, default=list(MODES)
+        )
+
+    def handle(self, *args, **options):
+        if options["concurrency"] < 1 or options["requests"] < 1:
+            raise CommandError("The concurrency and requests must be positive")
+        if options["stripes"] < 1:
+            raise CommandError("The number of stripes must be positive")
+
+        results = self.benchmark(options)
+        self.stdout.write("")
+        for line in results_table(results):
+            self.stdout.write(line)
+
+    def benchmark(self, options):
+        """Seed a benchmark database and benchmark the checkouts in every
+        mode.
+        """
+
+        setup_test_environment()
+        try:
+            with benchmark_database():
+                self.stdout.write("Seeding the benchmark database...")
+                # Every checkout needs a user with a full cart
+                endpoints = self.seed(
+                    max(options["users"], options["requests"])
+                )
+                product = Product.objects.get()
+                last_order = Order.objects.aggregate(last=Max("id"))["last"]
+                results = []
+                for mode in options["modes"]:
+                    self.fill_carts(product)
+                    set_stripes(
+                        [product.pk],
+                        options["stripes"] if mode == "striped" else 0,
+                    )
+                    with query_latency(options["query_latency"]):
+                        result = run_requests(
+                            endpoints,
+                            "checkout",
+                            options["requests"],
+                            options["concurrency"],
+                        )
+                    result["name"] = mode + " checkout"
+                    self.stdout.write(
+                        f"{result['name']} done in {result['duration']:.2f}s"
+                    )
+                    results.append(result)
+                self.check_counts(product, last_order or 0)
+                return results
+        finally:
+            teardown_test_environment()
+
+    @staticmethod
+    def seed(users):
+        """Seed the users and the hot product and return the endpoints
+        driver.
+        """
+
+        data = seed(
+            users=users,
+            categories=1,
+            products=1,
+            cart_lines=1,
+            order_items=0,
+        )
+        Product.objects.update(stock=10**9)
+        sync_counters()
+        users = [
+            {
+                "id": user.id,
+                "username": user.username,
+                "token": ApiCommand.get_access_token(user),
+            }
+            for user in User.objects.filter(pk__in=data["users"])
+        ]
+        return Endpoints(users, data["products"], admin_token="")
+
+    @staticmethod
+    def fill_carts(product):
+        """Give every user one held cart line of the product"""
+
+        Cart.objects.all().delete()
+        users = User.objects.values_list("id", flat=True)
+        reserved_until = timezone.now() + timedelta(days=1)
+        Cart.objects.bulk_create(
+            Cart(
+                user_id=user_id,
+                product=product,
+                quantity=1,
+                price=product.price,
+                reserved=1,
+                reserved_until=reserved_until,
+            )
+            for user_id in users
+        )
+        sync_counters([product.pk])
+
+    def check_counts(self, product, last_order):
+        """Fold the stripes and check the stock and sold of the product
+        against the quantities ordered by the orders after last_order.
+        """
+
+        stock, sold = product.stock, product.sold
+        fold_stripes([product.pk])
+        product.refresh_from_db()
+        ordered = (
+            OrderItem.objects.filter(
+                order_id__gt=last_order, product=product
+            ).aggregate(total=Sum("quantity"))["total"]
+            or 0
+        )
+        if product.sold != sold + ordered or product.stock != stock - ordered:
+            raise CommandError(
+                f"The product has {product.stock} in stock and "
+                f"{product.sold} sold after {ordered} were ordered"
+            )
+        self.stdout.write(
+            f"{ordered} ordered, the stock and sold of the product match"
+        )
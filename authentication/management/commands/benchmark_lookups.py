@@ -0,0 +1,152 @@
+"""Benchmark Lookups Command
+
+This command benchmarks the hot lookups of the cart, order and product views
+on a seeded throwaway database. Every lookup is explained and timed with the
+indexes of the models, then the indexes are dropped and the lookups are
+explained and timed again to show what the indexes save.
+
+    python manage.py benchmark_lookups --order-items 1000000
+"""
+
+# pylint: disable=no-member,protected-access
+
+import random
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.migrations.state import ProjectState
+from authentication.benchmark import benchmark_database, seed, time_calls
+from authentication.metrics import percentile
+from authentication.models import Cart, Order, OrderItem, Product
+
+# The lookups of AddToCartView, CartView, OrderDetailView and
+# CategoryProductView, a page is the default page size of the cursor.
+LOOKUPS = {
+    "add-to-cart": lambda args: Cart.objects.filter(
+        user_id=args["user"], product_id=args["product"]
+    ),
+    "cart-view": lambda args: Cart.objects.filter(user__id=args["user"]),
+    "order-detail": lambda args: OrderItem.objects.filter(
+        order__user__id=args["user"]
+    ).order_by("id")[:20],
+    "user-orders": lambda args: Order.objects.filter(
+        user_id=args["user"]
+    ).order_by("-date_created")[:20],
+    "category-products": lambda args: Product.objects.filter(
+        category_id=args["category"]
+    ).order_by("id")[:20],
+}
+
+# The indexes and constraints added for the lookups, the other ones are kept
+LOOKUP_INDEXES = {"unique_cart_product", "order_user_date_idx"}
+
+
+class Command(BaseCommand):
+    """Benchmark the hot lookups with and without the indexes"""
+
+    help = "Explain and time the hot lookups with and without the indexes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--categories", type=int, default=50)
+        parser.add_argument("--products", type=int, default=10000)
+        parser.add_argument("--order-items", type=int, default=1000000)
+        parser.add_argument("--repeat", type=int, default=200)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            self.stdout.write("Seeding the benchmark database...")
+            data = seed(
+                users=options["users"],
+                categories=options["categories"],
+                products=options["products"],
+                order_items=options["order_items"],
+            )
+            rand = random.Random(1)
+            arguments = [
+                {
+                    "user": rand.choice(data["users"]),
+                    "product": rand.choice(data["products"]),
+                    "category": rand.choice(data["categories"]),
+                }
+                for _ in range(options["repeat"])
+            ]
+
+            with_indexes = self.run_lookups(arguments)
+            self.drop_indexes()
+            without_indexes = self.run_lookups(arguments)
+
+        self.stdout.write("")
+        self.stdout.write(
+            f"{'lookup':<20}{'p50 indexed':>14}{'p95 indexed':>14}"
+            f"{'p50 before':>14}{'p95 before':>14}"
+        )
+        for name in LOOKUPS:
+            indexed = with_indexes[name]
+            before = without_indexes[name]
+            self.stdout.write(
+                f"{name:<20}{percentile(indexed, 50):>12.3f}ms"
+                f"{percentile(indexed, 95):>12.3f}ms"
+                f"{percentile(before, 50):>12.3f}ms"
+                f"{percentile(before, 95):>12.3f}ms"
+            )
+
+    def run_lookups(self, arguments):
+        """Explain and time every lookup, return the durations"""
+
+        durations = {}
+        for name, lookup in LOOKUPS.items():
+            self.stdout.write("")
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(lookup(arguments[0]).explain())
+            durations[name] = time_calls(
+                lambda args, lookup=lookup: list(lookup(args)), arguments
+            )
+        return durations
+
+    def drop_indexes(self):
+        """Drop the indexes and constraints added for the hot lookups
+
+        The tables are altered with models rendered without the indexes and
+        the constraints of LOOKUP_INDEXES, SQLite has to rebuild a table to
+        drop a unique constraint and it rebuilds the table from the given
+        model, so the other indexes of the model are rebuilt with it.
+        """
+
+        self.stdout.write("")
+        self.stdout.write(self.style.WARNING("Dropping the indexes"))
+        state = ProjectState.from_apps(apps)
+        dropped = []
+        for model in (Cart, Order):
+            options = state.models[
+                model._meta.app_label, model._meta.model_name
+            ].options
+            dropped.append(
+                (
+                    model,
+                    [
+                        item
+                        for item in options["constraints"]
+                        if item.name in LOOKUP_INDEXES
+                    ],
+                    [
+                        item
+                        for item in options["indexes"]
+                        if item.name in LOOKUP_INDEXES
+                    ],
+                )
+            )
+            for key in ("constraints", "indexes"):
+                options[key] = [
+                    item
+                    for item in options[key]
+                    if item.name not in LOOKUP_INDEXES
+                ]
+
+        with connection.schema_editor() as editor:
+            for model, constraints, indexes in dropped:
+                bare_model = state.apps.get_model(model._meta.label)
+                for constraint in constraints:
+                    editor.remove_constraint(bare_model, constraint)
+                for index in indexes:
+                    editor.remove_index(bare_model, index)
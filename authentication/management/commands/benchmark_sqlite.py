@@ -0,0 +1,73 @@
+"""Benchmark SQLite Command
+
+This command compares the SQLite profile of the settings with the defaults
+of SQLite and Django on the write endpoints of the API. Both profiles run
+the same requests with concurrent clients on their own seeded throwaway
+database:
+
+- default: rollback journal, synchronous FULL, the transactions begin
+  without a lock, a timeout of 5 seconds and a new connection per request.
+- tuned: the SQLITE_PRAGMAS, the OPTIONS and the CONN_MAX_AGE of the
+  settings, synchronous NORMAL, immediate transactions and persistent
+  connections by default. The throwaway database uses the write-ahead log
+  unless SQLITE_JOURNAL_MODE names another journal mode.
+
+    python manage.py benchmark_sqlite --concurrency 8 --requests 500
+"""
+
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.db import connections
+from authentication.benchmark import sqlite_profile
+from . import benchmark_api
+
+
+class Command(benchmark_api.Command):
+    """Compare the SQLite profiles on the write endpoints"""
+
+    help = "Compare the default and the tuned SQLite profiles."
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.set_defaults(
+            endpoints=["add-to-cart", "cart", "checkout"],
+            concurrency=8,
+            requests=400,
+            order_items=10000,
+        )
+
+    @staticmethod
+    def profiles():
+        """Return the pragmas, options and CONN_MAX_AGE of the profiles"""
+
+        database = settings.DATABASES["default"]
+        return {
+            "default": ({}, {"timeout": 5}, 0),
+            "tuned": (
+                {
+                    **settings.SQLITE_PRAGMAS,
+                    "journal_mode": (
+                        settings.SQLITE_PRAGMAS["journal_mode"] or "WAL"
+                    ),
+                },
+                database.get("OPTIONS", {}),
+                database.get("CONN_MAX_AGE", 0),
+            ),
+        }
+
+    def handle(self, *args, **options):
+        if connections["default"].vendor != "sqlite":
+            raise CommandError("The default database is not SQLite")
+        if options["concurrency"] < 1 or options["requests"] < 1:
+            raise CommandError("The concurrency and requests must be positive")
+
+        results = []
+        for profile, (pragmas, db_options, conn_max_age) in (
+            self.profiles().items()
+        ):
+            self.stdout.write("Profile " + profile)
+            with sqlite_profile(pragmas, db_options, conn_max_age):
+                for result in self.benchmark(options):
+                    result["name"] = profile + " " + result["name"]
+                    results.append(result)
+        self.write_results(results)
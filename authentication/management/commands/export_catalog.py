@@ -0,0 +1,51 @@
+"""Export Catalog Command
+
+This command exports the products to a CSV or JSON Lines catalog file that
+can be imported with the import_catalog command. The products are fetched in
+chunks and written as they come, the number of exported rows per second is
+reported at the end.
+
+    python manage.py export_catalog products.jsonl --chunk-size 5000
+"""
+
+# pylint: disable=no-member
+
+import time
+from django.core.management.base import BaseCommand, CommandError
+from authentication.catalog import CATALOG_FORMATS, export_rows, write_rows
+from .import_catalog import catalog_format
+
+
+class Command(BaseCommand):
+    """Export the catalog to a file"""
+
+    help = "Export the products to a CSV or JSON Lines file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=CATALOG_FORMATS)
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        file_format = catalog_format(options)
+        if options["chunk_size"] < 1:
+            raise CommandError("The chunk size must be a positive number")
+
+        start = time.perf_counter()
+        try:
+            with open(
+                options["path"], "w", newline="", encoding="utf-8"
+            ) as stream:
+                rows = write_rows(
+                    stream, file_format, export_rows(options["chunk_size"])
+                )
+        except OSError as error:
+            raise CommandError(error) from error
+        duration = time.perf_counter() - start
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{rows} products exported in {duration:.2f}s "
+                f"({rows / duration if duration else rows:.0f} rows/s)"
+            )
+        )
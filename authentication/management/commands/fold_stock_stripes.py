@@ -0,0 +1,35 @@
+"""Fold Stock Stripes Command
+
+This command adds the stripes of the striped products back to the stock and
+sold columns of the products, --batch-size stripes per transaction, so the
+filters and the ordering of the catalog see the sales. It is meant to run
+every minute or so from a scheduler while products are striped.
+
+    python manage.py fold_stock_stripes --batch-size 1000
+"""
+
+# pylint: disable=no-member
+
+import time
+from django.core.management.base import BaseCommand, CommandError
+from authentication.stripes import fold_stripes
+
+
+class Command(BaseCommand):
+    """Fold the stock stripes into the products"""
+
+    help = "Add the stock stripes of the striped products to the products."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("The batch size must be a positive number")
+
+        start = time.perf_counter()
+        folded = fold_stripes(batch_size=options["batch_size"])
+        duration = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(f"{folded} stripes folded in {duration:.2f}s")
+        )
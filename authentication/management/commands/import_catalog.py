@@ -0,0 +1,68 @@
+"""Import Catalog Command
+
+This command imports the products and the categories of a CSV or JSON Lines
+catalog file. The file is streamed and imported in batches of bulk inserts
+and updates, the number of imported rows per second is reported at the end.
+
+    python manage.py import_catalog products.csv --batch-size 5000
+"""
+
+# pylint: disable=no-member
+
+import time
+from django.core.management.base import BaseCommand, CommandError
+from authentication.catalog import CATALOG_FORMATS, CatalogImporter, read_rows
+
+
+def catalog_format(options):
+    """Return the format given by --format or by the extension of the path"""
+
+    file_format = options["format"] or options["path"].rsplit(".", 1)[-1]
+    if file_format not in CATALOG_FORMATS:
+        raise CommandError(
+            "Unknown format, use --format with one of "
+            + ", ".join(CATALOG_FORMATS)
+        )
+    return file_format
+
+
+class Command(BaseCommand):
+    """Import a catalog file"""
+
+    help = "Import the products and categories of a CSV or JSON Lines file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=CATALOG_FORMATS)
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        file_format = catalog_format(options)
+        if options["batch_size"] < 1:
+            raise CommandError("The batch size must be a positive number")
+
+        importer = CatalogImporter(options["batch_size"])
+        start = time.perf_counter()
+        try:
+            with open(
+                options["path"], newline="", encoding="utf-8"
+            ) as stream:
+                importer.import_rows(read_rows(stream, file_format))
+        except OSError as error:
+            raise CommandError(error) from error
+        except ValueError as error:
+            raise CommandError(
+                "Invalid catalog file: " + str(error)
+            ) from error
+        duration = time.perf_counter() - start
+
+        for number, error in importer.errors:
+            self.stderr.write(f"Row {number} skipped: {error}")
+        rows = importer.created + importer.updated
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{importer.created} products created, {importer.updated} "
+                f"updated, {len(importer.errors)} skipped in {duration:.2f}s "
+                f"({rows / duration if duration else rows:.0f} rows/s)"
+            )
+        )
@@ -0,0 +1,39 @@
+"""Rebuild Sales Rollups Command
+
+This command computes the daily sales rollups of the products and the
+categories again from the order items, for the orders placed before the
+rollups existed or after the order items were changed by hand. The rollups
+are replaced in one transaction, the pending jobs of the orders counted by
+the rebuild are skipped.
+
+    python manage.py rebuild_sales_rollups --batch-size 5000
+"""
+
+# pylint: disable=no-member
+
+import time
+from django.core.management.base import BaseCommand, CommandError
+from authentication.analytics import rebuild_rollups
+
+
+class Command(BaseCommand):
+    """Rebuild the daily sales rollups"""
+
+    help = "Compute the daily sales rollups again from the order items."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("The batch size must be a positive number")
+
+        start = time.perf_counter()
+        products, categories = rebuild_rollups(options["batch_size"])
+        duration = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{products} product rows and {categories} category rows "
+                f"rebuilt in {duration:.2f}s"
+            )
+        )
@@ -0,0 +1,40 @@
+"""Release Stock Holds Command
+
+This command gives back to the available stock the quantities held by the
+cart lines whose hold has expired, --batch-size lines per transaction. The
+lines stay in the carts. It is meant to run every minute or so from a
+scheduler. With --recount the stock counters of all the products are
+computed again from their stock and the holds, after the stock or the carts
+were changed by hand.
+
+    python manage.py release_stock_holds --batch-size 1000
+"""
+
+# pylint: disable=no-member
+
+import time
+from django.core.management.base import BaseCommand, CommandError
+from authentication.inventory import release_expired_holds, sync_counters
+
+
+class Command(BaseCommand):
+    """Release the expired stock holds"""
+
+    help = "Give back the stock held by the expired cart holds."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--recount", action="store_true")
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("The batch size must be a positive number")
+
+        start = time.perf_counter()
+        released = release_expired_holds(options["batch_size"])
+        if options["recount"]:
+            sync_counters()
+        duration = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(f"{released} holds released in {duration:.2f}s")
+        )
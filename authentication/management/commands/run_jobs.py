@@ -0,0 +1,74 @@
+"""Run Jobs Command
+
+This command runs the background jobs enqueued by the views, like the
+confirmation emails and the stock alerts of the orders, in a pool of
+--threads threads. The queue is polled every --poll-interval seconds when it
+is empty and the throughput of the worker is written every
+--report-interval seconds. With --once the command stops when the queue is
+empty. The jobs done more than --keep-days days ago are deleted when the
+command starts.
+
+    python manage.py run_jobs --threads 4 --report-interval 60
+"""
+
+import threading
+import time
+from django.core.management.base import BaseCommand, CommandError
+from authentication.jobs import JobWorker, purge_jobs
+
+
+class Command(BaseCommand):
+    """Run the background jobs"""
+
+    help = "Run the background jobs enqueued by the views."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=4)
+        parser.add_argument("--batch-size", type=int)
+        parser.add_argument("--poll-interval", type=float, default=1.0)
+        parser.add_argument("--report-interval", type=float, default=60.0)
+        parser.add_argument("--keep-days", type=int, default=7)
+        parser.add_argument("--once", action="store_true")
+
+    def handle(self, *args, **options):
+        if options["threads"] < 0:
+            raise CommandError("The number of threads can not be negative")
+        if options["batch_size"] is not None and options["batch_size"] < 1:
+            raise CommandError("The batch size must be a positive number")
+
+        worker = JobWorker(options["threads"], options["batch_size"])
+        stop = threading.Event()
+        reporter = threading.Thread(
+            target=self.report,
+            args=(worker, stop, options["report_interval"]),
+            daemon=True,
+        )
+        reporter.start()
+        try:
+            purge_jobs(options["keep_days"])
+            worker.work(options["poll_interval"], options["once"], stop)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            stop.set()
+            worker.close()
+        self.write_stats(worker)
+
+    def report(self, worker, stop, interval):
+        """Write the stats of the worker every interval seconds"""
+
+        while not stop.wait(interval):
+            self.write_stats(worker)
+
+    def write_stats(self, worker):
+        """Write the counters, the throughput and the percentiles"""
+
+        stats = worker.stats()
+        self.stdout.write(
+            f"{time.strftime('%H:%M:%S')} {stats['processed']} jobs: "
+            f"{stats['succeeded']} succeeded, {stats['retried']} retried, "
+            f"{stats['failed']} failed, {stats['throughput']:.1f} jobs/s, "
+            f"wait p50 {stats['wait_p50']:.0f}ms "
+            f"p95 {stats['wait_p95']:.0f}ms, "
+            f"run p50 {stats['run_p50']:.1f}ms p95 {stats['run_p95']:.1f}ms"
+        )
@@ -0,0 +1,47 @@
+"""Stripe Products Command
+
+This command splits the stock and sold counters of the given products into
+--stripes stripes before a flash sale, so their concurrent checkouts update
+different rows. --stripes 0 folds the stripes back into the products and
+removes them after the sale.
+
+    python manage.py stripe_products 12 42 --stripes 8
+"""
+
+# pylint: disable=no-member
+
+from django.core.management.base import BaseCommand, CommandError
+from authentication.models import Product
+from authentication.stripes import set_stripes
+
+
+class Command(BaseCommand):
+    """Split the stock counters of hot products into stripes"""
+
+    help = "Split the stock and sold of the products into stripes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("product_ids", nargs="+", type=int)
+        parser.add_argument("--stripes", type=int, default=8)
+
+    def handle(self, *args, **options):
+        if not 0 <= options["stripes"] <= 256:
+            raise CommandError("The number of stripes must be from 0 to 256")
+        product_ids = list(
+            Product.objects.filter(pk__in=options["product_ids"]).values_list(
+                "id", flat=True
+            )
+        )
+        missing = set(options["product_ids"]) - set(product_ids)
+        if missing:
+            raise CommandError(
+                "No product with the id "
+                + ", ".join(str(pk) for pk in sorted(missing))
+            )
+
+        updated = set_stripes(product_ids, options["stripes"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{updated} products set to {options['stripes']} stripes"
+            )
+        )
@@ -0,0 +1,166 @@
+"""API Metrics
+
+This file contains the in-process metrics of the API. The ApiMetricsMiddleware
+creates a RequestMetrics for every request: the queries of the request add
+their count and duration to it and the serializers add the time spent in
+to_representation through the TimedSerializerMixin. At the end of the request
+the metrics are recorded in the registry under the URL name of the view, the
+registry keeps the latest samples of every URL name to report percentiles.
+The queries are counted on the connections of the threads that run them
+with measure_queries, the async views run their queries in several threads.
+"""
+
+import contextlib
+import contextvars
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from django.conf import settings
+from django.db import connections
+
+current_metrics = contextvars.ContextVar("current_metrics", default=None)
+
+
+def percentile(durations, percent):
+    """Return the percentile of the durations with the nearest rank method"""
+
+    if not durations:
+        return 0
+    ordered = sorted(durations)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+class RequestMetrics:
+    """Request Metrics
+
+    This class is used to collect the number of queries, the time spent in
+    the database and the time spent in the serializers during a request. The
+    times are in milliseconds.
+    """
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+        self._lock = threading.Lock()
+
+    # pylint: disable=too-many-arguments
+    def __call__(self, execute, sql, params, many, context):
+        """Execute wrapper of the database connections"""
+
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self.queries += 1
+                self.db_time += duration
+
+
+@contextlib.contextmanager
+def measure_queries(metrics):
+    """Add the queries of the connections of the current thread made inside
+    the block to the metrics, nothing is measured when metrics is None.
+    """
+
+    with contextlib.ExitStack() as stack:
+        if metrics is not None:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(metrics))
+        yield
+
+
+class TimedSerializerMixin:
+    """Timed Serializer Mixin
+
+    This mixin is used to add the time spent in to_representation to the
+    metrics of the current request. The nested serializers are counted once
+    as a part of their parent.
+    """
+
+    # pylint: disable=too-few-public-methods
+
+    def to_representation(self, instance):
+        """Representation of the instance, timed for the outer serializer"""
+
+        metrics = current_metrics.get()
+        if metrics is None or metrics.serializer_depth:
+            return super().to_representation(instance)
+
+        metrics.serializer_depth += 1
+        start = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metrics.serializer_time += (time.perf_counter() - start) * 1000
+            metrics.serializer_depth -= 1
+
+
+class MetricsRegistry:
+    """Metrics Registry
+
+    This class is used to keep the latest max_samples samples of every URL
+    name and to report their percentiles. It is shared by the threads of the
+    process.
+    """
+
+    fields = ("latency", "db_time", "serializer_time", "queries")
+
+    def __init__(self, max_samples):
+        self.max_samples = max_samples
+        self._samples = defaultdict(self._new_samples)
+        self._lock = threading.Lock()
+
+    def _new_samples(self):
+        return {field: deque(maxlen=self.max_samples) for field in self.fields}
+
+    def record(self, name, latency, metrics):
+        """Record the sample of a request"""
+
+        with self._lock:
+            samples = self._samples[name]
+            samples["latency"].append(latency)
+            samples["db_time"].append(metrics.db_time)
+            samples["serializer_time"].append(metrics.serializer_time)
+            samples["queries"].append(metrics.queries)
+
+    def report(self):
+        """Return the count, p50, p95, p99 and max of every field of every
+        URL name.
+        """
+
+        with self._lock:
+            samples = {
+                name: {field: list(values) for field, values in fields.items()}
+                for name, fields in self._samples.items()
+            }
+        return {
+            name: {
+                "count": len(fields["latency"]),
+                **{
+                    field: {
+                        "p50": percentile(values, 50),
+                        "p95": percentile(values, 95),
+                        "p99": percentile(values, 99),
+                        "max": max(values, default=0),
+                    }
+                    for field, values in fields.items()
+                },
+            }
+            for name, fields in sorted(samples.items())
+        }
+
+    def clear(self):
+        """Remove all the samples"""
+
+        with self._lock:
+            self._samples.clear()
+
+
+registry = MetricsRegistry(settings.API_METRICS_MAX_SAMPLES)
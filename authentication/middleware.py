@@ -0,0 +1,98 @@
+"""Middleware of the authentication Application
+
+This file contains the ApiMetricsMiddleware. It is enabled with the
+API_METRICS_ENABLED setting and measures for every request the number of
+queries, the time spent in the database, the time spent in the serializers
+and the total latency. The measures are sent back in the Server-Timing header
+and recorded in the metrics registry under the URL name of the view, for
+example authentication:cart-view. The queries of a streaming response run
+after the middleware returns and are not counted.
+
+Under ASGI the middleware is async so the async views are not sent to a
+thread. The sync views of an ASGI request run in the thread of the request,
+the queries are counted on its connections and the async views count the
+queries of their own threads.
+"""
+
+# pylint: disable=protected-access
+
+import asyncio
+import contextlib
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from .metrics import (
+    RequestMetrics,
+    current_metrics,
+    measure_queries,
+    registry,
+)
+
+
+class ApiMetricsMiddleware:
+    """API Metrics Middleware
+
+    This middleware is used to measure the requests and record the measures
+    in the metrics registry. It is removed from the middleware chain when the
+    API_METRICS_ENABLED setting is off.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.API_METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Mark the instance as a coroutine function like MiddlewareMixin
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        start = time.perf_counter()
+        try:
+            with measure_queries(metrics):
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.record(request, response, metrics, start)
+
+    async def __acall__(self, request):
+        """Measure an ASGI request"""
+
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        start = time.perf_counter()
+        stack = contextlib.ExitStack()
+        try:
+            # The wrappers are added to the connections of the request thread
+            await sync_to_async(stack.enter_context)(measure_queries(metrics))
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        finally:
+            current_metrics.reset(token)
+        return self.record(request, response, metrics, start)
+
+    @staticmethod
+    def record(request, response, metrics, start):
+        """Record the measures of the request and add them to the response"""
+
+        latency = (time.perf_counter() - start) * 1000
+        match = request.resolver_match
+        registry.record(
+            match.view_name if match else "unresolved", latency, metrics
+        )
+        response["Server-Timing"] = (
+            f'db;dur={metrics.db_time:.2f};desc="{metrics.queries} queries", '
+            f"serializer;dur={metrics.serializer_time:.2f}, "
+            f"total;dur={latency:.2f}"
+        )
+        return response
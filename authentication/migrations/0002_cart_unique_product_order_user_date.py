@@ -0,0 +1,37 @@
+# Generated by Django 4.0.6 on 2026-10-18 06:10
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def remove_duplicate_cart_lines(apps, schema_editor):
+    """Keep only the latest cart line of every user and product"""
+
+    cart = apps.get_model('authentication', 'Cart')
+    latest = (
+        cart.objects.values('user', 'product')
+        .annotate(latest=Max('id'))
+        .values_list('latest', flat=True)
+    )
+    cart.objects.exclude(id__in=list(latest)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            remove_duplicate_cart_lines, migrations.RunPython.noop
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'date_created'], name='order_user_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='cart',
+            constraint=models.UniqueConstraint(fields=('user', 'product'), name='unique_cart_product'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.0.6 on 2026-10-18 06:40
+
+from django.db import migrations
+
+SEARCH_TABLE = 'authentication_product_search'
+POSTGRES_INDEX = 'product_search_idx'
+# The expression of authentication.search.POSTGRES_VECTOR until 0010
+POSTGRES_VECTOR = (
+    "to_tsvector('english', coalesce(name, '') || ' ' || "
+    "coalesce(description, ''))"
+)
+
+
+def create_search_index(apps, schema_editor):
+    """Create the FTS5 table of the products on SQLite or the GIN index of
+    their tsvector on PostgreSQL. The other databases have no index.
+    """
+
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE ' + SEARCH_TABLE + ' USING fts5('
+            "name, description, tokenize = 'porter unicode61')"
+        )
+        schema_editor.execute(
+            'INSERT INTO ' + SEARCH_TABLE + '(rowid, name, description) '
+            "SELECT id, name, coalesce(description, '') "
+            'FROM authentication_product'
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX ' + POSTGRES_INDEX + ' ON authentication_product '
+            'USING GIN (' + POSTGRES_VECTOR + ')'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    """Drop the FTS5 table or the GIN index"""
+
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE ' + SEARCH_TABLE)
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX ' + POSTGRES_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0002_cart_unique_product_order_user_date'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.0.6 on 2026-10-18 07:05
+
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def fill_slugs(apps, schema_editor):
+    """Make the slugs of the existing categories from their names"""
+
+    Category = apps.get_model('authentication', 'Category')
+    taken = set()
+    categories = list(Category.objects.order_by('id'))
+    for category in categories:
+        base = slugify(category.name) or 'category'
+        slug, number = base, 1
+        while slug in taken:
+            number += 1
+            slug = base + '-' + str(number)
+        taken.add(slug)
+        category.slug = slug
+    Category.objects.bulk_update(categories, ['slug'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0004_product_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='slug',
+            # Not indexed until it is unique, PostgreSQL would get the
+            # varchar_pattern_ops index of the slug twice
+            field=models.SlugField(
+                blank=True, db_index=False, default='', max_length=60
+            ),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_slugs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='category',
+            name='slug',
+            field=models.SlugField(blank=True, max_length=60, unique=True),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.0.6 on 2026-10-18 07:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_counters(apps, schema_editor):
+    """Make the counters of the existing products, nothing is held yet"""
+
+    Product = apps.get_model('authentication', 'Product')
+    StockCounter = apps.get_model('authentication', 'StockCounter')
+    StockCounter.objects.bulk_create(
+        (
+            StockCounter(product_id=pk, available=stock)
+            for pk, stock in Product.objects.values_list('id', 'stock')
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0007_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockCounter',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stock_counter', serialize=False, to='authentication.product')),
+                ('available', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='reserved',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='reserved_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='cart',
+            index=models.Index(fields=['reserved_until'], name='cart_hold_idx'),
+        ),
+        migrations.RunPython(create_counters, migrations.RunPython.noop),
+    ]
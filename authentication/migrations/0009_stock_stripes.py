@@ -0,0 +1,33 @@
+# Generated by Django 4.0.6 on 2026-10-18 07:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0008_stock_holds'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='stripe_count',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='ProductStripe',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stripe', models.PositiveSmallIntegerField()),
+                ('stock', models.IntegerField(default=0)),
+                ('sold', models.IntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stripes', to='authentication.product')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='productstripe',
+            constraint=models.UniqueConstraint(fields=('product', 'stripe'), name='unique_product_stripe'),
+        ),
+    ]
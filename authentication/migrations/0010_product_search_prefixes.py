@@ -0,0 +1,65 @@
+# Generated by Django 4.0.6 on 2026-10-18 09:02
+
+from django.db import migrations
+
+SEARCH_TABLE = 'authentication_product_search'
+POSTGRES_INDEX = 'product_search_idx'
+# The stemmed index of 0003 and the unstemmed one of
+# authentication.search.POSTGRES_VECTOR
+POSTGRES_VECTORS = {
+    'english': (
+        "to_tsvector('english', coalesce(name, '') || ' ' || "
+        "coalesce(description, ''))"
+    ),
+    'simple': (
+        "to_tsvector('simple', coalesce(name, '') || ' ' || "
+        "coalesce(description, ''))"
+    ),
+}
+
+
+def rebuild_search_index(schema_editor, tokenize, config):
+    """Create the FTS5 table of the products again with the tokenizer on
+    SQLite or the GIN index with the text search configuration on
+    PostgreSQL.
+    """
+
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE ' + SEARCH_TABLE)
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE ' + SEARCH_TABLE + ' USING fts5('
+            "name, description, tokenize = '" + tokenize + "')"
+        )
+        schema_editor.execute(
+            'INSERT INTO ' + SEARCH_TABLE + '(rowid, name, description) '
+            "SELECT id, name, coalesce(description, '') "
+            'FROM authentication_product'
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX ' + POSTGRES_INDEX)
+        schema_editor.execute(
+            'CREATE INDEX ' + POSTGRES_INDEX + ' ON authentication_product '
+            'USING GIN (' + POSTGRES_VECTORS[config] + ')'
+        )
+
+
+def unstemmed_index(apps, schema_editor):
+    """Index the words as they are so the prefixes of the words match"""
+    rebuild_search_index(schema_editor, 'unicode61', 'simple')
+
+
+def stemmed_index(apps, schema_editor):
+    """Index the stems of the words like 0003"""
+    rebuild_search_index(schema_editor, 'porter unicode61', 'english')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0009_stock_stripes'),
+    ]
+
+    operations = [
+        migrations.RunPython(unstemmed_index, stemmed_index),
+    ]
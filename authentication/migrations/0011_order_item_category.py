@@ -0,0 +1,39 @@
+# Generated by Django 4.0.6 on 2026-10-18 09:40
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def copy_product_categories(apps, schema_editor):
+    """Give the existing order items the current category of their product,
+    the category they were ordered in is not known anymore.
+    """
+
+    OrderItem = apps.get_model('authentication', 'OrderItem')
+    Product = apps.get_model('authentication', 'Product')
+    OrderItem.objects.update(
+        category_id=Subquery(
+            Product.objects.filter(pk=OuterRef('product_id')).values(
+                'category_id'
+            )[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0010_product_search_prefixes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='category',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='authentication.category'),
+        ),
+        migrations.RunPython(
+            copy_product_categories, migrations.RunPython.noop
+        ),
+    ]
@@ -6,12 +6,17 @@ update and delete a user. This model inherits from the AbstractUser. This is
 extend-user model. All the built-in fields are inherited.The Product model is
 used to create a new product. It is also used to update and delete a product.
 This model inherits from the models.Model. This file is also includes the model
-for the Order and Cart
+for the Order and Cart, the stock counters and stripes, the daily sales
+rollups of the products and the categories and the background jobs.
 """
 
 import datetime
 from django.db import models
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
+from django.utils.text import slugify
 
 
 class User(AbstractUser):
@@ -33,20 +38,50 @@ class User(AbstractUser):
     address = models.CharField(max_length=200, blank=True)
 
 
+def unique_slug(name, taken):
+    """Return the slug of the name, a number is appended when the slug is
+    one of the taken slugs.
+    """
+
+    base = slugify(name) or "category"
+    slug, number = base, 1
+    while slug in taken:
+        number += 1
+        slug = base + "-" + str(number)
+    return slug
+
+
 class Category(models.Model):
     """Category Model
     This is the category model for the authentication app. The category model
     is used to map the category to the database. This model is used to create,
-    update and delete a category.
+    update and delete a category. The slug is made from the name when the
+    category is created, it is used in the URLs of the category.
     """
 
     name = models.CharField(max_length=50, unique=True, blank=False)
+    slug = models.SlugField(max_length=60, unique=True, blank=True)
 
     # pylint: disable=too-few-public-methods
     class Meta:
         """Meta class"""
         ordering = ["name"]
 
+    def save(self, *args, **kwargs):
+        """Make the slug of a new category from its name"""
+
+        # pylint: disable=no-member
+        if not self.slug:
+            self.slug = unique_slug(
+                self.name,
+                set(
+                    Category.objects.filter(
+                        slug__startswith=slugify(self.name) or "category"
+                    ).values_list("slug", flat=True)
+                ),
+            )
+        super().save(*args, **kwargs)
+
 
 class Product(models.Model):
     """Product Model
@@ -56,6 +91,8 @@ class Product(models.Model):
     update and delete a product. In this model we used the foreign key to map
     the category to the product.
     In this model we used the fields stock and sold to keep track of the stock.
+    The stock and sold of a hot product can be split into stripe_count
+    ProductStripe rows.
 
     """
 
@@ -69,6 +106,42 @@ class Product(models.Model):
     description = models.CharField(
         max_length=250, default="", blank=True, null=True
     )
+    stripe_count = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    # pylint: disable=too-few-public-methods
+    class Meta:
+        """Meta class"""
+        indexes = [
+            models.Index(fields=["price", "id"], name="product_price_idx"),
+            models.Index(fields=["sold", "id"], name="product_sold_idx"),
+            models.Index(fields=["stock"], name="product_stock_idx"),
+        ]
+
+
+class ProductStripe(models.Model):
+    """ProductStripe Model
+
+    The ProductStripe model is used to keep a part of the changes of the
+    stock and sold of a striped product. The checkouts of the product add
+    their quantities to a random stripe instead of the product row and the
+    stripes are folded back into the product periodically.
+    """
+
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="stripes"
+    )
+    stripe = models.PositiveSmallIntegerField()
+    stock = models.IntegerField(default=0)
+    sold = models.IntegerField(default=0)
+
+    # pylint: disable=too-few-public-methods
+    class Meta:
+        """Meta class"""
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "stripe"], name="unique_product_stripe"
+            ),
+        ]
 
 
 class Order(models.Model):
@@ -76,7 +149,8 @@ class Order(models.Model):
 
     The Order model is used to map the order to the database. This model is
     used to create, update and delete a order. In this model we used the
-    foreign key to map the user to the order.
+    foreign key to map the user to the order. sales_recorded is set once the
+    sales of the order are added to the daily sales rollups.
     """
 
     user = models.ForeignKey(User, on_delete=models.DO_NOTHING)
@@ -84,6 +158,16 @@ class Order(models.Model):
     address = models.CharField(max_length=50, default="", blank=True)
     phone = models.CharField(max_length=50, default="", blank=True)
     date_created = models.DateField(default=datetime.datetime.today)
+    sales_recorded = models.BooleanField(default=False, editable=False)
+
+    # pylint: disable=too-few-public-methods
+    class Meta:
+        """Meta class"""
+        indexes = [
+            models.Index(
+                fields=["user", "date_created"], name="order_user_date_idx"
+            ),
+        ]
 
 
 class OrderItem(models.Model):
@@ -92,26 +176,171 @@ class OrderItem(models.Model):
     The OrderItem model is used to map the order item to the database. This
     model is used to create, update and delete a order item. In this model we
     used the foreign key to map the order to the order item. And we used the
-    foreign key to map the product to the order item.
+    foreign key to map the product to the order item. The category is the
+    category of the product when it was ordered, the sales of a category
+    stay in it when the product moves to another category.
     """
 
     order = models.ForeignKey(Order, on_delete=models.PROTECT)
     product = models.ForeignKey(Product, on_delete=models.PROTECT)
+    category = models.ForeignKey(
+        Category, on_delete=models.SET_NULL, blank=True, null=True
+    )
     quantity = models.IntegerField(default=0)
     price = models.IntegerField(default=0)
     date_created = models.DateField(default=datetime.datetime.today)
 
 
+class ProductDailySales(models.Model):
+    """ProductDailySales Model
+
+    The ProductDailySales model is used to keep the number of units sold and
+    the revenue of a product for a day. The rows are updated by the checkout,
+    so the sales of a period are read without scanning the order items.
+    """
+
+    date = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    units = models.IntegerField(default=0)
+    revenue = models.IntegerField(default=0)
+
+    # pylint: disable=too-few-public-methods
+    class Meta:
+        """Meta class"""
+        constraints = [
+            models.UniqueConstraint(
+                fields=["date", "product"], name="unique_product_sales_day"
+            ),
+        ]
+
+
+class CategoryDailySales(models.Model):
+    """CategoryDailySales Model
+
+    The CategoryDailySales model is used to keep the number of units sold
+    and the revenue of a category for a day. The rows are updated by the
+    checkout with the rows of the products.
+    """
+
+    date = models.DateField()
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    units = models.IntegerField(default=0)
+    revenue = models.IntegerField(default=0)
+
+    # pylint: disable=too-few-public-methods
+    class Meta:
+        """Meta class"""
+        constraints = [
+            models.UniqueConstraint(
+                fields=["date", "category"], name="unique_category_sales_day"
+            ),
+        ]
+
+
+class CartQuerySet(models.QuerySet):
+    """Cart QuerySet
+
+    This queryset is used to add the summary of the cart lines to the
+    manager of the Cart model.
+    """
+
+    def summary(self):
+        """Return the number of lines, the quantity of the products and the
+        total price of the cart lines with a single aggregate query.
+        """
+
+        return self.aggregate(
+            count=Count("id"),
+            quantity=Coalesce(Sum("quantity"), 0),
+            total=Coalesce(Sum("price"), 0),
+        )
+
+
 class Cart(models.Model):
     """Cart Model
 
     The Cart model is used to map the cart to the database. This model is used
     to create, update and delete a cart. In this model we used the foreign key
     to map the user to the cart. And we used the foreign key to map the product
-    to the cart.
+    to the cart. A product can be only once in the cart of a user. The
+    reserved quantity of the line is held out of the available stock of the
+    product until reserved_until.
     """
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, blank=False)
     product = models.ForeignKey(Product, on_delete=models.PROTECT, blank=False)
     quantity = models.IntegerField(default=1)
     price = models.IntegerField(default=0)
+    reserved = models.IntegerField(default=0)
+    reserved_until = models.DateTimeField(null=True, blank=True)
+
+    objects = CartQuerySet.as_manager()
+
+    # pylint: disable=too-few-public-methods
+    class Meta:
+        """Meta class"""
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "product"], name="unique_cart_product"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["reserved_until"], name="cart_hold_idx"),
+        ]
+
+
+class StockCounter(models.Model):
+    """StockCounter Model
+
+    The StockCounter model is used to keep the available stock of a product:
+    its stock minus the quantities held by the cart lines. The counters are
+    kept out of the product rows so holding stock does not lock the rows read
+    by the catalog.
+    """
+
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stock_counter",
+    )
+    available = models.IntegerField(default=0)
+
+
+class Job(models.Model):
+    """Job Model
+
+    The Job model is used to keep the jobs that run after a request, off its
+    path, like the confirmation email of an order. The jobs are claimed by
+    the run_jobs worker in the order of their run_at time, a failed job is
+    given a later run_at time to be retried.
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUSES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    name = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    attempts = models.IntegerField(default=0)
+    run_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    claimed_by = models.CharField(max_length=32, default="", blank=True)
+    last_error = models.TextField(default="", blank=True)
+
+    # pylint: disable=too-few-public-methods
+    class Meta:
+        """Meta class"""
+        indexes = [
+            models.Index(fields=["status", "run_at"], name="job_status_idx"),
+        ]
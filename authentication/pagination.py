@@ -0,0 +1,40 @@
+"""Pagination for the authentication Application
+
+This file contains the pagination classes of the authentication Application.
+The IdCursorPagination is a keyset pagination: every page is fetched with an
+indexed "id > cursor" filter and a LIMIT, so a deep page costs the same as the
+first one and the full table is never loaded in memory. The search results
+are ordered by rank, not by a column, so they are paginated with a limit and
+an offset by the SearchPagination. The page size and the largest page size a
+client may ask for are read from the settings.
+"""
+
+from django.conf import settings
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+
+
+class IdCursorPagination(CursorPagination):
+    """Id Cursor Pagination
+
+    This class is used to paginate the products and the order items by their
+    primary key. The client can change the page size with the page_size query
+    parameter up to the PAGINATION_MAX_PAGE_SIZE setting and moves between the
+    pages with the next and previous links of the response.
+    """
+
+    ordering = "id"
+    page_size = settings.PAGINATION_PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = settings.PAGINATION_MAX_PAGE_SIZE
+
+
+class SearchPagination(LimitOffsetPagination):
+    """Search Pagination
+
+    This class is used to paginate the ranked search results with the limit
+    and offset query parameters. The limit can not be greater than the
+    PAGINATION_MAX_PAGE_SIZE setting.
+    """
+
+    default_limit = settings.PAGINATION_PAGE_SIZE
+    max_limit = settings.PAGINATION_MAX_PAGE_SIZE
@@ -0,0 +1,147 @@
+"""Report Views of the authentication Application
+
+This file contains the views reserved to the superusers that report on the
+shop and on the current process: the daily sales of the products and of the
+categories, the hits and misses of the catalog cache, the background job
+queue and the API metrics. The sales reports read the daily sales rollups
+from the replica when there is one.
+"""
+
+# pylint: disable=no-member,too-many-ancestors
+
+from rest_framework import generics, status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from .authentication import CachedJWTAuthentication
+from .cache import catalog_cache
+from .jobs import queue_stats
+from .metrics import registry
+from .models import CategoryDailySales, ProductDailySales
+from .pagination import IdCursorPagination
+from .serializers import (
+    CategorySalesSerializer,
+    ProductSalesSerializer,
+    SalesPeriodSerializer,
+)
+from .views import IsSuperUser, ReplicaReadMixin
+
+
+class CatalogCacheStatsView(generics.GenericAPIView):
+    """Catalog Cache Stats View
+
+    This view is used to retrieve the number of hits and misses of the
+    catalog cache in the current process. Only superusers are allowed to
+    perform this action.
+    """
+
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated, IsSuperUser]
+
+    # pylint: disable=unused-argument
+    def get(self, request):
+        """Return the hits, misses and hit ratio of the catalog cache"""
+        return Response(catalog_cache.stats(), status=status.HTTP_200_OK)
+
+
+class JobStatsView(generics.GenericAPIView):
+    """Job Stats View
+
+    This view is used to retrieve the number of background jobs by status
+    and the age in seconds of the oldest pending job. Only superusers are
+    allowed to perform this action.
+    """
+
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated, IsSuperUser]
+
+    # pylint: disable=unused-argument
+    def get(self, request):
+        """Return the number of jobs by status and the lag of the queue"""
+        return Response(queue_stats(), status=status.HTTP_200_OK)
+
+
+class ApiMetricsView(generics.GenericAPIView):
+    """API Metrics View
+
+    This view is used to retrieve the percentiles of the latency, database
+    time, serializer time and number of queries of every endpoint measured
+    by the metrics middleware in the current process. The DELETE method
+    clears the metrics. Only superusers are allowed to perform these
+    actions.
+    """
+
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated, IsSuperUser]
+
+    # pylint: disable=unused-argument
+    def get(self, request):
+        """Return the metrics of every endpoint"""
+        return Response(registry.report(), status=status.HTTP_200_OK)
+
+    def delete(self, request):
+        """Clear the metrics"""
+
+        registry.clear()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class SalesReportMixin(ReplicaReadMixin):
+    """Sales Report Mixin
+
+    This mixin is used by the sales reports. The reports read the daily
+    sales rollups of the period given by the start and end query parameters,
+    so they do not depend on the number of orders. Only superusers are
+    allowed to read them.
+    """
+
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated, IsSuperUser]
+
+    def get_period(self):
+        """Return the validated start and end dates of the report"""
+
+        serializer = SalesPeriodSerializer(data=self.request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+
+class ProductSalesView(SalesReportMixin, generics.ListAPIView):
+    """Product Sales View
+
+    This view is used to retrieve the units sold and the revenue of every
+    product for every day of a period. The rows are returned page by page
+    with a cursor.
+    """
+
+    serializer_class = ProductSalesSerializer
+    pagination_class = IdCursorPagination
+
+    def get_queryset(self):
+        """Return the product rollups of the period"""
+
+        period = self.get_period()
+        return ProductDailySales.objects.filter(
+            date__range=(period["start"], period["end"])
+        ).select_related("product")
+
+
+class CategorySalesView(SalesReportMixin, generics.ListAPIView):
+    """Category Sales View
+
+    This view is used to retrieve the units sold and the revenue of every
+    category for every day of a period, ordered by date and category name.
+    """
+
+    serializer_class = CategorySalesSerializer
+
+    def get_queryset(self):
+        """Return the category rollups of the period"""
+
+        period = self.get_period()
+        return (
+            CategoryDailySales.objects.filter(
+                date__range=(period["start"], period["end"])
+            )
+            .select_related("category")
+            .order_by("date", "category__name")
+        )
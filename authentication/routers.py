@@ -0,0 +1,66 @@
+"""Database Router
+
+This file contains the database router of the project. All the queries go
+to the primary database except the reads of the read-only endpoints: the
+ReplicaReadMixin of the views marks their safe requests with replica_reads
+and the router sends the reads made inside it to the replica database, when
+a replica is configured. The writes and the migrations always go to the
+primary database, and so do the reads made inside a transaction of the
+primary database so a transaction reads its own writes.
+"""
+
+import contextlib
+import contextvars
+from django.db import connections
+
+REPLICA_DATABASE = "replica"
+
+read_from_replica = contextvars.ContextVar("read_from_replica", default=False)
+
+
+@contextlib.contextmanager
+def replica_reads():
+    """Send the reads made inside the block to the replica"""
+
+    token = read_from_replica.set(True)
+    try:
+        yield
+    finally:
+        read_from_replica.reset(token)
+
+
+class ReplicaRouter:
+    """Replica Router
+
+    This router is used to send the reads of the replica_reads blocks to the
+    replica database. It does nothing when there is no replica.
+    """
+
+    @staticmethod
+    def has_replica():
+        """Return whether a replica database is configured"""
+        return REPLICA_DATABASE in connections.settings
+
+    # pylint: disable=unused-argument
+    def db_for_read(self, model, **hints):
+        """Read from the replica inside a replica_reads block"""
+
+        if (
+            read_from_replica.get()
+            and self.has_replica()
+            and not connections["default"].in_atomic_block
+        ):
+            return REPLICA_DATABASE
+        return None
+
+    def db_for_write(self, model, **hints):
+        """Always write to the primary database"""
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """The replica holds the same rows as the primary database"""
+        return True
+
+    def allow_migrate(self, database, app_label, model_name=None, **hints):
+        """The replica is migrated by the replication of the primary"""
+        return database != REPLICA_DATABASE
@@ -0,0 +1,239 @@
+"""Product Search
+
+This file contains the full-text search of the products over their name and
+description. On SQLite the products are copied in the FTS5 virtual table
+authentication_product_search whose rowid is the id of the product, the
+signals and the catalog importer keep it in sync. On PostgreSQL a GIN index
+on the tsvector of the name and the description is maintained by the
+database itself. The matches are ranked with bm25 on SQLite and ts_rank on
+PostgreSQL, a match in the name weighs more than a match in the
+description. The other databases fall back to a scan of the products.
+
+Every word of the query must match the start of a word of the product, so
+"run sho" and "runni" find the "Running shoes". The words are indexed as
+they are, without stemming, because the stem of a word is not always a
+prefix of the word: "running" is indexed as "run" by a stemmer and the
+prefix "runni" would not match it.
+"""
+
+# pylint: disable=no-member,protected-access
+
+import re
+from django.db import connections, router
+from django.db.models import Q
+from .models import Product
+
+SEARCH_TABLE = "authentication_product_search"
+PRODUCT_TABLE = Product._meta.db_table
+# The words of the query are matched as prefixes, at most MAX_TERMS of them
+MAX_TERMS = 8
+# The ids are sent to SQLite in batches under its limit of parameters
+BATCH_SIZE = 500
+# The expression of the GIN index of the migration, the queries must use the
+# same expression to use the index
+POSTGRES_VECTOR = (
+    "to_tsvector('simple', coalesce(name, '') || ' ' || "
+    "coalesce(description, ''))"
+)
+
+
+def search_terms(query):
+    """Return the words of a query, they are safe to quote in SQL"""
+    return re.findall(r"\w+", query.lower())[:MAX_TERMS]
+
+
+def _batches(ids):
+    """Split the ids into lists of BATCH_SIZE ids"""
+
+    ids = list(ids)
+    for start in range(0, len(ids), BATCH_SIZE):
+        yield ids[start:start + BATCH_SIZE]
+
+
+class ScanSearchBackend:
+    """Scan Search Backend
+
+    This backend is used for the databases without full-text index. Every
+    word must be in the name or in the description of the product, the
+    products are ordered by id.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def filter(self, terms):
+        """Return the products matching all the terms"""
+
+        condition = Q()
+        for term in terms:
+            condition &= Q(name__icontains=term) | Q(
+                description__icontains=term
+            )
+        return Product.objects.using(self.connection.alias).filter(condition)
+
+    def count(self, terms):
+        """Return the number of matching products"""
+        return self.filter(terms).count()
+
+    def ranked_ids(self, terms, limit, offset):
+        """Return the ids of a page of matching products by rank"""
+
+        return list(
+            self.filter(terms)
+            .order_by("id")
+            .values_list("id", flat=True)[offset:offset + limit]
+        )
+
+    def add(self, ids):
+        """Add the new products with the ids to the index, nothing to do
+        without index.
+        """
+
+    def index(self, ids):
+        """Replace the products with the ids in the index"""
+
+        self.remove(ids)
+        self.add(ids)
+
+    def remove(self, ids):
+        """Remove the products with the ids from the index"""
+
+
+class SQLiteSearchBackend(ScanSearchBackend):
+    """SQLite Search Backend
+
+    This backend is used to search the FTS5 table of the products. The name
+    is weighted 10 times the description by bm25.
+    """
+
+    @staticmethod
+    def match(terms):
+        """Return the FTS5 query of the terms, every term is a prefix"""
+        return " ".join('"' + term + '"*' for term in terms)
+
+    def count(self, terms):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT count(*) FROM " + SEARCH_TABLE + " WHERE "
+                + SEARCH_TABLE + " MATCH %s",
+                [self.match(terms)],
+            )
+            return cursor.fetchone()[0]
+
+    def ranked_ids(self, terms, limit, offset):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT rowid FROM " + SEARCH_TABLE + " WHERE "
+                + SEARCH_TABLE + " MATCH %s ORDER BY bm25("
+                + SEARCH_TABLE + ", 10.0, 1.0), rowid LIMIT %s OFFSET %s",
+                [self.match(terms), limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def add(self, ids):
+        """Copy the name and the description of the products in the FTS5
+        table.
+        """
+
+        with self.connection.cursor() as cursor:
+            for batch in _batches(ids):
+                cursor.execute(
+                    "INSERT INTO " + SEARCH_TABLE + "(rowid, name, "
+                    "description) SELECT id, name, coalesce(description, "
+                    "'') FROM " + PRODUCT_TABLE + " WHERE id IN ("
+                    + ", ".join(["%s"] * len(batch)) + ")",
+                    batch,
+                )
+
+    def remove(self, ids):
+        with self.connection.cursor() as cursor:
+            for batch in _batches(ids):
+                cursor.execute(
+                    "DELETE FROM " + SEARCH_TABLE + " WHERE rowid IN ("
+                    + ", ".join(["%s"] * len(batch)) + ")",
+                    batch,
+                )
+
+
+class PostgreSQLSearchBackend(ScanSearchBackend):
+    """PostgreSQL Search Backend
+
+    This backend is used to search the products through the GIN index of
+    their tsvector. The index is maintained by PostgreSQL.
+    """
+
+    @staticmethod
+    def tsquery(terms):
+        """Return the tsquery of the terms, every term is a prefix"""
+        return " & ".join(term + ":*" for term in terms)
+
+    def count(self, terms):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT count(*) FROM " + PRODUCT_TABLE + " WHERE "
+                + POSTGRES_VECTOR + " @@ to_tsquery('simple', %s)",
+                [self.tsquery(terms)],
+            )
+            return cursor.fetchone()[0]
+
+    def ranked_ids(self, terms, limit, offset):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT id FROM " + PRODUCT_TABLE + ", to_tsquery("
+                "'simple', %s) query WHERE " + POSTGRES_VECTOR
+                + " @@ query ORDER BY ts_rank(setweight(to_tsvector("
+                "'simple', name), 'A') || setweight(to_tsvector('simple', "
+                "coalesce(description, '')), 'B'), query) DESC, id "
+                "LIMIT %s OFFSET %s",
+                [self.tsquery(terms), limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+def search_backend(alias):
+    """Return the search backend of the database alias"""
+
+    connection = connections[alias]
+    if connection.vendor == "sqlite":
+        return SQLiteSearchBackend(connection)
+    if connection.vendor == "postgresql":
+        return PostgreSQLSearchBackend(connection)
+    return ScanSearchBackend(connection)
+
+
+class ProductSearch:
+    """Product Search
+
+    This class is used to give the ranked matches of a query to a paginator.
+    The matches are counted and fetched page by page only when the paginator
+    asks for them, a page is fetched with one query for the ranked ids and
+    one query for the products and their categories.
+    """
+
+    def __init__(self, query):
+        self.terms = search_terms(query)
+        self.alias = router.db_for_read(Product)
+        self.backend = search_backend(self.alias)
+
+    def count(self):
+        """Return the number of matching products"""
+        return self.backend.count(self.terms) if self.terms else 0
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item):
+        """Return the matching products of a slice by rank"""
+
+        if not isinstance(item, slice):
+            raise TypeError("ProductSearch only supports slices")
+        if not self.terms:
+            return []
+        offset = item.start or 0
+        ids = self.backend.ranked_ids(self.terms, item.stop - offset, offset)
+        products = (
+            Product.objects.using(self.alias)
+            .select_related("category")
+            .in_bulk(ids)
+        )
+        return [products[pk] for pk in ids if pk in products]
@@ -8,15 +8,33 @@ all the categories data into json format. The ProductSerializer is used to
 create the product and so on.
 """
 
+import datetime
+from functools import cached_property
 from rest_framework import serializers
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth.password_validation import validate_password
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
-from .models import Cart, Category, Order, OrderItem, Product, User
+from .metrics import TimedSerializerMixin
+from .models import (
+    Cart,
+    Category,
+    CategoryDailySales,
+    Order,
+    OrderItem,
+    Product,
+    ProductDailySales,
+    User,
+)
+from .stripes import attach_stripe_totals, current_counts, fold_stripes
+
+# The longest period of a sales report in days
+MAX_SALES_PERIOD = 366
 
 
 # pylint: disable=too-few-public-methods
-class UserRegisterSerializer(serializers.ModelSerializer):
+class UserRegisterSerializer(
+    TimedSerializerMixin, serializers.ModelSerializer
+):
     """User Register Serializer
 
     In this class we override the method creat to create extend user. The user
@@ -55,21 +73,20 @@ class UserRegisterSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         """Create the user
 
-        This method is used to create the user. The user is created using the
-        create method from the User model. The password is set using the
-        set_password method from the User model to encrypt the password. The
-        user is saved using the save method and returned. The user is also
-        saved in the database.
+        This method is used to create the user. The password is set using the
+        set_password method from the User model to encrypt the password before
+        the user is inserted, so the user is saved in the database with a
+        single query and returned.
         """
 
-        user = User.objects.create(username=validated_data["username"])
+        user = User(username=validated_data["username"])
         user.set_password(validated_data["password"])
         user.save()
         return user
 
 
 # pylint: disable=abstract-method
-class UserViewSerializer(serializers.ModelSerializer):
+class UserViewSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """User View Serializer
 
     This class is used to format the user data. The user data is returned in a
@@ -99,45 +116,74 @@ class CreateTokneSerialzer(TokenObtainPairSerializer):
     """Create Token Serializer
     This class is used to create the token. The token is created using the
     TokenObtainPairSerializer class. The token is returned in a json format.
-    In this class the default error message is overridden.
+    In this class the default error message is overridden and the token
+    carries the is_superuser and is_active claims of the user.
     """
 
     default_error_messages = {
                         'no_active_account': _('Invalid username/password.')
     }
 
+    @classmethod
+    def get_token(cls, user):
+        """Add the claims trusted by the stateless read requests"""
+
+        token = super().get_token(user)
+        token["is_superuser"] = user.is_superuser
+        token["is_active"] = user.is_active
+        return token
+
     def validate(self, attrs):
         data = super().validate(attrs)
         data["user_id"] = self.user.id
         return data
 
 
-class CategoryViewSerializer(serializers.ModelSerializer):
+class CategoryViewSerializer(
+    TimedSerializerMixin, serializers.ModelSerializer
+):
     """Category View Serializer
 
     This class is used to format the category data. The category data is
-    returned in a json format including the category id and name.
+    returned in a json format including the category id, name and slug.
     """
 
     class Meta:
         """Meta class for the Category View Serializer"""
 
         model = Category
-        fields = ["id", "name"]
+        fields = ["id", "name", "slug"]
+        read_only_fields = ["slug"]
+
 
+class StripeTotalsListSerializer(serializers.ListSerializer):
+    """Stripe Totals List Serializer
+
+    This class is used to load the stripes of all the striped products of a
+    list of rows with one query before the rows are formatted. The products
+    of the rows are returned by the products method of the child serializer.
+    """
 
-class ProductViewSerializer(serializers.ModelSerializer):
+    def to_representation(self, data):
+        rows = list(data.all() if hasattr(data, "all") else data)
+        attach_stripe_totals(self.child.products(rows))
+        return super().to_representation(rows)
+
+
+class ProductViewSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Product View Serializer
 
     This class is used to format the product data. The product data is
     returned in a json format including the product id, name, price, category,
-    stock, sold and description.
+    stock, sold and description. The stock and sold of a striped product
+    include its stripes.
     """
 
     class Meta:
         """Meta class for the ProductViewSerializer"""
 
         model = Product
+        list_serializer_class = StripeTotalsListSerializer
         fields = [
             "id",
             "name",
@@ -150,30 +196,64 @@ class ProductViewSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
-        representation["category"] = CategoryViewSerializer(
-            instance.category
-        ).data.get("name")
+        # The category is read from the already loaded relation, querysets
+        # should use select_related("category") to avoid a query per row.
+        representation["category"] = instance.category.name
+        if instance.stripe_count:
+            representation["stock"], representation["sold"] = current_counts(
+                instance
+            )
         return representation
 
+    @staticmethod
+    def products(rows):
+        """Return the products of the rows"""
+        return rows
+
+    def update(self, instance, validated_data):
+        if instance.stripe_count:
+            # The stripes are folded first so the saved stock and sold are
+            # the whole counts of the product
+            fold_stripes([instance.pk])
+            instance.refresh_from_db(fields=["stock", "sold"])
+        return super().update(instance, validated_data)
 
-class CartSerializer(serializers.ModelSerializer):
+
+class CartSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Cart Serializer
 
     This class is used to format the cart data. The cart data is returned in a
-    json format including the cart id, customer and products.
+    json format including the cart id, customer and products. The product is
+    validated with its category so the representation needs no more query.
     """
 
+    # pylint: disable=no-member
+    product = serializers.PrimaryKeyRelatedField(
+        queryset=Product.objects.select_related("category")
+    )
+
     class Meta:
         """Meta class for the Cart Serializer"""
 
         model = Cart
+        list_serializer_class = StripeTotalsListSerializer
         fields = ["user", "product", "quantity", "price"]
 
+    @staticmethod
+    def products(rows):
+        """Return the products of the rows"""
+        return [row.product for row in rows]
+
+    @cached_property
+    def product_serializer(self):
+        """Nested product serializer shared by all the rows"""
+        return ProductViewSerializer(context=self.context)
+
     def to_representation(self, instance):
         representation = super().to_representation(instance)
-        representation["product"] = ProductViewSerializer(
+        representation["product"] = self.product_serializer.to_representation(
             instance.product
-        ).data
+        )
         representation["user"] = {
             "id": instance.user.id,
             "name": instance.user.username,
@@ -181,7 +261,7 @@ class CartSerializer(serializers.ModelSerializer):
         return representation
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Order Serializer
 
     This class is used to format the order data. The order data is returned in
@@ -205,7 +285,7 @@ class OrderSerializer(serializers.ModelSerializer):
         return representation
 
 
-class OrderDetailSerializer(serializers.ModelSerializer):
+class OrderDetailSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Place Order Serializer
 
     This class is used to format the place order data. The place order data is
@@ -216,12 +296,139 @@ class OrderDetailSerializer(serializers.ModelSerializer):
         """Meta class for the OrderDetailSerializer"""
 
         model = OrderItem
+        list_serializer_class = StripeTotalsListSerializer
         fields = ["order", "product", "quantity", "price", "date_created"]
 
+    @staticmethod
+    def products(rows):
+        """Return the products of the rows"""
+        return [row.product for row in rows]
+
+    @cached_property
+    def order_serializer(self):
+        """Nested order serializer shared by all the rows"""
+        return OrderSerializer(context=self.context)
+
+    @cached_property
+    def product_serializer(self):
+        """Nested product serializer shared by all the rows"""
+        return ProductViewSerializer(context=self.context)
+
     def to_representation(self, instance):
         representation = super().to_representation(instance)
-        representation["order"] = OrderSerializer(instance.order).data
-        representation["product"] = ProductViewSerializer(
+        representation["order"] = self.order_serializer.to_representation(
+            instance.order
+        )
+        representation["product"] = self.product_serializer.to_representation(
             instance.product
-        ).data
+        )
         return representation
+
+
+class OrderItemSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Order Item Serializer
+
+    This class is used to format the items of an order. The item data is
+    returned in a json format including the product, quantity and price.
+    """
+
+    product = ProductViewSerializer(read_only=True)
+
+    class Meta:
+        """Meta class for the OrderItemSerializer"""
+
+        model = OrderItem
+        fields = ["product", "quantity", "price"]
+
+
+class OrderHistorySerializer(
+    TimedSerializerMixin, serializers.ModelSerializer
+):
+    """Order History Serializer
+
+    This class is used to format an order with its items. The order data is
+    returned once in a json format including the order id, price, address,
+    phone number, date_created and the items of the order. The items must be
+    prefetched with their products and categories.
+    """
+
+    items = OrderItemSerializer(
+        source="orderitem_set", many=True, read_only=True
+    )
+
+    class Meta:
+        """Meta class for the OrderHistorySerializer"""
+
+        model = Order
+        list_serializer_class = StripeTotalsListSerializer
+        fields = ["id", "price", "address", "phone", "date_created", "items"]
+
+    @staticmethod
+    def products(rows):
+        """Return the products of the items of the orders"""
+        return [
+            item.product for row in rows for item in row.orderitem_set.all()
+        ]
+
+
+class SalesPeriodSerializer(serializers.Serializer):
+    """Sales Period Serializer
+
+    This class is used to validate the start and end query parameters of a
+    sales report. The period ends today and lasts 30 days by default, it can
+    not be longer than MAX_SALES_PERIOD days.
+    """
+
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        """Fill the missing dates and check the length of the period"""
+
+        end = attrs.get("end") or datetime.date.today()
+        start = attrs.get("start") or end - datetime.timedelta(days=29)
+        if start > end:
+            raise serializers.ValidationError(
+                {"start": "The start must not be after the end."}
+            )
+        if (end - start).days >= MAX_SALES_PERIOD:
+            raise serializers.ValidationError(
+                {
+                    "start": "The period must not be longer than "
+                    + str(MAX_SALES_PERIOD)
+                    + " days."
+                }
+            )
+        return {"start": start, "end": end}
+
+
+class ProductSalesSerializer(serializers.ModelSerializer):
+    """Product Sales Serializer
+
+    This class is used to format the sales of a product for a day including
+    the date, the product id and name, the units sold and the revenue.
+    """
+
+    name = serializers.CharField(source="product.name", read_only=True)
+
+    class Meta:
+        """Meta class for the ProductSalesSerializer"""
+
+        model = ProductDailySales
+        fields = ["date", "product", "name", "units", "revenue"]
+
+
+class CategorySalesSerializer(serializers.ModelSerializer):
+    """Category Sales Serializer
+
+    This class is used to format the sales of a category for a day including
+    the date, the category id and name, the units sold and the revenue.
+    """
+
+    name = serializers.CharField(source="category.name", read_only=True)
+
+    class Meta:
+        """Meta class for the CategorySalesSerializer"""
+
+        model = CategoryDailySales
+        fields = ["date", "category", "name", "units", "revenue"]
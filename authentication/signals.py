@@ -0,0 +1,119 @@
+"""Signals of the authentication Application
+
+This file contains the signal receivers of the authentication Application.
+They invalidate the catalog cache whenever a product or a category is saved
+or deleted. The pre_save receiver remembers the category of the product
+before the update so the pages of the old category are invalidated as well.
+A saved or deleted category also invalidates the category map. The stock
+counter of a saved product is computed again from its stock and the holds
+of a deleted user are given back.
+The search receivers copy the saved products in the search index and
+remove the deleted ones from it. The connection_created receiver applies the
+SQLite profile of the settings to every new SQLite connection.
+"""
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+from .cache import catalog_cache
+from .categories import CATEGORIES_SCOPE
+from .inventory import release, sync_counters
+from .models import Cart, Category, Product, StockCounter, User
+from .search import search_backend
+
+
+# pylint: disable=no-member,unused-argument
+@receiver(pre_save, sender=Product)
+def remember_product_category(sender, instance, **kwargs):
+    """Remember the category of the product before the update"""
+
+    instance.previous_category_id = (
+        Product.objects.filter(pk=instance.pk)
+        .values_list("category_id", flat=True)
+        .first()
+        if instance.pk
+        else None
+    )
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product(sender, instance, **kwargs):
+    """Invalidate the cached product and the pages listing it"""
+
+    catalog_cache.invalidate_catalog(
+        [instance.pk],
+        {
+            instance.category_id,
+            getattr(instance, "previous_category_id", None),
+        },
+    )
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, created, using, **kwargs):
+    """Copy the product in the search index"""
+
+    backend = search_backend(using)
+    if created:
+        backend.add([instance.pk])
+    else:
+        backend.index([instance.pk])
+
+
+@receiver(post_save, sender=Product)
+def count_product_stock(sender, instance, created, **kwargs):
+    """Create the stock counter of a new product or compute the available
+    stock of the product again.
+    """
+
+    if created:
+        StockCounter.objects.create(product=instance, available=instance.stock)
+    else:
+        sync_counters([instance.pk])
+
+
+@receiver(pre_delete, sender=User)
+def release_user_holds(sender, instance, **kwargs):
+    """Give back the holds of the cart of the user before it is deleted"""
+    release(Cart.objects.filter(user=instance))
+
+
+@receiver(post_delete, sender=Product)
+def remove_product(sender, instance, using, **kwargs):
+    """Remove the product from the search index"""
+    search_backend(using).remove([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category(sender, instance, **kwargs):
+    """Invalidate the cached products of the category, the pages listing
+    them and the category map, the name of the category is a part of their
+    representation.
+    """
+
+    catalog_cache.invalidate_products(
+        Product.objects.filter(category=instance).values_list("pk", flat=True)
+    )
+    catalog_cache.invalidate_scopes(
+        "products", "category:" + str(instance.pk), CATEGORIES_SCOPE
+    )
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Execute the pragmas of SQLITE_PRAGMAS on a new SQLite connection"""
+
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            if value:
+                cursor.execute("PRAGMA " + name + " = " + str(value))
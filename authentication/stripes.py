@@ -0,0 +1,193 @@
+"""Striped Stock Counters
+
+This file contains the striped counters of the hot products. During a
+promotion every checkout of a product updates the same product row, so the
+checkouts of the product wait for the row lock of each other until they
+commit. The stock and sold counters of a product can be split into
+stripe_count ProductStripe rows: a checkout adds its quantities to a random
+stripe instead of the product row, so the concurrent checkouts mostly
+update different rows.
+
+The stock and sold of a striped product are the columns of the product plus
+the sums of its stripes, the serializers add the stripes when they format
+the product. fold_stripes adds the stripes back to the columns of the
+products, it is run periodically by the fold_stock_stripes command, so the
+filters and the ordering on the columns are only late by the time between
+two folds. A stripe can not check the stock of the product, the stock of a
+striped product is checked by its stock counter before the checkout (see
+inventory.py).
+
+SQLite locks the whole database for a write, the stripes only help on a
+database with row locks such as PostgreSQL.
+"""
+
+# pylint: disable=no-member
+
+import random
+from functools import partial
+from django.db import transaction
+from django.db.models import Case, F, Q, Sum, When
+from .cache import catalog_cache
+from .models import Product, ProductStripe
+
+
+def stripe_totals(product_ids):
+    """Return the sums of the stock and sold of the stripes of the products
+    as (stock, sold) by product id.
+    """
+
+    return {
+        row["product_id"]: (row["stock"], row["sold"])
+        for row in ProductStripe.objects.filter(product_id__in=product_ids)
+        .order_by()
+        .values("product_id")
+        .annotate(stock=Sum("stock"), sold=Sum("sold"))
+    }
+
+
+def attach_stripe_totals(products):
+    """Load the stripe totals of the striped products with one query"""
+
+    striped = [product for product in products if product.stripe_count]
+    if striped:
+        totals = stripe_totals([product.pk for product in striped])
+        for product in striped:
+            product.stripe_totals = totals.get(product.pk, (0, 0))
+
+
+def current_counts(product):
+    """Return the stock and sold of a product with its stripes"""
+
+    if not product.stripe_count:
+        return product.stock, product.sold
+    if not hasattr(product, "stripe_totals"):
+        attach_stripe_totals([product])
+    stock, sold = product.stripe_totals
+    return product.stock + stock, product.sold + sold
+
+
+def sell_from_stripes(quantities):
+    """Take the quantities sold from a random stripe of every product with
+    one UPDATE and return the number of updated stripes.
+
+    quantities is a dict of (quantity, stripe count) by product id.
+    """
+
+    condition = Q()
+    stock = []
+    sold = []
+    for product_id, (quantity, count) in quantities.items():
+        condition |= Q(product_id=product_id, stripe=random.randrange(count))
+        stock.append(When(product_id=product_id, then=F("stock") - quantity))
+        sold.append(When(product_id=product_id, then=F("sold") + quantity))
+    return ProductStripe.objects.filter(condition).update(
+        stock=Case(*stock, default=F("stock")),
+        sold=Case(*sold, default=F("sold")),
+    )
+
+
+def fold_stripes(product_ids=None, batch_size=1000):
+    """Add the stripes of the products, or of all the products, to the
+    columns of the products and return the number of folded stripes.
+
+    The values read are subtracted from the stripes instead of resetting
+    them, so the checkouts that update a stripe in the meantime are kept.
+    The cached products are invalidated after the commit of every batch.
+    """
+
+    stripes = ProductStripe.objects.exclude(stock=0, sold=0).order_by("id")
+    if product_ids is not None:
+        stripes = stripes.filter(product_id__in=product_ids)
+    folded = 0
+    last = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                stripes.filter(id__gt=last).values_list(
+                    "id", "product_id", "stock", "sold"
+                )[:batch_size]
+            )
+            if not rows:
+                return folded
+            totals = {}
+            for _, product_id, stock, sold in rows:
+                total = totals.get(product_id, (0, 0))
+                totals[product_id] = (total[0] + stock, total[1] + sold)
+            Product.objects.filter(pk__in=totals).update(
+                stock=Case(
+                    *(
+                        When(pk=pk, then=F("stock") + stock)
+                        for pk, (stock, _) in totals.items()
+                    ),
+                    default=F("stock"),
+                ),
+                sold=Case(
+                    *(
+                        When(pk=pk, then=F("sold") + sold)
+                        for pk, (_, sold) in totals.items()
+                    ),
+                    default=F("sold"),
+                ),
+            )
+            # The filters and the ordering of the cached pages change
+            transaction.on_commit(
+                partial(
+                    catalog_cache.invalidate_catalog,
+                    list(totals),
+                    set(
+                        Product.objects.filter(pk__in=totals).values_list(
+                            "category_id", flat=True
+                        )
+                    ),
+                )
+            )
+            ids = [row[0] for row in rows]
+            ProductStripe.objects.filter(pk__in=ids).update(
+                stock=Case(
+                    *(
+                        When(pk=pk, then=F("stock") - stock)
+                        for pk, _, stock, _ in rows
+                    ),
+                    default=F("stock"),
+                ),
+                sold=Case(
+                    *(
+                        When(pk=pk, then=F("sold") - sold)
+                        for pk, _, _, sold in rows
+                    ),
+                    default=F("sold"),
+                ),
+            )
+        folded += len(rows)
+        last = rows[-1][0]
+
+
+@transaction.atomic
+def set_stripes(product_ids, count):
+    """Split the stock and sold counters of the products into count
+    stripes, 0 puts them back into the product rows.
+
+    The stripes are locked first, so the checkouts of the products wait for
+    the change and a checkout that picked a removed stripe fails.
+    """
+
+    list(
+        ProductStripe.objects.select_for_update()
+        .filter(product_id__in=product_ids)
+        .values_list("id", flat=True)
+    )
+    fold_stripes(product_ids)
+    ProductStripe.objects.filter(
+        product_id__in=product_ids, stripe__gte=count
+    ).delete()
+    ProductStripe.objects.bulk_create(
+        [
+            ProductStripe(product_id=pk, stripe=stripe)
+            for pk in product_ids
+            for stripe in range(count)
+        ],
+        ignore_conflicts=True,
+    )
+    return Product.objects.filter(pk__in=product_ids).update(
+        stripe_count=count
+    )
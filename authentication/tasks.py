@@ -0,0 +1,72 @@
+"""Background Tasks
+
+This file contains the handlers of the jobs enqueued by the checkout. They
+run in the run_jobs worker, after the order is committed, so the checkout
+does not wait for the mail server or for the rows of the sales rollups. A
+handler raises to have its job retried.
+"""
+
+# pylint: disable=no-member
+
+import logging
+from django.conf import settings
+from django.core.mail import mail_admins, send_mail
+from django.db.models import Q
+from .analytics import record_order_sales
+from .jobs import job
+from .models import Order, OrderItem, Product
+from .stripes import attach_stripe_totals, current_counts
+
+logger = logging.getLogger(__name__)
+
+
+@job("send_order_confirmation")
+def send_order_confirmation(order_id):
+    """Send the confirmation email of an order to its user"""
+
+    order = Order.objects.select_related("user").filter(pk=order_id).first()
+    if order is None or not order.user.email:
+        return
+    lines = [
+        f"{quantity} x {name}: {price}"
+        for name, quantity, price in OrderItem.objects.filter(
+            order=order
+        ).values_list("product__name", "quantity", "price")
+    ]
+    lines.append("Total: " + str(order.price))
+    send_mail(
+        "Order #" + str(order.pk) + " confirmed",
+        "\n".join(lines),
+        None,
+        [order.user.email],
+    )
+
+
+@job("record_order_sales")
+def update_sales_rollups(order_id):
+    """Add the sales of an order to the daily sales rollups"""
+    record_order_sales(order_id)
+
+
+@job("check_stock_alerts")
+def check_stock_alerts(product_ids):
+    """Warn the admins about the sold products that are running out of
+    stock. The stock of a striped product is read with its stripes.
+    """
+
+    products = list(
+        Product.objects.filter(
+            Q(stock__lte=settings.STOCK_ALERT_THRESHOLD)
+            | Q(stripe_count__gt=0),
+            pk__in=product_ids,
+        ).only("name", "stock", "sold", "stripe_count")
+    )
+    attach_stripe_totals(products)
+    lines = []
+    for product in products:
+        stock, _ = current_counts(product)
+        if stock <= settings.STOCK_ALERT_THRESHOLD:
+            lines.append(product.name + ": " + str(stock) + " left")
+    if lines:
+        logger.warning("Low stock: %s", ", ".join(lines))
+        mail_admins("Low stock", "\n".join(lines))
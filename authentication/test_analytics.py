@@ -0,0 +1,177 @@
+"""Testing Sales Analytics
+
+This testing file is used to test the daily sales rollups and the sales
+reports. The job of the checkout must add the orders to the rollups of the
+day of its products and categories once, the reports must read the rollups
+of a period and the rebuild command must compute the same rollups from the
+order items.
+"""
+
+# pylint: disable=no-member
+
+import datetime
+from io import StringIO
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.core.management import call_command
+from django.urls import reverse
+from .analytics import record_order_sales
+from .jobs import JobWorker
+from .models import CategoryDailySales, Order, ProductDailySales
+from .testing import ShopFixtureMixin
+
+
+class SalesAnalyticsTestCase(ShopFixtureMixin, APITestCase):
+    """TestCase for the daily sales rollups and the sales reports"""
+
+    def setUp(self):
+        """Setup for users, products and token creation"""
+
+        self.admin = self.create_admin()
+        self.user = self.create_buyer()
+        self.products = self.create_products(
+            [("Sneakers", 50, 100), ("Boots", 80, 100)]
+        ) + self.create_products([("Cap", 20, 100)], "Hats")
+        self.authenticate(self.admin)
+
+    def place_order(self, quantities, run_jobs=True):
+        """Place an order of the quantities of the products and run its
+        jobs
+        """
+
+        self.add_cart_lines(
+            self.user,
+            (
+                (product, quantity)
+                for product, quantity in zip(self.products, quantities)
+                if quantity
+            ),
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.order_cart(self.user)
+        self.assertEqual(response.data["message"], "Order placed")
+        if run_jobs:
+            JobWorker(threads=0).work(once=True)
+
+    def rollups(self):
+        """Return the product and category rollups as tuples"""
+
+        return (
+            set(
+                ProductDailySales.objects.values_list(
+                    "date", "product__name", "units", "revenue"
+                )
+            ),
+            set(
+                CategoryDailySales.objects.values_list(
+                    "date", "category__name", "units", "revenue"
+                )
+            ),
+        )
+
+    def test_checkout_updates_rollups(self):
+        """Every order should add its units and revenue to the rows of the
+        day of its products and categories.
+        """
+
+        self.place_order([1, 2, 0])
+        self.place_order([1, 0, 3])
+        today = datetime.date.today()
+        products, categories = self.rollups()
+        self.assertEqual(
+            products,
+            {
+                (today, "Sneakers", 2, 100),
+                (today, "Boots", 2, 160),
+                (today, "Cap", 3, 60),
+            },
+        )
+        self.assertEqual(
+            categories, {(today, "Shoes", 4, 260), (today, "Hats", 3, 60)}
+        )
+
+        response = self.client.get(reverse("authentication:category-sales"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(row["name"], row["revenue"]) for row in response.data],
+            [("Hats", 60), ("Shoes", 260)],
+        )
+        response = self.client.get(reverse("authentication:product-sales"))
+        self.assertEqual(len(response.data["results"]), 3)
+
+    def test_job_counts_order_once(self):
+        """A job run again should not add its order twice"""
+
+        self.place_order([1, 2, 0], run_jobs=False)
+        self.assertEqual(self.rollups(), (set(), set()))
+        order = Order.objects.get()
+        self.assertTrue(record_order_sales(order.pk))
+        rollups = self.rollups()
+        self.assertFalse(record_order_sales(order.pk))
+        JobWorker(threads=0).work(once=True)
+        self.assertEqual(self.rollups(), rollups)
+        self.assertEqual(
+            rollups[1], {(datetime.date.today(), "Shoes", 3, 210)}
+        )
+
+    def test_rebuild_rollups(self):
+        """The rebuilt rollups should be the rollups of the checkout"""
+
+        self.place_order([1, 2, 3])
+        self.place_order([2, 0, 1])
+        rollups = self.rollups()
+        call_command("rebuild_sales_rollups", stdout=StringIO())
+        self.assertEqual(self.rollups(), rollups)
+
+        # The pending job of an order counted by the rebuild is skipped
+        self.place_order([1, 0, 0], run_jobs=False)
+        call_command("rebuild_sales_rollups", stdout=StringIO())
+        rollups = self.rollups()
+        JobWorker(threads=0).work(once=True)
+        self.assertEqual(self.rollups(), rollups)
+
+    def test_rebuild_after_category_change(self):
+        """The sales of a product moved to another category should stay in
+        its old category in the live and in the rebuilt rollups.
+        """
+
+        self.place_order([1, 0, 2])
+        cap = self.products[2]
+        cap.category = self.products[0].category
+        cap.save()
+        self.place_order([0, 0, 1])
+        rollups = self.rollups()
+        today = datetime.date.today()
+        self.assertEqual(
+            rollups[1], {(today, "Shoes", 2, 70), (today, "Hats", 2, 40)}
+        )
+        call_command(
+            "rebuild_sales_rollups", "--batch-size=1", stdout=StringIO()
+        )
+        self.assertEqual(self.rollups(), rollups)
+
+    def test_report_period(self):
+        """The period should be checked and the days out of it ignored"""
+
+        self.place_order([1, 0, 0])
+        url = reverse("authentication:category-sales")
+        yesterday = datetime.date.today() - datetime.timedelta(days=1)
+        response = self.client.get(url, {"end": yesterday})
+        self.assertEqual(response.data, [])
+        for params in [
+            {"start": "today"},
+            {"start": "2024-02-01", "end": "2024-01-01"},
+            {"start": "2020-01-01", "end": "2024-01-01"},
+        ]:
+            response = self.client.get(url, params)
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST
+            )
+
+    def test_reports_need_superuser(self):
+        """The reports should be refused to the other users"""
+
+        self.authenticate(self.user)
+        for name in ["product-sales", "category-sales"]:
+            response = self.client.get(reverse("authentication:" + name))
+            self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,147 @@
+"""Testing Async Views
+
+This testing file is used to test the async views of the catalog and the
+cart. Every async view must answer like its sync view, with its queries run
+in the threads of the executor.
+"""
+
+# pylint: disable=no-member
+
+import json
+from asgiref.sync import sync_to_async
+from rest_framework import status
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from .cache import catalog_cache
+from .metrics import registry
+from .models import Cart, Product
+from .testing import ShopFixtureMixin
+
+
+class AsyncViewsTestCase(ShopFixtureMixin, TransactionTestCase):
+    """TestCase for the async views, their queries run in the threads of
+    the executor with their own connections.
+    """
+
+    # The read-only views read the replica when there is one
+    databases = "__all__"
+
+    def setUp(self):
+        """Setup for users, products, cart and tokens creation"""
+
+        self.admin = self.create_admin()
+        self.user = self.create_buyer()
+        self.products = self.create_products(
+            ("Shoe " + str(index), 100, 0) for index in range(3)
+        )
+        Cart.objects.create(
+            user=self.user, product=self.products[0], quantity=2, price=200
+        )
+        catalog_cache.clear()
+        self.admin_auth = self.bearer(self.admin)
+        self.user_auth = self.bearer(self.user)
+
+    async def assert_same_responses(self, names, kwargs, params, auth):
+        """The async view should answer like the sync view"""
+
+        name, async_name = names
+        # The async client takes the headers by their name
+        response = await self.async_client.get(
+            reverse("authentication:" + async_name, kwargs=kwargs),
+            params,
+            **({"authorization": auth} if auth else {}),
+        )
+        catalog_cache.clear()
+        expected = await sync_to_async(self.client.get)(
+            reverse("authentication:" + name, kwargs=kwargs),
+            params,
+            **({"HTTP_AUTHORIZATION": auth} if auth else {}),
+        )
+        self.assertEqual(response.status_code, expected.status_code)
+        # The links of the pages lead to the async view
+        self.assertEqual(
+            json.loads(response.content.replace(b"/async/", b"/")),
+            json.loads(expected.content),
+        )
+
+    async def test_same_responses(self):
+        """The async views should return the data of the sync views"""
+
+        products = ("products-view-list", "async-products-view")
+        cart = ("cart-view", "async-cart-view")
+        user = {"user_id": self.user.id}
+        for names, kwargs, params, auth in [
+            (products, {}, {"page_size": 2}, self.admin_auth),
+            (
+                ("category-products-view", "async-category-products-view"),
+                {"gategory_name": "shoes"},
+                {"ordering": "-id"},
+                self.admin_auth,
+            ),
+            (
+                ("product-view-detail", "async-product-view"),
+                {"pk": self.products[1].id},
+                {},
+                self.admin_auth,
+            ),
+            (cart, user, {}, self.user_auth),
+            (
+                ("cart-summary-view", "async-cart-summary-view"),
+                user,
+                {},
+                self.user_auth,
+            ),
+            (products, {}, {}, self.user_auth),
+            (cart, user, {}, None),
+        ]:
+            with self.subTest(name=names[1], auth=bool(auth)):
+                await self.assert_same_responses(names, kwargs, params, auth)
+
+    async def test_cached_page(self):
+        """The second request of a page should be served by the cache"""
+
+        url = reverse("authentication:async-products-view")
+        first = await self.async_client.get(
+            url, authorization=self.admin_auth
+        )
+        await sync_to_async(Product.objects.filter(name="Shoe 0").update)(
+            price=1
+        )
+        second = await self.async_client.get(
+            url, authorization=self.admin_auth
+        )
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(len(json.loads(second.content)["results"]), 3)
+
+    async def test_only_get(self):
+        """The other methods should not be allowed"""
+
+        response = await self.async_client.delete(
+            reverse("authentication:async-products-view"),
+            authorization=self.admin_auth,
+        )
+        self.assertEqual(
+            response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED
+        )
+
+    # The pragmas of the new connections of the threads are not counted
+    @override_settings(API_METRICS_ENABLED=True, SQLITE_PRAGMAS={})
+    async def test_metrics(self):
+        """The queries of the threads of the async views should be counted
+        by the metrics middleware.
+        """
+
+        registry.clear()
+        response = await self.async_client.get(
+            reverse(
+                "authentication:async-cart-view",
+                kwargs={"user_id": self.user.id},
+            ),
+            authorization=self.user_auth,
+        )
+        self.assertIn('desc="2 queries"', response["Server-Timing"])
+        response = await self.async_client.get(
+            reverse("authentication:async-products-view"),
+            authorization=self.admin_auth,
+        )
+        self.assertIn('desc="3 queries"', response["Server-Timing"])
@@ -0,0 +1,76 @@
+"""Testing Benchmark Commands
+
+This testing file is used to run the benchmark commands with small sizes.
+The commands seed and destroy a database of their own, so they run in a
+process of their own and must finish without a failed request.
+"""
+
+import subprocess
+import sys
+from django.conf import settings
+from django.test import SimpleTestCase
+
+
+class BenchmarkCommandsTestCase(SimpleTestCase):
+    """TestCase for the benchmark commands
+
+    The commands create and destroy their own databases, so they run in a
+    process of their own with small sizes.
+    """
+
+    def run_command(self, *args):
+        """Run a command of manage.py and return its output"""
+
+        result = subprocess.run(
+            [sys.executable, str(settings.BASE_DIR / "manage.py"), *args],
+            capture_output=True,
+            check=False,
+            text=True,
+            timeout=300,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return result.stdout
+
+    def test_benchmark_lookups(self):
+        """The lookups should be timed before and after the indexes are
+        dropped.
+        """
+
+        output = self.run_command(
+            "benchmark_lookups",
+            "--users=5",
+            "--categories=2",
+            "--products=10",
+            "--order-items=20",
+            "--repeat=2",
+        )
+        self.assertIn("Dropping the indexes", output)
+        self.assertIn("category-products", output.rsplit("p95 before", 1)[1])
+
+    def test_benchmark_asgi(self):
+        """The endpoints should answer with a 2xx status in every mode"""
+
+        output = self.run_command(
+            "benchmark_asgi",
+            "--users=5",
+            "--categories=2",
+            "--products=20",
+            "--order-items=20",
+            "--requests=10",
+            "--concurrency=2",
+            "--query-latency=0",
+        )
+        self.assertIn("asgi-async category", output)
+
+    def test_benchmark_hot_sku(self):
+        """The checkouts of both modes should be counted once"""
+
+        output = self.run_command(
+            "benchmark_hot_sku",
+            "--users=5",
+            "--requests=10",
+            "--concurrency=2",
+            "--stripes=2",
+        )
+        self.assertIn("20 ordered, the stock and sold", output)
+        self.assertIn("striped checkout", output)
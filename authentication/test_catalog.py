@@ -0,0 +1,145 @@
+"""Testing Catalog Commands
+
+This testing file is used to test the import_catalog and export_catalog
+commands with temporary files. The imports must create and update the
+products, skip the invalid rows and invalidate the catalog cache of the
+changed products and categories.
+"""
+
+# pylint: disable=no-member
+
+import json
+import shutil
+import tempfile
+from io import StringIO
+from pathlib import Path
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from .cache import catalog_cache
+from .models import Category, Product
+from .stripes import current_counts, sell_from_stripes, set_stripes
+
+
+class CatalogImportExportTestCase(TestCase):
+    """TestCase for the import_catalog and export_catalog commands"""
+
+    def setUp(self):
+        """Setup for an existing product and a temporary directory"""
+
+        category = Category.objects.create(name="Shoes")
+        Product.objects.create(
+            name="Shoe", price=100, category=category, stock=10
+        )
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_import_catalog(self):
+        """The new products and categories should be created, the existing
+        products updated and the invalid rows skipped.
+        """
+
+        path = self.directory / "catalog.csv"
+        path.write_text(
+            "name,price,category,stock,sold,description\n"
+            "Shoe,120,Shoes,8,2,Updated\n"
+            "Boot,200,Boots,5,0,\n"
+            "Bad,not a price,Boots,1,0,\n"
+            + "Long" * 20
+            + ",10,Boots,1,0,\n",
+            encoding="utf-8",
+        )
+        stdout, stderr = StringIO(), StringIO()
+        call_command(
+            "import_catalog",
+            str(path),
+            batch_size=1,
+            stdout=stdout,
+            stderr=stderr,
+        )
+        self.assertIn(
+            "1 products created, 1 updated, 2 skipped", stdout.getvalue()
+        )
+        self.assertIn("Row 3 skipped", stderr.getvalue())
+        self.assertIn(
+            "Row 4 skipped: name is longer than 60 characters",
+            stderr.getvalue(),
+        )
+        shoe = Product.objects.get(name="Shoe")
+        self.assertEqual((shoe.price, shoe.stock, shoe.sold), (120, 8, 2))
+        boot = Product.objects.select_related("category").get(name="Boot")
+        self.assertEqual(boot.category.name, "Boots")
+
+    def test_import_moves_category(self):
+        """A product moved to another category should invalidate the pages
+        of its old category.
+        """
+
+        shoes = Category.objects.get(name="Shoes")
+        scope = "category:" + str(shoes.pk)
+        catalog_cache.set_page(scope, catalog_cache.version(scope), "url", [])
+        path = self.directory / "catalog.csv"
+        path.write_text(
+            "name,price,category,stock,sold,description\n"
+            "Shoe,100,Boots,10,0,\n",
+            encoding="utf-8",
+        )
+        call_command("import_catalog", str(path), stdout=StringIO())
+        self.assertIsNone(
+            catalog_cache.get_page(scope, catalog_cache.version(scope), "url")
+        )
+
+    def test_import_aborted(self):
+        """The products of the batches imported before an invalid line
+        should be invalidated in the catalog cache.
+        """
+
+        shoe = Product.objects.get(name="Shoe")
+        catalog_cache.set_product(shoe.pk, {"stock": 10})
+        path = self.directory / "catalog.jsonl"
+        path.write_text(
+            '{"name": "Shoe", "category": "Shoes", "stock": 4}\n'
+            "not json\n",
+            encoding="utf-8",
+        )
+        with self.assertRaisesMessage(CommandError, "Invalid catalog file"):
+            call_command(
+                "import_catalog", str(path), batch_size=1, stdout=StringIO()
+            )
+        self.assertEqual(Product.objects.get(pk=shoe.pk).stock, 4)
+        self.assertIsNone(catalog_cache.get_product(shoe.pk))
+
+    def test_export_import_catalog(self):
+        """An exported catalog should be imported back without changes"""
+
+        path = self.directory / "catalog.jsonl"
+        call_command("export_catalog", str(path), stdout=StringIO())
+        self.assertEqual(
+            json.loads(path.read_text(encoding="utf-8")),
+            {
+                "name": "Shoe",
+                "price": 100,
+                "category": "Shoes",
+                "stock": 10,
+                "sold": 0,
+                "description": "",
+            },
+        )
+        stdout = StringIO()
+        call_command("import_catalog", str(path), stdout=stdout)
+        self.assertIn("0 products created, 1 updated", stdout.getvalue())
+
+    def test_export_import_striped_product(self):
+        """The sales kept in the stripes of a product should be exported
+        and imported back.
+        """
+
+        shoe = Product.objects.get(name="Shoe")
+        set_stripes([shoe.pk], 4)
+        sell_from_stripes({shoe.pk: (3, 4)})
+        sell_from_stripes({shoe.pk: (2, 4)})
+        path = self.directory / "catalog.csv"
+        call_command("export_catalog", str(path), stdout=StringIO())
+        call_command("import_catalog", str(path), stdout=StringIO())
+        self.assertEqual(
+            current_counts(Product.objects.get(pk=shoe.pk)), (5, 5)
+        )
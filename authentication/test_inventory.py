@@ -0,0 +1,143 @@
+"""Testing Inventory Reservations
+
+This testing file is used to test the stock holds of the cart lines. The
+cart lines must hold the stock of their products, the checkout must convert
+the holds of the cart, the expired holds must be given back to the other
+carts and the stock counters must be computed again from the stock and the
+holds.
+"""
+
+# pylint: disable=no-member
+
+import datetime
+from io import StringIO
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from .inventory import release_expired_holds, sync_counters
+from .models import Cart, Order, Product, StockCounter
+from .testing import ShopFixtureMixin
+
+
+class InventoryTestCase(ShopFixtureMixin, APITestCase):
+    """TestCase for the stock holds of the cart lines"""
+
+    def setUp(self):
+        """Setup for users, products and token creation"""
+
+        self.users = [
+            self.create_buyer("buyer" + str(index)) for index in range(2)
+        ]
+        self.products = self.create_products(
+            [("Sneakers", 50, 10), ("Boots", 50, 10)]
+        )
+
+    def add_to_cart(self, user, product, quantity):
+        """Add the quantity of the product to the cart of the user"""
+
+        self.authenticate(user)
+        return self.client.post(
+            reverse("authentication:add-to-cart"),
+            {"user": user.pk, "product": product.pk, "quantity": quantity},
+            format="json",
+        )
+
+    def available(self):
+        """Return the available stock of the products"""
+
+        return [
+            StockCounter.objects.get(product=product).available
+            for product in self.products
+        ]
+
+    def test_holds(self):
+        """The cart lines should hold their quantities out of the available
+        stock until they are removed.
+        """
+
+        buyer, other = self.users
+        sneakers = self.products[0]
+        response = self.add_to_cart(buyer, sneakers, 4)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.available(), [6, 10])
+
+        response = self.add_to_cart(other, sneakers, 7)
+        self.assertEqual(response.data["message"], "Available stock is 6")
+        self.assertFalse(Cart.objects.filter(user=other).exists())
+
+        self.add_to_cart(buyer, sneakers, 2)
+        self.assertEqual(self.available(), [8, 10])
+        self.add_to_cart(other, sneakers, 8)
+        response = self.add_to_cart(buyer, sneakers, 3)
+        self.assertEqual(response.data["message"], "Available stock is 2")
+
+        self.client.delete(
+            reverse("authentication:remove-from-cart")
+            + "?user_id="
+            + str(buyer.pk)
+        )
+        self.assertEqual(self.available(), [2, 10])
+
+    def test_checkout_converts_holds(self):
+        """The checkout should keep the available stock of the held lines
+        and take the quantities of the released holds again.
+        """
+
+        buyer = self.users[0]
+        for product in self.products:
+            self.add_to_cart(buyer, product, 3)
+        Cart.objects.filter(product=self.products[1]).update(
+            reserved_until=timezone.now() - datetime.timedelta(seconds=1)
+        )
+        out = StringIO()
+        call_command("release_stock_holds", stdout=out)
+        self.assertIn("1 holds released", out.getvalue())
+        self.assertEqual(self.available(), [7, 10])
+
+        response = self.order_cart(buyer)
+        self.assertEqual(response.data["message"], "Order placed")
+        self.assertEqual(self.available(), [7, 7])
+        self.assertEqual(
+            list(Product.objects.values_list("stock", flat=True)), [7, 7]
+        )
+
+    def test_released_hold_taken_by_another_cart(self):
+        """A checkout should fail when the stock of its released holds was
+        taken by another cart, without changing any counter.
+        """
+
+        buyer, other = self.users
+        for product in self.products:
+            self.add_to_cart(buyer, product, 6)
+        Cart.objects.update(
+            reserved_until=timezone.now() - datetime.timedelta(seconds=1)
+        )
+        release_expired_holds(batch_size=1)
+        self.add_to_cart(other, self.products[1], 5)
+
+        response = self.order_cart(buyer)
+        self.assertEqual(
+            response.data["message"], "Not enough stock for Boots"
+        )
+        self.assertEqual(self.available(), [10, 5])
+        self.assertFalse(Order.objects.exists())
+
+    def test_sync_counters(self):
+        """The counters of the products created by bulk_create should be
+        made on their first use and computed again from the stock and the
+        holds.
+        """
+
+        product = Product.objects.bulk_create(
+            [Product(name="Cap", price=10, category=self.products[0].category)]
+        )[0]
+        Product.objects.filter(pk=product.pk).update(stock=4)
+        self.products.append(product)
+        self.add_to_cart(self.users[0], product, 3)
+        self.assertEqual(self.available(), [10, 10, 1])
+
+        Product.objects.update(stock=20)
+        sync_counters()
+        self.assertEqual(self.available(), [20, 20, 17])
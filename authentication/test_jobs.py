@@ -0,0 +1,174 @@
+"""Testing Background Jobs
+
+This testing file is used to test the background jobs of the checkout. The
+checkout must enqueue its jobs after the commit of the order, the worker
+must retry the failed jobs with a backoff and claim the stale jobs again,
+and the run_jobs command must report the stats of the worker.
+"""
+
+# pylint: disable=no-member
+
+import datetime
+from io import StringIO
+from unittest.mock import patch
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.core import mail
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from .jobs import JobWorker, enqueue, handlers
+from .models import Cart, Job
+from .testing import ShopFixtureMixin
+
+
+class JobQueueTestCase(ShopFixtureMixin, APITestCase):
+    """TestCase for the background jobs of the checkout and the worker"""
+
+    def setUp(self):
+        """Setup for user, products and cart creation"""
+
+        self.user = self.create_buyer()
+        self.products = self.create_products(
+            [("Sneakers", 50, 12), ("Boots", 50, 100)]
+        )
+        self.add_cart_lines(
+            self.user, ((product, 3) for product in self.products)
+        )
+
+    @override_settings(ADMINS=[("Admin", "admin@example.com")])
+    def test_checkout_enqueues_jobs(self):
+        """The jobs should be inserted after the commit of the order and
+        send the confirmation email and the stock alert.
+        """
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.order_cart(self.user)
+        self.assertFalse(Job.objects.exists())
+        for callback in callbacks:
+            callback()
+        self.assertEqual(
+            set(Job.objects.values_list("name", "status")),
+            {
+                ("record_order_sales", Job.PENDING),
+                ("send_order_confirmation", Job.PENDING),
+                ("check_stock_alerts", Job.PENDING),
+            },
+        )
+
+        with self.assertLogs("authentication.tasks", "WARNING") as logs:
+            JobWorker(threads=0).work(once=True)
+        self.assertIn("Sneakers: 9 left", logs.output[0])
+        self.assertFalse(Job.objects.exclude(status=Job.DONE).exists())
+        self.assertEqual(
+            [message.to for message in mail.outbox],
+            [["buyer@example.com"], ["admin@example.com"]],
+        )
+        self.assertIn("Total: 300", mail.outbox[0].body)
+
+    def test_rolled_back_order_enqueues_no_job(self):
+        """An order that is rolled back should not enqueue any job"""
+
+        Cart.objects.filter(product=self.products[0]).update(quantity=20)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.order_cart(self.user)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Job.objects.exists())
+
+    @override_settings(JOBS_MAX_ATTEMPTS=2, JOBS_RETRY_DELAY=10)
+    def test_retry_with_backoff(self):
+        """A failed job should be retried later and given up after the last
+        attempt.
+        """
+
+        calls = []
+
+        def flaky(**payload):
+            calls.append(payload)
+            raise ValueError("mail server down")
+
+        worker = JobWorker(threads=0)
+        with patch.dict(handlers, {"flaky": flaky}), self.assertLogs(
+            "authentication.jobs", "WARNING"
+        ) as logs:
+            with self.captureOnCommitCallbacks(execute=True):
+                enqueue(("flaky", {"order_id": 1}))
+            worker.work(once=True)
+            item = Job.objects.get()
+            self.assertEqual(item.status, Job.PENDING)
+            self.assertEqual(item.attempts, 1)
+            self.assertEqual(item.last_error, "ValueError: mail server down")
+            self.assertGreater(
+                item.run_at, timezone.now() + datetime.timedelta(seconds=9)
+            )
+
+            # The job is not due yet
+            worker.work(once=True)
+            self.assertEqual(len(calls), 1)
+
+            Job.objects.update(run_at=timezone.now())
+            worker.work(once=True)
+        item = Job.objects.get()
+        self.assertEqual(item.status, Job.FAILED)
+        self.assertEqual(len(logs.output), 2)
+        self.assertEqual(calls, [{"order_id": 1}, {"order_id": 1}])
+        stats = worker.stats()
+        self.assertEqual((stats["retried"], stats["failed"]), (1, 1))
+
+    @override_settings(JOB_METRICS_MAX_SAMPLES=3, API_METRICS_MAX_SAMPLES=1)
+    def test_stats_samples(self):
+        """The worker should keep the number of samples of its own setting
+        or of its argument.
+        """
+
+        worker = JobWorker(threads=0)
+        self.assertEqual(worker.waits.maxlen, 3)
+        worker = JobWorker(threads=0, max_samples=2)
+        self.assertEqual(worker.durations.maxlen, 2)
+
+    @override_settings(JOBS_TIMEOUT=60)
+    def test_stale_job_is_claimed_again(self):
+        """A running job of a dead worker should be claimed again after the
+        timeout, a recent one should be left to its worker.
+        """
+
+        now = timezone.now()
+        Job.objects.bulk_create(
+            Job(
+                name="check_stock_alerts",
+                payload={"product_ids": []},
+                status=Job.RUNNING,
+                attempts=1,
+                started_at=started_at,
+                claimed_by="dead",
+            )
+            for started_at in [now - datetime.timedelta(minutes=5), now]
+        )
+        jobs = JobWorker(threads=0).claim()
+        self.assertEqual(len(jobs), 1)
+        self.assertEqual(jobs[0].attempts, 2)
+        self.assertNotEqual(jobs[0].claimed_by, "dead")
+
+    def test_worker_command_and_stats(self):
+        """The worker should run the queue and the stats should be
+        reported to the superusers.
+        """
+
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue(
+                ("check_stock_alerts", {"product_ids": []}),
+                ("send_order_confirmation", {"order_id": 0}),
+            )
+        self.authenticate(self.create_admin())
+        url = reverse("authentication:job-stats")
+        self.assertEqual(self.client.get(url).data["pending"], 2)
+
+        out = StringIO()
+        call_command("run_jobs", "--threads", "0", "--once", stdout=out)
+        self.assertIn("2 jobs: 2 succeeded", out.getvalue())
+        response = self.client.get(url)
+        self.assertEqual(
+            response.data,
+            {"pending": 0, "running": 0, "done": 2, "failed": 0, "lag": 0},
+        )
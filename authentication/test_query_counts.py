@@ -0,0 +1,600 @@
+"""Query Count Regression Tests
+
+This testing file pins the number of SQL queries of every view of the
+authentication Application. Every view is called with 1, 10 and 100 rows
+and must cost the same number of queries for every size, so an N+1 query
+in a serializer or a view fails the tests instead of showing up in the
+latency of the production server.
+"""
+
+# pylint: disable=no-member
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.db import connection
+from django.urls import reverse
+from .authentication import token_cache
+from .cache import catalog_cache
+from .categories import category_map
+from .inventory import sync_counters
+from .jobs import JobWorker
+from .models import Category, Order, OrderItem, Product, User
+from .search import search_backend
+from .stripes import set_stripes
+from .testing import PASSWORD, ShopFixtureMixin
+
+SIZES = (1, 10, 100)
+# The description of the products of a size, to search them
+SIZE_WORDS = {1: "one", 10: "ten", 100: "hundred"}
+
+
+class QueryCountTestCase(ShopFixtureMixin, APITestCase):
+    """Base TestCase for the query counts of the views
+
+    The products are shared by all the tests. The rows of a size are created
+    for a new user by the prepare function of the test, so the sizes do not
+    add up.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """Setup for superuser, categories and products creation"""
+
+        cls.admin = User.objects.create_superuser(
+            username="admin", email="admin@example.com", password=PASSWORD
+        )
+        cls.categories = {}
+        for size in SIZES:
+            category = Category.objects.create(name="size-" + str(size))
+            Product.objects.bulk_create(
+                Product(
+                    name="Product " + str(size) + "-" + str(index),
+                    price=100,
+                    category=category,
+                    stock=1000,
+                    description=SIZE_WORDS[size],
+                )
+                for index in range(size)
+            )
+            cls.categories[size] = category
+        cls.products = list(
+            Product.objects.filter(category=cls.categories[max(SIZES)])
+        )
+        # bulk_create sends no signal
+        search_backend("default").add(
+            Product.objects.values_list("id", flat=True)
+        )
+        sync_counters()
+
+    def setUp(self):
+        """The caches are cleared so every test starts with a cache miss"""
+
+        catalog_cache.clear()
+        token_cache.clear()
+
+    def assert_queries_per_size(self, num, prepare, send):
+        """Assert the number of queries of a request for every size
+
+        prepare is called with the size to create the rows, its result is
+        passed to send which makes the request. Only the request is counted.
+        The responses are returned by size.
+        """
+
+        responses = {}
+        for size in SIZES:
+            data = prepare(size)
+            with self.subTest(size=size), self.assertNumQueries(num):
+                responses[size] = send(data)
+        return responses
+
+    def fill_cart(self, size, quantity=1):
+        """Create a user with size held lines in his cart"""
+
+        user = self.create_buyer("cart-" + str(size))
+        self.add_cart_lines(
+            user,
+            ((product, quantity) for product in self.products[:size]),
+            held=True,
+        )
+        self.authenticate(user)
+        return user
+
+    def stripe_products(self):
+        """Split the stock counters of all the products into stripes"""
+        set_stripes([product.pk for product in self.products], 4)
+
+    def place_orders(self, size):
+        """Create a user with size orders of one item"""
+
+        user = self.create_buyer("orders-" + str(size))
+        orders = Order.objects.bulk_create(
+            Order(user=user, price=100) for _ in range(size)
+        )
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, product=product, quantity=1, price=100)
+            for order, product in zip(orders, self.products)
+        )
+        self.authenticate(user)
+        return user
+
+
+class UserQueryCountTestCase(QueryCountTestCase):
+    """TestCase for the number of queries of the user views"""
+
+    def create_users(self, size):
+        """Create size users"""
+
+        User.objects.bulk_create(
+            User(
+                username="user-" + str(size) + "-" + str(index),
+                email="user-" + str(size) + "-" + str(index) + "@example.com",
+            )
+            for index in range(size)
+        )
+        return size
+
+    def test_register_user(self):
+        """Registering a user checks the unique username and inserts it"""
+
+        url = reverse("authentication:register-user")
+
+        def send(size):
+            return self.client.post(
+                url,
+                {
+                    "username": "new-" + str(size),
+                    "password": PASSWORD,
+                    "confirm_password": PASSWORD,
+                },
+                format="json",
+            )
+
+        responses = self.assert_queries_per_size(2, self.create_users, send)
+        for response in responses.values():
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_create_token(self):
+        """Creating a token only fetches the user"""
+
+        user = User.objects.create_user(
+            username="login", email="login@example.com", password=PASSWORD
+        )
+        url = reverse("authentication:create-token")
+        data = {"username": user.username, "password": PASSWORD}
+        responses = self.assert_queries_per_size(
+            1,
+            self.create_users,
+            lambda size: self.client.post(url, data, format="json"),
+        )
+        for response in responses.values():
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_user_profile(self):
+        """Retrieving and updating the profile only touch the user"""
+
+        def prepare(size):
+            self.create_users(size)
+            user = self.create_buyer("profile-" + str(size))
+            self.authenticate(user)
+            return user
+
+        def send(user):
+            url = reverse("authentication:user-detail", kwargs={"pk": user.pk})
+            response = self.client.get(url)
+            self.assertEqual(response.data["username"], user.username)
+            return self.client.patch(
+                url, {"first_name": "First"}, format="json"
+            )
+
+        # The user of the token for every request and the update
+        responses = self.assert_queries_per_size(3, prepare, send)
+        for response in responses.values():
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_user_list(self):
+        """All the users are listed with one query after the superuser"""
+
+        self.authenticate(self.admin)
+        url = reverse("authentication:user-view-list")
+        responses = self.assert_queries_per_size(
+            2, self.create_users, lambda size: self.client.get(url)
+        )
+        self.assertEqual(
+            len(responses[100].data), User.objects.count()
+        )
+
+
+class CatalogQueryCountTestCase(QueryCountTestCase):
+    """TestCase for the number of queries of the category and product
+    views
+    """
+
+    def setUp(self):
+        """The requests are made by the superuser"""
+
+        super().setUp()
+        self.authenticate(self.admin)
+
+    def test_category_list(self):
+        """All the categories are listed with one query"""
+
+        url = reverse("authentication:categories-view-list")
+
+        def prepare(size):
+            Category.objects.bulk_create(
+                Category(
+                    name="Category " + str(size) + "-" + str(index),
+                    slug="category-" + str(size) + "-" + str(index),
+                )
+                for index in range(size)
+            )
+            return size
+
+        responses = self.assert_queries_per_size(
+            2, prepare, lambda size: self.client.get(url)
+        )
+        self.assertEqual(len(responses[100].data), Category.objects.count())
+
+    def test_category_retrieve(self):
+        """A category is retrieved with one query"""
+
+        responses = self.assert_queries_per_size(
+            2,
+            lambda size: self.categories[size],
+            lambda category: self.client.get(
+                reverse(
+                    "authentication:category-view-detail",
+                    kwargs={"pk": category.pk},
+                )
+            ),
+        )
+        self.assertEqual(responses[100].data["name"], "size-100")
+
+    def test_product_list(self):
+        """A page of products is loaded with their categories in one query
+        and the category facets in another one, the next request of the page
+        is served by the catalog cache.
+        """
+
+        url = reverse("authentication:products-view-list")
+
+        def send(size):
+            return self.client.get(url, {"page_size": size})
+
+        responses = self.assert_queries_per_size(3, lambda size: size, send)
+        for size, response in responses.items():
+            self.assertEqual(len(response.data["results"]), size)
+
+        self.assert_queries_per_size(1, lambda size: size, send)
+
+    def test_category_products(self):
+        """The products of a category are loaded with one query and their
+        facets with another one, the slug of the category is found in the
+        category map which is loaded once.
+        """
+
+        def prepare(size):
+            category_map.get("size-" + str(size))
+            return size
+
+        def send(size):
+            url = reverse(
+                "authentication:category-products-view",
+                kwargs={"gategory_name": "size-" + str(size)},
+            )
+            return self.client.get(url, {"page_size": max(SIZES)})
+
+        responses = self.assert_queries_per_size(3, prepare, send)
+        for size, response in responses.items():
+            self.assertEqual(len(response.data["results"]), size)
+            self.assertEqual(
+                response.data["results"][0]["category"], "size-" + str(size)
+            )
+
+    def test_product_retrieve(self):
+        """A product is retrieved with its category in one query"""
+
+        responses = self.assert_queries_per_size(
+            2,
+            lambda size: self.products[size - 1],
+            lambda product: self.client.get(
+                reverse(
+                    "authentication:product-view-detail",
+                    kwargs={"pk": product.pk},
+                )
+            ),
+        )
+        self.assertEqual(responses[100].data["category"], "size-100")
+
+    def test_create_product(self):
+        """Creating a product validates the category and the unique name,
+        inserts the product and its stock counter and copies it in the
+        search index.
+        """
+
+        url = reverse("authentication:create-product")
+        # The FTS5 table of SQLite is filled by one more query, the search
+        # index of PostgreSQL is an index of the product table
+        responses = self.assert_queries_per_size(
+            6 if connection.vendor == "sqlite" else 5,
+            lambda size: self.categories[size],
+            lambda category: self.client.post(
+                url,
+                {
+                    "name": "New " + category.name,
+                    "price": 100,
+                    "category": category.pk,
+                },
+                format="json",
+            ),
+        )
+        for response in responses.values():
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_product_search(self):
+        """A page of matches is counted, ranked and loaded with their
+        categories in three queries.
+        """
+
+        url = reverse("authentication:product-search")
+        responses = self.assert_queries_per_size(
+            4,
+            lambda size: SIZE_WORDS[size],
+            lambda query: self.client.get(
+                url, {"q": query, "limit": max(SIZES)}
+            ),
+        )
+        for size, response in responses.items():
+            self.assertEqual(len(response.data["results"]), size)
+
+    def test_stats_views(self):
+        """The cache stats and metrics views only fetch the superuser"""
+
+        urls = [
+            reverse("authentication:catalog-cache-stats"),
+            reverse("authentication:api-metrics"),
+        ]
+        for url in urls:
+            self.assert_queries_per_size(
+                1, lambda size, url=url: url, self.client.get
+            )
+
+
+class CartQueryCountTestCase(QueryCountTestCase):
+    """TestCase for the number of queries of the cart views"""
+
+    def test_add_to_cart(self):
+        """Adding a product returns the whole cart with a fixed number of
+        queries: the user of the token, the user and the product of the line,
+        the locked line, the hold of the stock and the update of the line in
+        a savepoint and the cart lines.
+        """
+
+        url = reverse("authentication:add-to-cart")
+
+        def send(user):
+            return self.client.post(
+                url,
+                {
+                    "user": user.pk,
+                    "product": self.products[0].pk,
+                    "quantity": 2,
+                },
+                format="json",
+            )
+
+        responses = self.assert_queries_per_size(9, self.fill_cart, send)
+        for size, response in responses.items():
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(len(response.data), size)
+
+    def test_add_to_cart_line(self):
+        """Adding a product returns only the line and the cart summary"""
+
+        url = reverse("authentication:add-to-cart")
+
+        def send(user):
+            return self.client.post(
+                url + "?response=line",
+                {
+                    "user": user.pk,
+                    "product": self.products[0].pk,
+                    "quantity": 2,
+                },
+                format="json",
+            )
+
+        responses = self.assert_queries_per_size(9, self.fill_cart, send)
+        for size, response in responses.items():
+            self.assertEqual(response.data["cart"]["count"], size)
+
+    def test_cart_views(self):
+        """The cart and its summary do not depend on the number of lines"""
+
+        def send(user):
+            response = self.client.get(
+                reverse(
+                    "authentication:cart-summary-view",
+                    kwargs={"user_id": user.pk},
+                )
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return self.client.get(
+                reverse(
+                    "authentication:cart-view", kwargs={"user_id": user.pk}
+                )
+            )
+
+        responses = self.assert_queries_per_size(4, self.fill_cart, send)
+        for size, response in responses.items():
+            self.assertEqual(len(response.data), size)
+
+    def test_striped_cart(self):
+        """The stripes of the striped products of the cart are loaded with
+        one more query.
+        """
+
+        self.stripe_products()
+        responses = self.assert_queries_per_size(
+            3,
+            self.fill_cart,
+            lambda user: self.client.get(
+                reverse(
+                    "authentication:cart-view", kwargs={"user_id": user.pk}
+                )
+            ),
+        )
+        for size, response in responses.items():
+            self.assertEqual(len(response.data), size)
+            self.assertEqual(response.data[0]["product"]["stock"], 1000)
+
+    def test_remove_from_cart(self):
+        """Removing a product and clearing the cart do not depend on the
+        number of lines, the holds of the lines are given back with one
+        UPDATE.
+        """
+
+        url = reverse("authentication:remove-from-cart")
+
+        def send(user):
+            response = self.client.delete(
+                url + "?user_id=" + str(user.pk)
+                + "&product_id=" + str(self.products[0].pk)
+            )
+            self.assertEqual(
+                response.data["message"], "Product removed from cart"
+            )
+            return self.client.delete(url + "?user_id=" + str(user.pk))
+
+        responses = self.assert_queries_per_size(
+            14, lambda size: self.fill_cart(size + 1), send
+        )
+        for response in responses.values():
+            self.assertEqual(response.data["message"], "Cart cleared")
+
+
+class OrderQueryCountTestCase(QueryCountTestCase):
+    """TestCase for the number of queries of the order views"""
+
+    def test_place_order(self):
+        """The checkout does not depend on the number of cart lines, the
+        held lines take no more stock from the counters and the rollups are
+        updated by a job.
+        """
+
+        url = reverse("authentication:place-order-view")
+
+        def send(user):
+            # The jobs are inserted with one query after the commit
+            with self.captureOnCommitCallbacks(execute=True):
+                return self.client.post(url + "?user_id=" + str(user.pk))
+
+        responses = self.assert_queries_per_size(9, self.fill_cart, send)
+        for response in responses.values():
+            self.assertEqual(response.data["message"], "Order placed")
+        self.assertEqual(
+            OrderItem.objects.filter(order__user__username="cart-100").count(),
+            100,
+        )
+
+    def test_sales_reports(self):
+        """The sales reports read the rollups with one query"""
+
+        url = reverse("authentication:place-order-view")
+
+        def prepare(size):
+            user = self.fill_cart(size)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(url + "?user_id=" + str(user.pk))
+            JobWorker(threads=0).work(once=True)
+            self.authenticate(self.admin)
+            return size
+
+        responses = self.assert_queries_per_size(
+            2,
+            prepare,
+            lambda size: self.client.get(
+                reverse("authentication:product-sales"),
+                {"page_size": max(SIZES)},
+            ),
+        )
+        self.assertEqual(len(responses[100].data["results"]), 100)
+        self.assert_queries_per_size(
+            2,
+            lambda size: size,
+            lambda size: self.client.get(
+                reverse("authentication:category-sales")
+            ),
+        )
+
+    def test_order_detail(self):
+        """A page of order details is loaded with one query"""
+
+        url = reverse("authentication:order-detail-view")
+        responses = self.assert_queries_per_size(
+            1,
+            self.place_orders,
+            lambda user: self.client.get(
+                url, {"user_id": user.pk, "page_size": max(SIZES)}
+            ),
+        )
+        for size, response in responses.items():
+            self.assertEqual(len(response.data["results"]), size)
+
+    def test_stream_order_detail(self):
+        """The streamed order details are loaded with one query"""
+
+        url = reverse("authentication:order-detail-view")
+
+        def send(user):
+            response = self.client.get(
+                url, {"user_id": user.pk, "stream": "ndjson"}
+            )
+            return b"".join(response.streaming_content).splitlines()
+
+        responses = self.assert_queries_per_size(1, self.place_orders, send)
+        for size, lines in responses.items():
+            self.assertEqual(len(lines), size)
+
+    def test_order_history(self):
+        """A page of orders is loaded with their items in two queries"""
+
+        url = reverse("authentication:order-history-view")
+        responses = self.assert_queries_per_size(
+            3,
+            self.place_orders,
+            lambda user: self.client.get(
+                url, {"user_id": user.pk, "page_size": max(SIZES)}
+            ),
+        )
+        for size, response in responses.items():
+            self.assertEqual(len(response.data["results"]), size)
+
+    def test_striped_order_views(self):
+        """The stripes of the striped products of the orders are loaded with
+        one more query, the streamed ones with one query per chunk.
+        """
+
+        self.stripe_products()
+        detail_url = reverse("authentication:order-detail-view")
+        history_url = reverse("authentication:order-history-view")
+
+        def send(user):
+            params = {"user_id": user.pk, "page_size": max(SIZES)}
+            response = self.client.get(detail_url, params)
+            self.assertEqual(len(response.data["results"]), user.size)
+            response = self.client.get(
+                detail_url, {"user_id": user.pk, "stream": "ndjson"}
+            )
+            lines = b"".join(response.streaming_content).splitlines()
+            self.assertEqual(len(lines), user.size)
+            return self.client.get(history_url, params)
+
+        def prepare(size):
+            user = self.place_orders(size)
+            user.size = size
+            return user
+
+        responses = self.assert_queries_per_size(8, prepare, send)
+        for size, response in responses.items():
+            self.assertEqual(len(response.data["results"]), size)
@@ -0,0 +1,126 @@
+"""Testing Replica Router
+
+This testing file is used to test the routing of the reads to the replica
+database. The router tests check that only the reads of the read-only views
+go to the replica, the replica views tests check that the read-only views
+query the replica and that the other views query the primary database. The
+replica views tests only run when a replica database is configured, the
+test runner of the project adds one when the environment gives none.
+"""
+
+# pylint: disable=no-member
+
+from unittest import skipUnless
+from unittest.mock import patch
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+from django.conf import settings
+from django.db import connection, connections
+from django.test import SimpleTestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from .models import Cart, Category, Product, User
+from .routers import REPLICA_DATABASE, ReplicaRouter, replica_reads
+
+
+class ReplicaRouterTestCase(SimpleTestCase):
+    """TestCase for the replica router"""
+
+    def setUp(self):
+        """Setup for a router with a replica"""
+
+        self.router = ReplicaRouter()
+        has_replica = patch.object(
+            ReplicaRouter, "has_replica", return_value=True
+        )
+        has_replica.start()
+        self.addCleanup(has_replica.stop)
+
+    def test_reads(self):
+        """Only the reads of a replica_reads block go to the replica"""
+
+        self.assertIsNone(self.router.db_for_read(Product))
+        with replica_reads():
+            self.assertEqual(
+                self.router.db_for_read(Product), REPLICA_DATABASE
+            )
+            self.assertEqual(self.router.db_for_write(Product), "default")
+        self.assertIsNone(self.router.db_for_read(Product))
+
+    def test_without_replica(self):
+        """The reads go to the primary database without a replica"""
+
+        with replica_reads(), patch.object(
+            ReplicaRouter, "has_replica", return_value=False
+        ):
+            self.assertIsNone(self.router.db_for_read(Product))
+
+    def test_transaction_reads(self):
+        """The reads of a transaction go to the primary database"""
+
+        with replica_reads(), patch.object(
+            connections["default"], "in_atomic_block", True
+        ):
+            self.assertIsNone(self.router.db_for_read(Product))
+
+    def test_migrations(self):
+        """The replica is not migrated"""
+
+        self.assertTrue(self.router.allow_migrate("default", "authentication"))
+        self.assertFalse(
+            self.router.allow_migrate(REPLICA_DATABASE, "authentication")
+        )
+
+
+@skipUnless(
+    REPLICA_DATABASE in settings.DATABASES, "No replica database configured"
+)
+class ReplicaViewsTestCase(TransactionTestCase):
+    """TestCase for the views served by the replica, the replica is a
+    mirror of the test database.
+    """
+
+    databases = "__all__"
+
+    def setUp(self):
+        """Setup for user, cart and token creation"""
+
+        self.user = User.objects.create_user(
+            username="test4", password="Password@123"
+        )
+        category = Category.objects.create(name="Shoes")
+        self.product = Product.objects.create(
+            name="Shoe", price=100, category=category, stock=10
+        )
+        Cart.objects.create(user=self.user, product=self.product)
+        token = AccessToken.for_user(self.user)
+        self.client.defaults["HTTP_AUTHORIZATION"] = "Bearer " + str(token)
+
+    def test_cart_view_reads_replica(self):
+        """The cart view should only query the replica"""
+
+        url = reverse(
+            "authentication:cart-view", kwargs={"user_id": self.user.id}
+        )
+        with CaptureQueriesContext(connection) as primary:
+            with CaptureQueriesContext(
+                connections[REPLICA_DATABASE]
+            ) as replica:
+                response = self.client.get(url)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(primary), 0)
+        self.assertEqual(len(replica), 2)
+
+    def test_add_to_cart_writes_primary(self):
+        """The add to cart view should only query the primary database"""
+
+        with CaptureQueriesContext(
+            connections[REPLICA_DATABASE]
+        ) as replica:
+            response = self.client.post(
+                reverse("authentication:add-to-cart"),
+                {"user": self.user.id, "product": self.product.id},
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(replica), 0)
@@ -0,0 +1,127 @@
+"""Testing Product Search
+
+This testing file is used to test the full-text search of the products. The
+search index must follow the saved, deleted and imported products, every
+word of the query must match the start of a word and the matches in the
+name must come before the matches in the description.
+"""
+
+# pylint: disable=no-member
+
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from django.core.management import call_command
+from django.urls import reverse
+from .cache import catalog_cache
+from .models import Category, Product, User
+
+
+class ProductSearchTestCase(APITestCase):
+    """TestCase for the full-text search of the products"""
+
+    def setUp(self):
+        """Setup for user, products and token creation"""
+
+        self.user = User.objects.create_user(
+            username="test4", password="Password@123"
+        )
+        self.category = Category.objects.create(name="Shoes")
+        for name, description in [
+            ("Running shoes", "Light shoes"),
+            ("Leather boots", "Boots for running in the rain"),
+            ("Sandals", "Summer sandals"),
+        ]:
+            Product.objects.create(
+                name=name, description=description, category=self.category
+            )
+        catalog_cache.clear()
+        token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + str(token))
+        self.url = reverse("authentication:product-search")
+
+    def search(self, query, **params):
+        """Return the names of the products found by the query"""
+
+        response = self.client.get(self.url, {"q": query, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [product["name"] for product in response.data["results"]]
+
+    def test_ranked_prefix_search(self):
+        """Every word should match a prefix, a match in the name should
+        come before a match in the description.
+        """
+
+        self.assertEqual(
+            self.search("run"), ["Running shoes", "Leather boots"]
+        )
+        self.assertEqual(self.search("RUN sho!"), ["Running shoes"])
+        self.assertEqual(self.search("hat"), [])
+
+    def test_partial_word_search(self):
+        """A prefix longer than the stem of a word should match the word"""
+
+        for query in ("runn", "runni", "running"):
+            self.assertEqual(
+                self.search(query), ["Running shoes", "Leather boots"]
+            )
+        self.assertEqual(self.search("sandal"), ["Sandals"])
+
+    def test_search_pages(self):
+        """The matches should be paginated with a limit and an offset"""
+
+        response = self.client.get(
+            self.url, {"q": "run", "limit": 1, "offset": 1}
+        )
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual(
+            [product["name"] for product in response.data["results"]],
+            ["Leather boots"],
+        )
+        self.assertIsNotNone(response.data["previous"])
+        self.assertIsNone(response.data["next"])
+
+    def test_search_follows_products(self):
+        """The updated and deleted products should be searched by their new
+        name or not be found anymore.
+        """
+
+        product = Product.objects.get(name="Sandals")
+        product.name = "Flip flops"
+        product.save()
+        Product.objects.get(name="Leather boots").delete()
+        self.assertEqual(self.search("flip"), ["Flip flops"])
+        self.assertEqual(self.search("sandals"), ["Flip flops"])
+        self.assertEqual(self.search("boots"), [])
+
+    def test_search_imported_products(self):
+        """The imported products should be searched"""
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "catalog.jsonl"
+            path.write_text(
+                json.dumps({"name": "Trail runner", "category": "Shoes"})
+                + "\n"
+                + json.dumps(
+                    {
+                        "name": "Sandals",
+                        "category": "Shoes",
+                        "description": "Beach",
+                    }
+                ),
+                encoding="utf-8",
+            )
+            call_command("import_catalog", str(path), stdout=StringIO())
+        self.assertEqual(self.search("trail"), ["Trail runner"])
+        self.assertEqual(self.search("beach"), ["Sandals"])
+        self.assertEqual(self.search("summer"), [])
+
+    def test_search_query_required(self):
+        """The search should be refused without a word to search"""
+
+        response = self.client.get(self.url, {"q": " ?! "})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,108 @@
+"""Testing Striped Stock Counters
+
+This testing file is used to test the striped counters of the hot products.
+The checkouts of a striped product must update its stripes instead of the
+product row, the stripes must be added to the product on read and the folds
+must move them back into the product row without changing its counts.
+"""
+
+# pylint: disable=no-member
+
+from io import StringIO
+from rest_framework.test import APITestCase
+from django.core.management import call_command
+from django.urls import reverse
+from .inventory import sync_counters
+from .models import Cart, Product, ProductStripe, StockCounter
+from .serializers import ProductViewSerializer
+from .testing import ShopFixtureMixin
+
+
+class StripedCounterTestCase(ShopFixtureMixin, APITestCase):
+    """TestCase for the striped stock counters of the hot products"""
+
+    def setUp(self):
+        """Setup for the user, the striped product and the token"""
+
+        self.user = self.create_buyer()
+        self.product = self.create_products([("Sneakers", 50, 10)])[0]
+        call_command(
+            "stripe_products", self.product.pk, stripes=4, stdout=StringIO()
+        )
+        self.authenticate(self.user)
+
+    def checkout(self, quantity):
+        """Add the quantity of the product to the cart and check it out"""
+
+        self.client.post(
+            reverse("authentication:add-to-cart"),
+            {
+                "user": self.user.pk,
+                "product": self.product.pk,
+                "quantity": quantity,
+            },
+            format="json",
+        )
+        response = self.order_cart(self.user)
+        self.assertEqual(response.data["message"], "Order placed")
+
+    def counts(self):
+        """Return the stock and sold formatted by the product serializer"""
+
+        product = Product.objects.select_related("category").get()
+        data = ProductViewSerializer([product], many=True).data[0]
+        return data["stock"], data["sold"]
+
+    def test_checkout_updates_stripe(self):
+        """The checkout of a striped product should update one of its
+        stripes instead of the product row, the stripes are added on read.
+        """
+
+        self.checkout(3)
+        self.checkout(2)
+        self.assertEqual(
+            Product.objects.values_list("stock", "sold").get(), (10, 0)
+        )
+        self.assertEqual(ProductStripe.objects.count(), 4)
+        self.assertEqual(self.counts(), (5, 5))
+        sync_counters()
+        self.assertEqual(StockCounter.objects.get().available, 5)
+
+        self.client.post(
+            reverse("authentication:add-to-cart"),
+            {"user": self.user.pk, "product": self.product.pk, "quantity": 6},
+            format="json",
+        )
+        self.assertFalse(Cart.objects.exists())
+
+    def test_fold_stripes(self):
+        """The folds should move the stripes into the product row without
+        changing its counts, 0 stripes should remove them.
+        """
+
+        self.checkout(3)
+        out = StringIO()
+        call_command("fold_stock_stripes", stdout=out)
+        self.assertIn("1 stripes folded", out.getvalue())
+        self.assertEqual(
+            Product.objects.values_list("stock", "sold").get(), (7, 3)
+        )
+        self.assertEqual(self.counts(), (7, 3))
+
+        self.checkout(1)
+        serializer = ProductViewSerializer(
+            Product.objects.get(), data={"price": 60}, partial=True
+        )
+        self.assertTrue(serializer.is_valid())
+        serializer.save()
+        self.assertEqual(self.counts(), (6, 4))
+
+        self.checkout(2)
+        call_command(
+            "stripe_products", self.product.pk, stripes=0, stdout=StringIO()
+        )
+        self.assertFalse(ProductStripe.objects.exists())
+        self.assertEqual(
+            Product.objects.values_list("stock", "sold", "stripe_count").get(),
+            (4, 6, 0),
+        )
@@ -0,0 +1,94 @@
+"""Testing Helpers
+
+This file contains the fixture shared by the test cases of the checkout: the
+buyer and admin users, the products of a category, the access tokens of the
+users, the lines of a cart and its checkout. It is not a test module, so the
+test runner does not collect it.
+"""
+
+# pylint: disable=no-member
+
+import datetime
+from rest_framework_simplejwt.tokens import AccessToken
+from django.urls import reverse
+from django.utils import timezone
+from .inventory import sync_counters
+from .models import Cart, Category, Product, User
+
+PASSWORD = "Password@123"
+
+
+class ShopFixtureMixin:
+    """Mixin for the test cases of the checkout, to use with a TestCase"""
+
+    @staticmethod
+    def create_buyer(username="buyer"):
+        """Create a user with an email address and without a password,
+        hashing it is slow.
+        """
+
+        return User.objects.create(
+            username=username, email=username + "@example.com"
+        )
+
+    @staticmethod
+    def create_admin():
+        """Create a superuser"""
+
+        return User.objects.create_superuser(
+            username="admin", password=PASSWORD
+        )
+
+    @staticmethod
+    def create_products(rows, category="Shoes"):
+        """Create a category and its products from (name, price, stock)
+        rows.
+        """
+
+        category = Category.objects.create(name=category)
+        return [
+            Product.objects.create(
+                name=name, price=price, category=category, stock=stock
+            )
+            for name, price, stock in rows
+        ]
+
+    @staticmethod
+    def bearer(user):
+        """Return the authorization header of an access token of the user"""
+        return "Bearer " + str(AccessToken.for_user(user))
+
+    def authenticate(self, user):
+        """Send the next requests of the client with a token of the user"""
+        self.client.credentials(HTTP_AUTHORIZATION=self.bearer(user))
+
+    @staticmethod
+    def add_cart_lines(user, lines, held=False):
+        """Add the (product, quantity) lines to the cart of the user, held
+        for an hour or with their holds released, and sync the counters of
+        their products.
+        """
+
+        lines = list(lines)
+        reserved_until = timezone.now() + datetime.timedelta(hours=1)
+        Cart.objects.bulk_create(
+            Cart(
+                user=user,
+                product=product,
+                quantity=quantity,
+                price=product.price * quantity,
+                reserved=quantity if held else 0,
+                reserved_until=reserved_until if held else None,
+            )
+            for product, quantity in lines
+        )
+        sync_counters([product.pk for product, _ in lines])
+
+    def order_cart(self, user):
+        """Place the order of the cart of the user and return the response"""
+
+        return self.client.post(
+            reverse("authentication:place-order-view")
+            + "?user_id="
+            + str(user.pk)
+        )
@@ -2,12 +2,51 @@
 
 This testing file is used to test the APIs of user. We have two tests one for
 user registeration and other for getting JWT Token with username and password.
+The cart and order tests make sure that the number of queries does not grow
+with the number of rows. The product tests check the cursor pagination and
+the order tests check the checkout of a cart. The catalog cache tests check
+that the cached products are invalidated when they change. The SQLite tests
+check the pragmas and the transaction mode of the connections.
 """
 
+# pylint: disable=no-member
+
+import json
+import tempfile
+from pathlib import Path
+from unittest import skipUnless
+from unittest.mock import patch
 from rest_framework import status
 from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from django.conf import settings
+from django.db import (
+    IntegrityError,
+    connection,
+    connections,
+    transaction,
+)
+from django.test import (
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from .models import User
+from .authentication import token_cache
+from .cache import catalog_cache
+from .models import (
+    Cart,
+    Category,
+    Order,
+    OrderItem,
+    Product,
+    User,
+)
+from .metrics import registry
+from .pagination import IdCursorPagination
+from .serializers import CreateTokneSerialzer
+from .testing import ShopFixtureMixin
+from .views import OrderDetailView
 
 
 class RegistrationTestCase(APITestCase):
@@ -49,3 +88,868 @@ class GetTokenTestCase(APITestCase):
         url = reverse('authentication:create-token')
         response = self.client.post(url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class CartViewsTestCase(APITestCase):
+    """TestCase for the cart lines and the queries of the cart views"""
+
+    def setUp(self):
+        """Setup for user, products and token creation"""
+
+        self.user = User.objects.create_user(
+            username="test4",
+            password="Password@123"
+        )
+        category = Category.objects.create(name="Shoes")
+        self.products = [
+            Product.objects.create(
+                name="Shoe " + str(index),
+                price=100,
+                category=category,
+                stock=10,
+            )
+            for index in range(5)
+        ]
+        token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + str(token))
+
+    def test_unique_cart_product(self):
+        """A product can be only once in the cart of a user"""
+
+        Cart.objects.create(user=self.user, product=self.products[0])
+        with self.assertRaises(IntegrityError):
+            Cart.objects.create(user=self.user, product=self.products[0])
+
+    def test_cart_view_queries(self):
+        """The cart view should cost the same number of queries for one line
+        and for many lines: the user of the token and the cart lines with
+        their products and categories.
+        """
+
+        url = reverse(
+            "authentication:cart-view", kwargs={"user_id": self.user.id}
+        )
+        Cart.objects.create(user=self.user, product=self.products[0])
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data), 1)
+
+        for product in self.products[1:]:
+            Cart.objects.create(user=self.user, product=product)
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 5)
+        self.assertEqual(response.data[0]["product"]["category"], "Shoes")
+
+    def test_cart_summary(self):
+        """The summary of the cart should be computed with one query"""
+
+        url = reverse(
+            "authentication:cart-summary-view",
+            kwargs={"user_id": self.user.id},
+        )
+        for product in self.products:
+            Cart.objects.create(
+                user=self.user, product=product, quantity=2, price=200
+            )
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(
+            response.data, {"count": 5, "quantity": 10, "total": 1000}
+        )
+
+
+class OrderDetailQueryCountTestCase(APITestCase):
+    """TestCase for the number of queries of the order detail view"""
+
+    def setUp(self):
+        """Setup for user, products and orders creation"""
+
+        self.user = User.objects.create_user(
+            username="test4",
+            password="Password@123"
+        )
+        category = Category.objects.create(name="Shoes")
+        for index in range(5):
+            product = Product.objects.create(
+                name="Shoe " + str(index),
+                price=100,
+                category=category,
+                stock=10,
+            )
+            order = Order.objects.create(user=self.user, price=100)
+            OrderItem.objects.create(
+                order=order, product=product, quantity=1, price=100
+            )
+
+    def test_order_detail_queries(self):
+        """The order items, their orders, users, products and categories
+        should be loaded with a single query.
+        """
+
+        url = reverse("authentication:order-detail-view")
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {"user_id": self.user.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["results"]
+        self.assertEqual(len(results), 5)
+        self.assertEqual(results[0]["order"]["user"]["name"], "test4")
+
+    def test_stream_order_details(self):
+        """All the order details should be streamed as a JSON array"""
+
+        url = reverse("authentication:order-detail-view")
+        with patch.object(OrderDetailView, "stream_chunk_size", 2):
+            response = self.client.get(
+                url, {"user_id": self.user.id, "stream": "1"}
+            )
+            content = b"".join(response.streaming_content)
+        items = json.loads(content)
+        self.assertEqual(len(items), 5)
+        self.assertEqual(items[0]["product"]["name"], "Shoe 0")
+
+    def test_stream_order_details_ndjson(self):
+        """All the order details should be streamed as JSON Lines"""
+
+        url = reverse("authentication:order-detail-view")
+        response = self.client.get(
+            url, {"user_id": self.user.id, "stream": "ndjson"}
+        )
+        lines = b"".join(response.streaming_content).splitlines()
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(lines[4])["product"]["name"], "Shoe 4")
+
+    def test_stream_order_details_disabled(self):
+        """A false stream flag should return the first page"""
+
+        url = reverse("authentication:order-detail-view")
+        for flag in ("0", "false", "no"):
+            response = self.client.get(
+                url, {"user_id": self.user.id, "stream": flag}
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(response.data["results"]), 5)
+
+    def test_order_history_queries(self):
+        """The orders of the user should be returned once with their items
+        nested, loaded with two queries after the user of the token.
+        """
+
+        order = Order.objects.first()
+        OrderItem.objects.create(
+            order=order, product=Product.objects.last(), quantity=2, price=200
+        )
+        token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + str(token))
+        url = reverse("authentication:order-history-view")
+        with self.assertNumQueries(3):
+            response = self.client.get(url, {"user_id": self.user.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        orders = response.data["results"]
+        self.assertEqual(len(orders), 5)
+        self.assertEqual(len(orders[0]["items"]), 2)
+        self.assertEqual(orders[0]["items"][1]["product"]["name"], "Shoe 4")
+
+
+class ProductPaginationTestCase(APITestCase):
+    """TestCase for the cursor pagination of the products"""
+
+    def setUp(self):
+        """Setup for superuser, products and token creation"""
+
+        self.user = User.objects.create_superuser(
+            username="admin",
+            password="Password@123"
+        )
+        category = Category.objects.create(name="Shoes")
+        Product.objects.bulk_create(
+            Product(name="Shoe " + str(index), category=category)
+            for index in range(5)
+        )
+        catalog_cache.clear()
+        token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + str(token))
+
+    def test_products_pages(self):
+        """The products should be returned page by page following the next
+        link until the last page.
+        """
+
+        url = reverse("authentication:products-view-list")
+        response = self.client.get(url, {"page_size": 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        names = [product["name"] for product in response.data["results"]]
+        while response.data["next"]:
+            response = self.client.get(response.data["next"])
+            names += [product["name"] for product in response.data["results"]]
+        self.assertEqual(names, ["Shoe " + str(index) for index in range(5)])
+
+    def test_max_page_size(self):
+        """The page size should not be greater than the maximum page size"""
+
+        url = reverse(
+            "authentication:category-products-view",
+            kwargs={"gategory_name": "Shoes"},
+        )
+        with patch.object(IdCursorPagination, "max_page_size", 3):
+            response = self.client.get(url, {"page_size": 10})
+        self.assertEqual(len(response.data["results"]), 3)
+
+
+class OrderPlaceTestCase(ShopFixtureMixin, APITestCase):
+    """TestCase for placing an order"""
+
+    def setUp(self):
+        """Setup for user and products creation"""
+
+        self.user = User.objects.create_user(
+            username="test4",
+            password="Password@123"
+        )
+        category = Category.objects.create(name="Shoes")
+        self.products = [
+            Product.objects.create(
+                name="Shoe " + str(index),
+                price=100,
+                category=category,
+                stock=10,
+            )
+            for index in range(3)
+        ]
+        self.url = reverse("authentication:place-order-view")
+
+    def add_to_cart(self, products, quantity=2, held=True):
+        """Add the products to the cart of the user, held or with expired
+        holds that were released.
+        """
+
+        self.add_cart_lines(
+            self.user, ((product, quantity) for product in products), held
+        )
+
+    def test_place_order(self):
+        """The order should be created with its items, the stock and sold
+        counters should be updated and the cart should be cleared.
+        """
+
+        self.add_to_cart(self.products)
+        response = self.client.post(
+            self.url + "?user_id=" + str(self.user.id)
+        )
+        self.assertEqual(response.data["message"], "Order placed")
+
+        order = Order.objects.get(user=self.user)
+        self.assertEqual(order.price, 600)
+        self.assertEqual(order.orderitem_set.count(), 3)
+        for product in Product.objects.all():
+            self.assertEqual(product.stock, 8)
+            self.assertEqual(product.sold, 2)
+        self.assertFalse(Cart.objects.filter(user=self.user).exists())
+
+    def test_place_order_queries(self):
+        """The number of queries should not depend on the size of the cart"""
+
+        url = self.url + "?user_id=" + str(self.user.id)
+        self.add_to_cart(self.products[:1])
+        with CaptureQueriesContext(connection) as one_line:
+            self.client.post(url)
+
+        self.add_to_cart(self.products)
+        with CaptureQueriesContext(connection) as three_lines:
+            self.client.post(url)
+        self.assertEqual(len(one_line), len(three_lines))
+
+    def test_not_enough_stock(self):
+        """Nothing should be changed if a product has not enough stock"""
+
+        self.add_to_cart(self.products[:2])
+        self.add_to_cart(self.products[2:], quantity=11, held=False)
+        response = self.client.post(
+            self.url + "?user_id=" + str(self.user.id)
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data["message"], "Not enough stock for Shoe 2"
+        )
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(Cart.objects.filter(user=self.user).count(), 3)
+        self.assertFalse(Product.objects.exclude(stock=10).exists())
+
+    def test_stock_changed_after_update(self):
+        """The product should be reported out of stock when its stock is
+        enough again by the time it is read after the failed UPDATE.
+        """
+
+        self.add_to_cart(self.products[:2])
+        self.add_to_cart(self.products[2:], quantity=11)
+        restocked = {product.pk: product for product in self.products}
+        for product in restocked.values():
+            product.stock = 20
+        with patch.object(Product.objects, "in_bulk", return_value=restocked):
+            response = self.client.post(
+                self.url + "?user_id=" + str(self.user.id)
+            )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data["message"], "Not enough stock for Shoe 2"
+        )
+        self.assertFalse(Order.objects.exists())
+
+
+class CatalogCacheTestCase(APITestCase):
+    """TestCase for the catalog cache"""
+
+    def setUp(self):
+        """Setup for superuser, product and token creation"""
+
+        self.user = User.objects.create_superuser(
+            username="admin",
+            password="Password@123"
+        )
+        self.category = Category.objects.create(name="Shoes")
+        self.product = Product.objects.create(
+            name="Shoe", price=100, category=self.category, stock=10
+        )
+        catalog_cache.clear()
+        token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + str(token))
+
+    def test_cached_product(self):
+        """The second request of a product should be served from the cache
+        and a change of the product should invalidate it.
+        """
+
+        url = reverse(
+            "authentication:product-view-detail",
+            kwargs={"pk": self.product.pk},
+        )
+        self.client.get(url)
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.data["stock"], 10)
+
+        self.product.stock = 5
+        self.product.save()
+        response = self.client.get(url)
+        self.assertEqual(response.data["stock"], 5)
+        self.assertEqual(catalog_cache.stats()["hits"], 1)
+        self.assertEqual(catalog_cache.stats()["misses"], 2)
+
+    def test_cached_product_after_order(self):
+        """An order should invalidate the cached products and pages once the
+        new stock is committed.
+        """
+
+        url = reverse(
+            "authentication:product-view-detail",
+            kwargs={"pk": self.product.pk},
+        )
+        page_url = reverse(
+            "authentication:category-products-view",
+            kwargs={"gategory_name": "Shoes"},
+        )
+        self.client.get(url)
+        self.client.get(page_url)
+        self.client.post(
+            reverse("authentication:add-to-cart"),
+            {"user": self.user.pk, "product": self.product.pk, "quantity": 3},
+            format="json",
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("authentication:place-order-view")
+                + "?user_id="
+                + str(self.user.pk)
+            )
+        self.assertEqual(response.data["message"], "Order placed")
+
+        response = self.client.get(url)
+        self.assertEqual(response.data["stock"], 7)
+        self.assertEqual(response.data["sold"], 3)
+        response = self.client.get(page_url)
+        self.assertEqual(response.data["results"][0]["stock"], 7)
+
+    def test_cached_category_products(self):
+        """The products of a category should be served from the cache until
+        the category is renamed.
+        """
+
+        url = reverse(
+            "authentication:category-products-view",
+            kwargs={"gategory_name": "Shoes"},
+        )
+        self.client.get(url)
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data["results"]), 1)
+
+        self.category.name = "Boots"
+        self.category.save()
+        response = self.client.get(url)
+        self.assertEqual(response.data["results"], [])
+
+    def test_page_built_before_invalidation(self):
+        """A page built before an invalidation should be cached under the
+        old version and not be served anymore.
+        """
+
+        version = catalog_cache.version("products")
+        catalog_cache.invalidate_scopes("products")
+        catalog_cache.set_page("products", version, "url", [])
+        self.assertIsNone(
+            catalog_cache.get_page(
+                "products", catalog_cache.version("products"), "url"
+            )
+        )
+
+    def test_dummy_cache(self):
+        """The product lists should be built on every request by a backend
+        that keeps no value.
+        """
+
+        caches = {
+            **settings.CACHES,
+            "catalog": {
+                "BACKEND": "django.core.cache.backends.dummy.DummyCache"
+            },
+        }
+        with override_settings(CACHES=caches):
+            for url in [
+                reverse("authentication:products-view-list"),
+                reverse(
+                    "authentication:category-products-view",
+                    kwargs={"gategory_name": "shoes"},
+                ),
+            ]:
+                for _ in range(2):
+                    response = self.client.get(url)
+                    self.assertEqual(
+                        response.status_code, status.HTTP_200_OK
+                    )
+                    self.assertEqual(len(response.data["results"]), 1)
+
+    def test_cache_stats(self):
+        """The stats of the cache should be returned to the superuser"""
+
+        url = reverse("authentication:catalog-cache-stats")
+        response = self.client.get(url)
+        self.assertEqual(
+            response.data, {"hits": 0, "misses": 0, "hit_ratio": 0}
+        )
+
+
+class AddToCartTestCase(APITestCase):
+    """TestCase for adding a product to the cart"""
+
+    def setUp(self):
+        """Setup for user, products and token creation"""
+
+        self.user = User.objects.create_user(
+            username="test4",
+            password="Password@123"
+        )
+        category = Category.objects.create(name="Shoes")
+        self.products = [
+            Product.objects.create(
+                name="Shoe " + str(index),
+                price=100,
+                category=category,
+                stock=10,
+            )
+            for index in range(2)
+        ]
+        self.url = reverse("authentication:add-to-cart")
+        token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + str(token))
+
+    def test_add_to_cart(self):
+        """Adding a product again should update its line of the cart"""
+
+        data = {"user": self.user.id, "product": self.products[0].id}
+        self.client.post(self.url, data, format="json")
+        data["quantity"] = 3
+        response = self.client.post(self.url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]["quantity"], 3)
+        self.assertEqual(response.data[0]["price"], 300)
+        self.assertEqual(Cart.objects.filter(user=self.user).count(), 1)
+
+    def test_add_to_cart_line_response(self):
+        """With response=line only the line and the summary of the cart
+        should be returned.
+        """
+
+        Cart.objects.create(
+            user=self.user, product=self.products[1], quantity=1, price=100
+        )
+        data = {"user": self.user.id, "product": self.products[0].id}
+        response = self.client.post(
+            self.url + "?response=line", data, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["line"]["product"]["name"], "Shoe 0")
+        self.assertEqual(
+            response.data["cart"], {"count": 2, "quantity": 2, "total": 200}
+        )
+
+    def test_other_user_cart(self):
+        """A product should not be added to the cart of another user"""
+
+        other = User.objects.create_user(
+            username="test5",
+            email="test5@example.com",
+            password="Password@123"
+        )
+        data = {"user": other.id, "product": self.products[0].id}
+        response = self.client.post(self.url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(Cart.objects.exists())
+
+    def test_not_enough_stock(self):
+        """A quantity greater than the stock should not be added"""
+
+        data = {
+            "user": self.user.id,
+            "product": self.products[0].id,
+            "quantity": 11,
+        }
+        response = self.client.post(self.url, data, format="json")
+        self.assertEqual(response.data["message"], "Available stock is 10")
+        self.assertFalse(Cart.objects.exists())
+
+
+class OwnProfilePermissionTestCase(APITestCase):
+    """TestCase for the profile of the user"""
+
+    def setUp(self):
+        """Setup for users and token creation"""
+
+        self.user = User.objects.create_user(
+            username="test4",
+            password="Password@123"
+        )
+        self.other = User.objects.create_user(
+            username="test5",
+            email="test5@example.com",
+            password="Password@123"
+        )
+        token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + str(token))
+
+    def test_own_profile(self):
+        """The profile should be returned with the user of the token only"""
+
+        url = reverse(
+            "authentication:user-detail", kwargs={"pk": self.user.pk}
+        )
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.data["username"], "test4")
+
+    def test_other_profile(self):
+        """The profile of another user should be forbidden"""
+
+        url = reverse(
+            "authentication:user-detail", kwargs={"pk": self.other.pk}
+        )
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+@override_settings(JWT_STATELESS_READS=True)
+class StatelessAuthenticationTestCase(APITestCase):
+    """TestCase for the stateless authentication of the read requests"""
+
+    def setUp(self):
+        """Setup for superuser and token creation"""
+
+        self.user = User.objects.create_superuser(
+            username="admin",
+            password="Password@123"
+        )
+        token_cache.clear()
+
+    def authenticate(self):
+        """Authenticate the client with a token created for the user"""
+
+        token = CreateTokneSerialzer.get_token(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + str(token))
+
+    def test_stateless_read(self):
+        """A read request should not query the user of the token"""
+
+        self.authenticate()
+        url = reverse("authentication:catalog-cache-stats")
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_inactive_user(self):
+        """A token created for an inactive user should be rejected"""
+
+        self.user.is_active = False
+        self.authenticate()
+        url = reverse("authentication:catalog-cache-stats")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_cached_token(self):
+        """The signature of a token should be verified only once"""
+
+        self.authenticate()
+        url = reverse("authentication:catalog-cache-stats")
+        verify = AccessToken.verify
+        with patch.object(
+            AccessToken, "verify", autospec=True, side_effect=verify
+        ) as verify:
+            self.client.get(url)
+            self.client.get(url)
+        self.assertEqual(verify.call_count, 1)
+
+
+@override_settings(API_METRICS_ENABLED=True)
+class ApiMetricsTestCase(APITestCase):
+    """TestCase for the metrics middleware"""
+
+    def setUp(self):
+        """Setup for superuser, cart and token creation"""
+
+        self.user = User.objects.create_superuser(
+            username="admin",
+            password="Password@123"
+        )
+        category = Category.objects.create(name="Shoes")
+        product = Product.objects.create(
+            name="Shoe", price=100, category=category, stock=10
+        )
+        Cart.objects.create(user=self.user, product=product)
+        registry.clear()
+        token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + str(token))
+
+    def test_server_timing(self):
+        """The response should carry the measures of the request"""
+
+        url = reverse(
+            "authentication:cart-view", kwargs={"user_id": self.user.id}
+        )
+        response = self.client.get(url)
+        self.assertIn('desc="2 queries"', response["Server-Timing"])
+        self.assertIn("serializer;dur=", response["Server-Timing"])
+
+    def test_metrics_report(self):
+        """The metrics should be reported by URL name"""
+
+        url = reverse(
+            "authentication:cart-view", kwargs={"user_id": self.user.id}
+        )
+        self.client.get(url)
+        self.client.get(url)
+        response = self.client.get(reverse("authentication:api-metrics"))
+        cart_view = response.data["authentication:cart-view"]
+        self.assertEqual(cart_view["count"], 2)
+        self.assertEqual(cart_view["queries"]["p95"], 2)
+        self.assertGreater(cart_view["serializer_time"]["max"], 0)
+
+
+@skipUnless(connection.vendor == "sqlite", "The database is not SQLite")
+class SQLiteProfileTestCase(TransactionTestCase):
+    """TestCase for the SQLite profile of the connections"""
+
+    def test_pragmas(self):
+        """The pragmas of the settings should be set on the connection"""
+
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA synchronous")
+            # 1 is NORMAL
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(
+                cursor.fetchone()[0],
+                int(settings.SQLITE_PRAGMAS["busy_timeout"]),
+            )
+
+    def test_journal_mode(self):
+        """The database file should keep the rollback journal in its header
+        unless the write-ahead log is asked for.
+        """
+
+        for journal_mode, header in [("", b"\x01\x01"), ("WAL", b"\x02\x02")]:
+            pragmas = {**settings.SQLITE_PRAGMAS, "journal_mode": journal_mode}
+            with tempfile.TemporaryDirectory() as directory, override_settings(
+                SQLITE_PRAGMAS=pragmas
+            ):
+                path = Path(directory) / "db.sqlite3"
+                wrapper = type(connections["default"])(
+                    {**connection.settings_dict, "NAME": str(path)}, "journal"
+                )
+                with wrapper.cursor() as cursor:
+                    cursor.execute("CREATE TABLE journal (id integer)")
+                wrapper.close()
+                # The bytes 18 and 19 are the read and write versions
+                self.assertEqual(path.read_bytes()[18:20], header)
+
+    def test_immediate_transaction(self):
+        """The transactions should take the write lock when they begin"""
+
+        with CaptureQueriesContext(connection) as queries:
+            with transaction.atomic():
+                Category.objects.create(name="Shoes")
+        self.assertEqual(queries.captured_queries[0]["sql"], "BEGIN IMMEDIATE")
+
+
+class ProductFilterTestCase(APITestCase):
+    """TestCase for the filters, the ordering and the facets of the
+    products.
+    """
+
+    def setUp(self):
+        """Setup for superuser, products and token creation"""
+
+        self.user = User.objects.create_superuser(
+            username="admin", password="Password@123"
+        )
+        self.shoes = Category.objects.create(name="Shoes")
+        self.hats = Category.objects.create(name="Hats")
+        for name, category, price, stock in [
+            ("Sneakers", self.shoes, 50, 3),
+            ("Boots", self.shoes, 80, 0),
+            ("Sandals", self.shoes, 20, 5),
+            ("Cap", self.hats, 20, 1),
+            ("Beret", self.hats, 35, 0),
+        ]:
+            Product.objects.create(
+                name=name, category=category, price=price, stock=stock
+            )
+        catalog_cache.clear()
+        token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + str(token))
+        self.url = reverse("authentication:products-view-list")
+
+    def names(self, response):
+        """Return the names of the products of the response"""
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [product["name"] for product in response.data["results"]]
+
+    def test_filters(self):
+        """The products should be filtered by price range, stock and
+        categories.
+        """
+
+        response = self.client.get(
+            self.url, {"min_price": 20, "max_price": 50, "in_stock": "true"}
+        )
+        self.assertEqual(self.names(response), ["Sneakers", "Sandals", "Cap"])
+        response = self.client.get(
+            self.url, {"category": str(self.hats.id), "max_price": 30}
+        )
+        self.assertEqual(self.names(response), ["Cap"])
+        response = self.client.get(
+            self.url, {"category": [self.shoes.id, self.hats.id]}
+        )
+        self.assertEqual(len(self.names(response)), 5)
+
+    def test_invalid_filters(self):
+        """The filters with invalid values should be refused"""
+
+        for params in [{"min_price": "cheap"}, {"category": "1,shoes"}]:
+            response = self.client.get(self.url, params)
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST
+            )
+
+    def test_ordering_pages(self):
+        """The products should be ordered by price then by id through all
+        the pages.
+        """
+
+        response = self.client.get(
+            self.url, {"ordering": "-price", "page_size": 2}
+        )
+        names = self.names(response)
+        while response.data["next"]:
+            response = self.client.get(response.data["next"])
+            names += self.names(response)
+        self.assertEqual(
+            names, ["Boots", "Sneakers", "Beret", "Cap", "Sandals"]
+        )
+
+    def test_category_facets(self):
+        """The facets should count the products of every category without
+        the category filter.
+        """
+
+        response = self.client.get(
+            self.url, {"category": self.hats.id, "in_stock": "1"}
+        )
+        self.assertEqual(self.names(response), ["Cap"])
+        self.assertEqual(
+            response.data["facets"]["categories"],
+            [
+                {"id": self.hats.id, "name": "Hats", "count": 1},
+                {"id": self.shoes.id, "name": "Shoes", "count": 2},
+            ],
+        )
+
+
+class CategorySlugTestCase(APITestCase):
+    """TestCase for the slugs of the categories and the category map"""
+
+    def setUp(self):
+        """Setup for superuser, category, product and token creation"""
+
+        self.user = User.objects.create_superuser(
+            username="admin", password="Password@123"
+        )
+        self.category = Category.objects.create(name="Running Shoes")
+        Product.objects.create(name="Sneakers", category=self.category)
+        catalog_cache.clear()
+        token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + str(token))
+
+    def names(self, category):
+        """Return the names of the products of the category"""
+
+        url = reverse(
+            "authentication:category-products-view",
+            kwargs={"gategory_name": category},
+        )
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [product["name"] for product in response.data["results"]]
+
+    def test_unique_slugs(self):
+        """The slugs should be made from the names and be unique"""
+
+        self.assertEqual(self.category.slug, "running-shoes")
+        other = Category.objects.create(name="Running shoes!")
+        self.assertEqual(other.slug, "running-shoes-2")
+
+    def test_lookup(self):
+        """The products should be found by the slug, the name or the id of
+        the category.
+        """
+
+        for key in ["running-shoes", "Running Shoes", str(self.category.id)]:
+            self.assertEqual(self.names(key), ["Sneakers"])
+        self.assertEqual(self.names("hats"), [])
+
+    def test_category_changes(self):
+        """The category map should follow the created and the renamed
+        categories, the slug of a category does not change.
+        """
+
+        self.assertEqual(self.names("hats"), [])
+        hats = Category.objects.create(name="Hats")
+        Product.objects.create(name="Cap", category=hats)
+        self.assertEqual(self.names("hats"), ["Cap"])
+
+        self.category.name = "Trainers"
+        self.category.save()
+        self.assertEqual(self.names("Trainers"), ["Sneakers"])
+        self.assertEqual(self.names("Running Shoes"), [])
+        self.assertEqual(self.names("running-shoes"), ["Sneakers"])
@@ -13,12 +13,27 @@ from rest_framework_simplejwt.views import (
     TokenRefreshView,
     TokenVerifyView,
 )
+from .async_views import (
+    AsyncCartSummaryView,
+    AsyncCartView,
+    AsyncCategoryProductView,
+    AsyncProductListView,
+    AsyncProductView,
+)
+from .report_views import (
+    ApiMetricsView,
+    CatalogCacheStatsView,
+    CategorySalesView,
+    JobStatsView,
+    ProductSalesView,
+)
 from .views import (
     AddToCartView,
     AllProductViewSet,
     AllUserViewSet,
     CreateTokenView,
     AllCategoryViewSet,
+    CartSummaryView,
     CartView,
     CategoryProductView,
     CategoryViewSet,
@@ -28,7 +43,9 @@ from .views import (
     UserViewSet,
     OrderPlaceView,
     OrderDetailView,
+    OrderHistoryView,
     CreateProductView,
+    ProductSearchView,
 )
 
 # pylint: disable=invalid-name
@@ -58,6 +75,9 @@ urlpatterns = [
     path("token/create/", CreateTokenView.as_view(), name="create-token"),
     path("token/refresh/", TokenRefreshView.as_view(), name="refresh-token"),
     path("token/verify/", TokenVerifyView.as_view(), name="verify-token"),
+    path(
+        "products/search", ProductSearchView.as_view(), name="product-search"
+    ),
     path(
         "products/<str:gategory_name>/",
         CategoryProductView.as_view(),
@@ -65,10 +85,61 @@ urlpatterns = [
     ),
     path("cart/add/", AddToCartView.as_view(), name="add-to-cart"),
     path("cart/view/<int:user_id>/", CartView.as_view(), name="cart-view"),
+    path(
+        "cart/summary/<int:user_id>/",
+        CartSummaryView.as_view(),
+        name="cart-summary-view",
+    ),
     path("cart/remove", RemoveFromCartView.as_view(), name="remove-from-cart"),
     path("order/place", OrderPlaceView.as_view(), name="place-order-view"),
     path("order/detail", OrderDetailView.as_view(), name="order-detail-view"),
+    path(
+        "order/history", OrderHistoryView.as_view(), name="order-history-view"
+    ),
     path("product/create", CreateProductView.as_view(), name="create-product"),
+    path("metrics/", ApiMetricsView.as_view(), name="api-metrics"),
+    path(
+        "catalog/cache/stats/",
+        CatalogCacheStatsView.as_view(),
+        name="catalog-cache-stats",
+    ),
+    path("jobs/stats/", JobStatsView.as_view(), name="job-stats"),
+    path(
+        "analytics/sales/products/",
+        ProductSalesView.as_view(),
+        name="product-sales",
+    ),
+    path(
+        "analytics/sales/categories/",
+        CategorySalesView.as_view(),
+        name="category-sales",
+    ),
+    # The async views of the read-heavy endpoints for the ASGI application
+    path(
+        "async/products/",
+        AsyncProductListView.as_view(),
+        name="async-products-view",
+    ),
+    path(
+        "async/products/<str:gategory_name>/",
+        AsyncCategoryProductView.as_view(),
+        name="async-category-products-view",
+    ),
+    path(
+        "async/product/<int:pk>/",
+        AsyncProductView.as_view(),
+        name="async-product-view",
+    ),
+    path(
+        "async/cart/view/<int:user_id>/",
+        AsyncCartView.as_view(),
+        name="async-cart-view",
+    ),
+    path(
+        "async/cart/summary/<int:user_id>/",
+        AsyncCartSummaryView.as_view(),
+        name="async-cart-summary-view",
+    ),
 ]
 
 urlpatterns += router.urls
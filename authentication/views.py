@@ -9,6 +9,9 @@ that Toekn.
 
 # pylint: disable=no-member,too-many-ancestors
 
+import itertools
+import json
+from functools import partial
 from rest_framework import generics, permissions, status, viewsets
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.mixins import (
@@ -19,9 +22,22 @@ from rest_framework.mixins import (
     UpdateModelMixin,
 )
 from rest_framework.response import Response
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from rest_framework_simplejwt.views import TokenViewBase
-from django.core.exceptions import ObjectDoesNotExist
+from django.db import DatabaseError, transaction
+from django.db.models import Case, Count, F, Prefetch, Q, When
+from django.http import StreamingHttpResponse
+from .authentication import CachedJWTAuthentication
+from .cache import catalog_cache
+from .categories import category_map
+from .filters import ProductFilterBackend, ProductOrderingFilter
+from .inventory import OutOfStockError, hold, release, reserve
+from .jobs import enqueue
+from .pagination import IdCursorPagination, SearchPagination
+from .routers import replica_reads
+from .search import ProductSearch, search_terms
+from .stripes import attach_stripe_totals, sell_from_stripes
 from .serializers import (
     UserRegisterSerializer,
     UserViewSerializer,
@@ -30,8 +46,16 @@ from .serializers import (
     CartSerializer,
     ProductViewSerializer,
     OrderDetailSerializer,
+    OrderHistorySerializer,
+)
+from .models import (
+    Category,
+    Product,
+    User,
+    Cart,
+    Order,
+    OrderItem,
 )
-from .models import Category, Product, User, Cart, Order, OrderItem
 
 
 class UserRegisterView(generics.GenericAPIView):
@@ -56,25 +80,84 @@ class UserRegisterView(generics.GenericAPIView):
         return Response(user_data, status=status.HTTP_201_CREATED)
 
 
+def join_chunks(strings, size):
+    """Join the strings of a streamed body size by size to send fewer and
+    bigger chunks.
+    """
+
+    chunk = []
+    for string in strings:
+        chunk.append(string)
+        if len(chunk) == size:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+def get_token_user_id(request):
+    """Return the user id claim of the token of the request
+
+    The id is read from the validated token so no query is needed. The id of
+    the authenticated user is returned when the request has no token.
+    """
+
+    if request.auth is not None:
+        return request.auth.get(jwt_settings.USER_ID_CLAIM)
+    return getattr(request.user, "pk", None)
+
+
+def get_request_user(request):
+    """Return the User of the token, loaded at most once per request
+
+    The authenticated user is returned as it is when it is already a User.
+    Otherwise the User is fetched with the id claim of the token and kept on
+    the request so the next calls do not fetch it again.
+    """
+
+    if isinstance(request.user, User):
+        return request.user
+    try:
+        return request.token_user
+    except AttributeError:
+        request.token_user = User.objects.get(pk=get_token_user_id(request))
+        return request.token_user
+
+
 class OwnProfilePermission(permissions.BasePermission):
     """Custom Permission Class for the UserViewSet class
 
-    This class is used to check if the user is related to his token. This class
-    is used in the UserViewSet class. This class is inherited from the
-    BasePermission to connect to the has_permission method.
+    This class is used to check if the user is related to his token. The user
+    id of the URL, the body or the query parameters is compared with the user
+    id claim of the token, so the check needs no query. This class is
+    inherited from the BasePermission to connect to the has_permission method.
     """
 
+    @staticmethod
+    def get_requested_user_id(request, view):
+        """Return the user id the request is about or None"""
+
+        for user_id in (
+            view.kwargs.get("user_id"),
+            view.kwargs.get("pk"),
+            request.data.get("user") if hasattr(request.data, "get") else None,
+            request.query_params.get("user_id"),
+        ):
+            if user_id not in (None, ""):
+                return user_id
+        return None
+
     def has_permission(self, request, view):
-        """Check if the user is related to the token"""
+        """Check if the user is related to the token
 
-        try:
-            user_id = view.kwargs["user_id"]
-            return request.user == User.objects.get(pk=user_id)
-        except KeyError:
-            try:
-                return request.user == User.objects.get(pk=view.kwargs["pk"])
-            except ObjectDoesNotExist:
-                return request.user == request.user.is_authenticated
+        A request without any user id is allowed, the view then rejects it
+        because it does not know which user it is about.
+        """
+
+        user_id = self.get_requested_user_id(request, view)
+        if user_id is None:
+            return True
+        return str(user_id) == str(get_token_user_id(request))
 
 
 class UserViewSet(
@@ -92,11 +175,15 @@ class UserViewSet(
 
     queryset = User.objects.all()
 
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated, OwnProfilePermission]
     serializer_class = UserViewSerializer
     lookup_field = "pk"
 
+    def get_object(self):
+        """The permission makes sure the user is the user of the token"""
+        return get_request_user(self.request)
+
     def destroy(self, request, *args, **kwargs):
         """Inactivate the user"""
         return Response(
@@ -125,7 +212,7 @@ class AllUserViewSet(viewsets.GenericViewSet, ListModelMixin):
     """
 
     queryset = User.objects.all()
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated, IsSuperUser]
     serializer_class = UserViewSerializer
 
@@ -143,7 +230,7 @@ class CategoryViewSet(
     are allowed to perform these actions.
     """
 
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated, IsSuperUser]
     queryset = Category.objects.all()
     serializer_class = CategoryViewSerializer
@@ -156,7 +243,9 @@ class CategoryViewSet(
             return super().destroy(request, *args, **kwargs)
 
         except RuntimeError:
-            product = Product.objects.filter(category__id=kwargs["pk"])
+            product = Product.objects.filter(
+                category__id=kwargs["pk"]
+            ).select_related("category")
             serializer = ProductViewSerializer(product, many=True)
             return Response(
                 {
@@ -178,11 +267,98 @@ class AllCategoryViewSet(
     """
 
     queryset = Category.objects.all()
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated, IsSuperUser]
     serializer_class = CategoryViewSerializer
 
 
+class ReplicaReadMixin:
+    """Replica Read Mixin
+
+    This mixin is used to serve the safe requests of a read-only view from
+    the replica database. The reads of the request, including the user of the
+    token, are sent to the replica by the database router. The other
+    requests of the view are served by the primary database.
+    """
+
+    # pylint: disable=too-few-public-methods
+
+    def dispatch(self, request, *args, **kwargs):
+        """Dispatch the safe requests inside a replica_reads block"""
+
+        if request.method not in permissions.SAFE_METHODS:
+            return super().dispatch(request, *args, **kwargs)
+        with replica_reads():
+            return super().dispatch(request, *args, **kwargs)
+
+
+class CachedListMixin:
+    """Cached List Mixin
+
+    This mixin is used to serve the pages of a product list from the catalog
+    cache. The pages are cached by the scope returned by get_cache_scope and
+    by the full URL of the request, so every page size, cursor and filter has
+    its own entry. The signals invalidate the scope when a product or a
+    category changes.
+    """
+
+    cache_scope = "products"
+
+    def get_cache_scope(self):
+        """Return the scope of the cached pages"""
+        return self.cache_scope
+
+    def list(self, request, *args, **kwargs):
+        """Return the cached page or build it and cache it"""
+
+        scope = self.get_cache_scope()
+        url = request.build_absolute_uri()
+        version = catalog_cache.version(scope)
+        data = catalog_cache.get_page(scope, version, url)
+        if data is not None:
+            return Response(data)
+
+        response = super().list(request, *args, **kwargs)
+        catalog_cache.set_page(scope, version, url, response.data)
+        return response
+
+
+class ProductFacetsMixin:
+    """Product Facets Mixin
+
+    This mixin is used to add the number of matching products of every
+    category to the pages of a product list. The counts are computed with a
+    single grouped query on the products filtered by all the query
+    parameters but the categories, so they show the other categories too.
+    """
+
+    filter_backends = [ProductFilterBackend, ProductOrderingFilter]
+    ordering = ["id"]
+
+    def list(self, request, *args, **kwargs):
+        """Add the facets to the page"""
+
+        response = super().list(request, *args, **kwargs)
+        response.data["facets"] = {"categories": self.get_category_facets()}
+        return response
+
+    def get_category_facets(self):
+        """Return the id, name and number of products of every category"""
+
+        queryset = ProductFilterBackend().facet_queryset(
+            self.request, self.get_queryset(), "category"
+        )
+        counts = (
+            queryset.order_by("category__name")
+            .values_list("category_id", "category__name")
+            .annotate(count=Count("id"))
+        )
+        return [
+            {"id": category_id, "name": name, "count": count}
+            for category_id, name, count in counts
+        ]
+
+
 class CreateProductView(generics.CreateAPIView):
     """Create Product View
 
@@ -191,9 +367,9 @@ class CreateProductView(generics.CreateAPIView):
     perform these actions.
     """
 
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated]
-    queryset = Product.objects.all()
+    queryset = Product.objects.select_related("category")
     serializer_class = ProductViewSerializer
 
 
@@ -210,65 +386,135 @@ class ProductViewSet(
     are allowed to perform these actions.
     """
 
-    queryset = Product.objects.all()
-    authentication_classes = [JWTAuthentication]
+    queryset = Product.objects.select_related("category")
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated, IsSuperUser]
     serializer_class = ProductViewSerializer
     lookup_field = "pk"
 
+    def retrieve(self, request, *args, **kwargs):
+        """Return the cached product or retrieve it and cache it"""
+
+        data = catalog_cache.get_product(kwargs["pk"])
+        if data is None:
+            data = super().retrieve(request, *args, **kwargs).data
+            catalog_cache.set_product(kwargs["pk"], data)
+        return Response(data)
+
 
 class AllProductViewSet(
-    viewsets.GenericViewSet, CreateModelMixin, ListModelMixin
+    ReplicaReadMixin,
+    CachedListMixin,
+    ProductFacetsMixin,
+    viewsets.GenericViewSet,
+    CreateModelMixin,
+    ListModelMixin,
 ):
     """All Product ViewSet
 
     This viewset is used to retrieve all the products with GET method. It is
-    also used to create a new product with POST method.
+    also used to create a new product with POST method. The products are
+    filtered, ordered and returned page by page with a cursor, with the
+    number of products of every category.
     """
 
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated, IsSuperUser]
+    pagination_class = IdCursorPagination
 
-    queryset = Product.objects.all()
+    queryset = Product.objects.select_related("category")
     serializer_class = ProductViewSerializer
 
 
-class CategoryProductView(generics.ListAPIView):
+class CategoryProductView(
+    ReplicaReadMixin, CachedListMixin, ProductFacetsMixin, generics.ListAPIView
+):
     """All Product ViewSet
 
     This viewset is used to retrieve all the products according to category.
+    The category is given by its slug, or by its name or id, and found in
+    the category map so the products are selected by their indexed
+    category_id alone. The products are filtered, ordered and returned page
+    by page with a cursor.
     """
 
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated, IsSuperUser]
     serializer_class = ProductViewSerializer
+    pagination_class = IdCursorPagination
+
+    def get_category_id(self):
+        """Return the id of the category of the URL or None"""
+        return category_map.get(self.kwargs["gategory_name"])
+
+    def get_cache_scope(self):
+        """The pages are cached by the id of the category"""
+        return "category:" + str(self.get_category_id())
 
     def get_queryset(self):
         """
-        This view should return a list of all the purchases for
-        the user as determined by the username portion of the URL.
+        This view should return a list of all the products of the category
+        of the URL, none when there is no such category.
         """
-        gategory_name = self.kwargs["gategory_name"]
-        return Product.objects.filter(category__name=gategory_name)
+        category_id = self.get_category_id()
+        if category_id is None:
+            return Product.objects.none()
+        return Product.objects.filter(
+            category_id=category_id
+        ).select_related("category")
+
+
+class ProductSearchView(
+    ReplicaReadMixin, CachedListMixin, generics.ListAPIView
+):
+    """Product Search View
+
+    This view is used to search the products by their name and description
+    with the q query parameter. The search runs on the full-text index of
+    the database, the products are ranked by relevance and returned page by
+    page with the limit and offset query parameters. The pages are cached
+    with the product lists.
+    """
+
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+    serializer_class = ProductViewSerializer
+    pagination_class = SearchPagination
+
+    def list(self, request, *args, **kwargs):
+        """Search the products if a query is provided"""
+
+        if not search_terms(request.query_params.get("q", "")):
+            return Response(
+                {"message": "Search query is required in query parameter q"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return super().list(request, *args, **kwargs)
+
+    def get_queryset(self):
+        """Return the ranked matches of the query"""
+        return ProductSearch(self.request.query_params["q"])
 
 
 class AddToCartView(generics.CreateAPIView):
     """Add To Cart View
 
-    This view is used to add a product to the cart. The product is added using
-    the GenericAPIView class. This method is also used to update the Cart The
-    serializer is used to validate the data. The product is added and the data
-    is returned.
+    This view is used to add a product to the cart. The quantity of the cart
+    line is held out of the available stock of the product, the stock check
+    and the hold are one conditional UPDATE of the stock counter. The line
+    is locked while it is updated and a concurrent creation of the same line
+    is retried, so concurrent requests can not create duplicate lines or
+    hold the stock twice. By default the whole cart is returned, with the query
+    parameter response=line only the changed line and the summary of the
+    cart are returned.
     """
 
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated, OwnProfilePermission]
     queryset = Product.objects.all()
     serializer_class = CartSerializer
     lookup_field = 'pk'
 
-    # pylint: disable=protected-access
-    # pylint: disable=bare-except
     def post(self, request, *args, **kwargs):
         """Add a product to the cart"""
 
@@ -276,56 +522,46 @@ class AddToCartView(generics.CreateAPIView):
         serializer.is_valid(raise_exception=True)
 
         # If the quantity is not provided then the quantity is set to 1
-        try:
-            quantity = serializer._validated_data["quantity"]
-        except KeyError:
-            quantity = 1
-
-        user = serializer._validated_data["user"]
-        product = serializer._validated_data["product"]
+        quantity = serializer.validated_data.get("quantity", 1)
+        user = serializer.validated_data["user"]
+        product = serializer.validated_data["product"]
 
-        # Check if the stock is available for the product
-        if product.stock < quantity:
+        try:
+            line = hold(user, product, quantity)
+        except OutOfStockError as error:
             return Response(
-                {"message": "Available stock is " + str(product.stock)},
+                {"message": "Available stock is " + str(error.available)},
                 status=status.HTTP_200_OK,
             )
+        # The fetched line does not cache its user and product, reuse the
+        # validated ones so serializing the line costs no query
+        line.user = user
+        line.product = product
 
-        # Check if the product is not in the cart then add it to the cart
-        if not Cart.objects.filter(user=user, product=product):
-            serializer._validated_data["price"] = product.price * quantity
-            serializer.save()
-            instence = Cart.objects.filter(user=user)
-            serializer = self.serializer_class(instence, many=True)
-
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-
-        try:
-            # If the product is in the cart then update the quantity and price
-            cart = Cart.objects.filter(user=user, product=product)
-            total_price = product.price * quantity
-            cart.update(quantity=quantity, price=total_price)
-
-            instence = Cart.objects.filter(user=user)
-            serializer = self.serializer_class(instence, many=True)
-
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-
-        except:
+        if request.query_params.get("response") == "line":
             return Response(
-                {"message": "Something went wrong"},
-                status=status.HTTP_400_BAD_REQUEST,
+                {
+                    "line": self.serializer_class(line).data,
+                    "cart": Cart.objects.filter(user=user).summary(),
+                },
+                status=status.HTTP_201_CREATED,
             )
 
+        cart = Cart.objects.filter(user=user).select_related(
+            "user", "product__category"
+        )
+        serializer = self.serializer_class(cart, many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
 
-class CartView(generics.ListAPIView):
+class CartView(ReplicaReadMixin, generics.ListAPIView):
     """Cart ViewSet
 
     This viewset is used to retrieve a cart. In this class JWT authentication
     is used to authenticate the user. User can view only his own cart.
     """
 
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated, OwnProfilePermission]
     serializer_class = CartSerializer
 
@@ -336,7 +572,30 @@ class CartView(generics.ListAPIView):
         """
 
         user_id = self.kwargs["user_id"]
-        return Cart.objects.filter(user__id=user_id)
+        return Cart.objects.filter(user__id=user_id).select_related(
+            "user", "product__category"
+        )
+
+
+class CartSummaryView(generics.GenericAPIView):
+    """Cart Summary View
+
+    This view is used to retrieve the number of lines, the quantity of the
+    products and the total price of a cart with a single aggregate query,
+    without serializing the lines. User can view only his own cart summary.
+    """
+
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated, OwnProfilePermission]
+
+    # pylint: disable=unused-argument
+    def get(self, request, user_id):
+        """Return the summary of the cart"""
+
+        return Response(
+            Cart.objects.filter(user__id=user_id).summary(),
+            status=status.HTTP_200_OK,
+        )
 
 
 class RemoveFromCartView(generics.ListAPIView):
@@ -346,7 +605,7 @@ class RemoveFromCartView(generics.ListAPIView):
     to validate the data. The product is removed and the data is returned.
     """
 
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated, OwnProfilePermission]
     serializer_class = CartSerializer
 
@@ -379,11 +638,13 @@ class RemoveFromCartView(generics.ListAPIView):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
             if (
-                Cart.objects.filter(
+                release(
+                    Cart.objects.filter(
                         user__id=int(user_id), product__id=int(product_id)
                     )
-                    .delete()[0] > 0
-                ):
+                )
+                > 0
+            ):
                 return Response(
                     {"message": "Product removed from cart"},
                     status=status.HTTP_200_OK,
@@ -392,7 +653,7 @@ class RemoveFromCartView(generics.ListAPIView):
                 {"message": "Product is not in Cart"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        if Cart.objects.filter(user__id=int(user_id)).delete()[0] > 0:
+        if release(Cart.objects.filter(user__id=int(user_id))) > 0:
             return Response(
                 {"message": "Cart cleared"}, status=status.HTTP_200_OK
             )
@@ -405,12 +666,22 @@ class RemoveFromCartView(generics.ListAPIView):
 class OrderPlaceView(generics.GenericAPIView):
     """Place Order View
 
-    This view is used to place an order. The order is placed using the
-    GenericAPIView class. The serializer is used to validate the data. The
-    order is placed and the success message is returned.
+    This view is used to place an order. The whole checkout runs in a single
+    transaction: the cart lines are locked and fetched once with the
+    categories of their products, the quantities that are not held by the
+    lines any longer are taken from the stock counters, the order items are
+    created with one bulk insert, the stock and sold counters of all the
+    products are updated with one conditional UPDATE, or a random stripe of
+    the striped products with another one (see stripes.py) and the cart is
+    cleared with one DELETE. So the number of queries does not depend on the
+    size of the cart and two concurrent checkouts can not sell more than the
+    available stock. The daily sales rollups, the confirmation email and the
+    stock alerts are updated and sent by background jobs, inserted with one
+    query after the commit, so the checkouts of a product lock no shared row
+    but its own, and the cached products and pages of their categories are
+    invalidated.
     """
 
-    # pylint: disable=bare-except
     def post(self, request):
         """Place an order"""
 
@@ -422,61 +693,187 @@ class OrderPlaceView(generics.GenericAPIView):
             )
 
         try:
-            user = User.objects.filter(pk=int(user_id))
-            if user.count() > 0:
-                cart = Cart.objects.filter(user=user[0])
-                if cart.count() > 0:
-                    order = Order.objects.create(user=user[0])
-                    total_price = 0
-                    for item in cart:
-                        product = Product.objects.filter(pk=item.product.id)[0]
-                        if product.stock < item.quantity:
-                            return Response(
-                                {
-                                    "message": "Not enough stock for "
-                                    + product.name
-                                },
-                                status=status.HTTP_400_BAD_REQUEST,
-                            )
-                    for item in cart:
-                        OrderItem.objects.create(
-                            order=order,
-                            product=item.product,
-                            quantity=item.quantity,
-                            price=item.price,
-                        )
-                        Product.objects.filter(pk=item.product.id).update(
-                            stock=product.stock - item.quantity
-                        )
-                        total_price += item.price
-                        item.delete()
-                    order.price = total_price
-                    order.save()
-                    return Response(
-                        {"message": "Order placed"}, status=status.HTTP_200_OK
-                    )
+            user = User.objects.filter(pk=int(user_id)).first()
+            if user is None:
                 return Response(
-                    {"message": "Cart is empty"}, status=status.HTTP_200_OK
+                    {"message": "Not a valid User"}, status=status.HTTP_200_OK
+                )
+            with transaction.atomic():
+                cart = list(
+                    Cart.objects.select_for_update(of=("self",))
+                    .filter(user=user)
+                    .annotate(
+                        category_id=F("product__category_id"),
+                        stripe_count=F("product__stripe_count"),
+                    )
                 )
+                if not cart:
+                    return Response(
+                        {"message": "Cart is empty"},
+                        status=status.HTTP_200_OK,
+                    )
+                self.place_order(user, cart)
+        except OutOfStockError as error:
             return Response(
-                {"message": "Not a valid User"}, status=status.HTTP_200_OK
+                {"message": "Not enough stock for " + error.product.name},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-        except:
+        except (ValueError, DatabaseError):
             return Response(
                 {"message": "Something went wrong"}, status=status.HTTP_200_OK
             )
+        return Response({"message": "Order placed"}, status=status.HTTP_200_OK)
 
+    @staticmethod
+    def place_order(user, cart):
+        """Create the order of the cart lines and update the stock
 
-class OrderDetailView(generics.ListAPIView):
+        This method must be called inside a transaction. It raises
+        OutOfStockError if a product has not enough stock, which rolls back
+        everything done by the transaction.
+        """
+
+        quantities = {}
+        changes = {}
+        for item in cart:
+            quantities[item.product_id] = (
+                quantities.get(item.product_id, 0) + item.quantity
+            )
+            # The held quantities are already out of the available stock,
+            # only the expired holds are taken again
+            changes[item.product_id] = (
+                changes.get(item.product_id, 0)
+                + item.quantity
+                - item.reserved
+            )
+        reserve(changes)
+
+        order = Order.objects.create(
+            user=user, price=sum(item.price for item in cart)
+        )
+        OrderItem.objects.bulk_create(
+            OrderItem(
+                order=order,
+                product_id=item.product_id,
+                category_id=item.category_id,
+                quantity=item.quantity,
+                price=item.price,
+            )
+            for item in cart
+        )
+
+        # The stock of a striped product is only checked by its counter, a
+        # stripe does not hold the whole stock of the product
+        stripes = {
+            item.product_id: item.stripe_count
+            for item in cart
+            if item.stripe_count
+        }
+        if stripes and sell_from_stripes(
+            {
+                product_id: (quantities[product_id], count)
+                for product_id, count in stripes.items()
+            }
+        ) != len(stripes):
+            raise DatabaseError("The stripes of the products changed")
+        unstriped = {
+            product_id: quantity
+            for product_id, quantity in quantities.items()
+            if product_id not in stripes
+        }
+
+        # The stock condition is checked again by the UPDATE itself so the
+        # order can never oversell, even when the counters are out of step.
+        in_stock = Q()
+        stock = []
+        sold = []
+        for product_id, quantity in unstriped.items():
+            in_stock |= Q(pk=product_id, stock__gte=quantity)
+            stock.append(When(pk=product_id, then=F("stock") - quantity))
+            sold.append(When(pk=product_id, then=F("sold") + quantity))
+        if unstriped:
+            updated = Product.objects.filter(in_stock).update(
+                stock=Case(*stock, default=F("stock")),
+                sold=Case(*sold, default=F("sold")),
+            )
+            if updated != len(unstriped):
+                product = OrderPlaceView.out_of_stock(unstriped)
+                raise OutOfStockError(product, product.stock)
+
+        Cart.objects.filter(pk__in=[item.pk for item in cart]).delete()
+        enqueue(
+            ("record_order_sales", {"order_id": order.pk}),
+            ("send_order_confirmation", {"order_id": order.pk}),
+            ("check_stock_alerts", {"product_ids": list(quantities)}),
+        )
+        # The UPDATE of the stock sends no signal, the cached products and
+        # pages are invalidated once the new stock is committed
+        transaction.on_commit(
+            partial(
+                catalog_cache.invalidate_catalog,
+                list(quantities),
+                {item.category_id for item in cart},
+            )
+        )
+        return order
+
+
+    @staticmethod
+    def out_of_stock(quantities):
+        """Return the product without enough stock for its quantity after
+        the UPDATE of the stock failed.
+
+        quantities is a dict of the quantities by product id. When the stock
+        changed since the UPDATE and every product has enough stock again,
+        the product with the least stock to spare is returned.
+        """
+
+        products = Product.objects.in_bulk(quantities).values()
+        product = next(
+            (
+                product
+                for product in products
+                if product.stock < quantities[product.id]
+            ),
+            None,
+        )
+        if product is None:
+            product = min(
+                products,
+                key=lambda product: product.stock - quantities[product.id],
+            )
+        return product
+
+
+class OrderDetailView(ReplicaReadMixin, generics.ListAPIView):
     """Order Detail View
 
     This view is used to retrieve the order details. The order details are
     retrieved using the GenericAPIView class. The serializer is used to
     validate the data. The order details are retrieved and the data is
-    returned.
+    returned page by page with a cursor. With the query parameter stream=1
+    or stream=true the whole order history is streamed as a JSON array
+    instead, or as JSON Lines with stream=ndjson, any other value returns
+    the pages. The rows are fetched and serialized chunk by chunk so the
+    memory does not grow with the size of the history.
     """
 
     serializer_class = OrderDetailSerializer
+    pagination_class = IdCursorPagination
+    stream_chunk_size = 1000
+
+    def list(self, request, *args, **kwargs):
+        """Retrieve the order details if the user id is provided"""
+
+        if not request.query_params.get("user_id"):
+            return Response(
+                {"message": "User id is required in query parameter"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        stream = request.query_params.get("stream", "").lower()
+        if stream in ("1", "true", "ndjson"):
+            return self.stream(ndjson=stream == "ndjson")
+        return super().list(request, *args, **kwargs)
 
     def get_queryset(self):
         """
@@ -484,12 +881,92 @@ class OrderDetailView(generics.ListAPIView):
         the user as determined by the user_id portion of the URL.
         """
         user_id = self.request.query_params.get("user_id")
-        if not user_id:
+        return OrderItem.objects.filter(
+            order__user__id=int(user_id)
+        ).select_related("order__user", "product__category")
+
+    def stream(self, ndjson):
+        """Return a streaming response of all the order details"""
+
+        serializer = self.get_serializer()
+        queryset = self.get_queryset()
+        # The rows are fetched after the view returns, the database of the
+        # request is chosen now
+        items = (
+            queryset.using(queryset.db)
+            .order_by("id")
+            .iterator(chunk_size=self.stream_chunk_size)
+        )
+
+        def rows():
+            # The stripes of the striped products are loaded chunk by chunk
+            while True:
+                chunk = list(itertools.islice(items, self.stream_chunk_size))
+                if not chunk:
+                    return
+                attach_stripe_totals([item.product for item in chunk])
+                yield from chunk
+
+        def body():
+            if not ndjson:
+                yield "["
+            for index, item in enumerate(rows()):
+                data = json.dumps(
+                    serializer.to_representation(item), cls=JSONEncoder
+                )
+                if ndjson:
+                    yield data + "\n"
+                else:
+                    yield ("," if index else "") + data
+            if not ndjson:
+                yield "]"
+
+        return StreamingHttpResponse(
+            join_chunks(body(), self.stream_chunk_size),
+            content_type=(
+                "application/x-ndjson" if ndjson else "application/json"
+            ),
+        )
+
+
+class OrderHistoryView(ReplicaReadMixin, generics.ListAPIView):
+    """Order History View
+
+    This view is used to retrieve the orders of a user with their items
+    nested. Every order is returned once, the orders of a page and all their
+    items, products and categories are loaded with two queries. User can
+    view only his own order history.
+    """
+
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated, OwnProfilePermission]
+    serializer_class = OrderHistorySerializer
+    pagination_class = IdCursorPagination
+
+    def list(self, request, *args, **kwargs):
+        """Retrieve the order history if the user id is provided"""
+
+        if not request.query_params.get("user_id"):
             return Response(
                 {"message": "User id is required in query parameter"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        return OrderItem.objects.filter(order__user__id=int(user_id))
+        return super().list(request, *args, **kwargs)
+
+    def get_queryset(self):
+        """
+        This view should return a list of all the orders placed by the user
+        as determined by the user_id query parameter.
+        """
+        user_id = self.request.query_params.get("user_id")
+        return Order.objects.filter(user__id=int(user_id)).prefetch_related(
+            Prefetch(
+                "orderitem_set",
+                queryset=OrderItem.objects.select_related(
+                    "product__category"
+                ).order_by("id"),
+            )
+        )
 
 
 class CreateTokenView(TokenViewBase):
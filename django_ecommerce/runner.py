@@ -0,0 +1,34 @@
+"""Test runner
+
+This runner is the test runner of Django with a replica database always
+configured, so the routing of the reads to the replica is tested even when
+no replica is given in the environment. The replica added by the runner is
+a second connection to the test database of the primary (a test mirror),
+two separate SQLite files would not see the rows written by the tests.
+
+    TEST_RUNNER = 'django_ecommerce.runner.ReplicaTestRunner'
+"""
+
+import copy
+from django.conf import settings
+from django.db import connections
+from django.test.runner import DiscoverRunner
+
+REPLICA_DATABASE = 'replica'
+
+
+class ReplicaTestRunner(DiscoverRunner):
+    """Test runner that adds a replica mirroring the primary database"""
+
+    def setup_test_environment(self, **kwargs):
+        """Add the replica before the test databases are created"""
+
+        super().setup_test_environment(**kwargs)
+        # The connections read the settings once and complete them with the
+        # defaults, the replica is a copy of the completed primary settings
+        databases = connections.settings
+        if REPLICA_DATABASE not in databases:
+            replica = copy.deepcopy(databases['default'])
+            replica['TEST'] = {**replica['TEST'], 'MIRROR': 'default'}
+            databases[REPLICA_DATABASE] = replica
+            settings.DATABASES[REPLICA_DATABASE] = replica
@@ -57,6 +57,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'authentication.middleware.ApiMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -66,6 +67,12 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# The metrics middleware measures the queries, the serializers and the
+# latency of every request, it is removed from the chain when it is disabled.
+
+API_METRICS_ENABLED = os.getenv('API_METRICS') == 'TRUE'
+API_METRICS_MAX_SAMPLES = int(os.getenv('API_METRICS_MAX_SAMPLES', '1000'))
+
 ROOT_URLCONF = 'django_ecommerce.urls'
 
 TEMPLATES = [
@@ -90,13 +97,116 @@ WSGI_APPLICATION = 'django_ecommerce.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.0/ref/settings/#databases
 
+# The database is configured by the environment. DB_ENGINE is SQLite by
+# default or django.db.backends.postgresql, which needs psycopg2
+# (pip install psycopg2-binary). Django 4.0 has no connection pool: the
+# connections are reused for DB_CONN_MAX_AGE seconds by the requests of a
+# thread, and a pool like PgBouncer in transaction mode can be put in front
+# of PostgreSQL with DB_DISABLE_SERVER_SIDE_CURSORS=TRUE. A read replica is
+# added by DB_REPLICA_NAME or DB_REPLICA_HOST, the other DB_REPLICA_
+# variables default to the DB_ ones. The tests add a replica that mirrors
+# the test database when none is configured.
+
+DB_ENGINE = os.getenv('DB_ENGINE', 'django_ecommerce.sqlite3')
+
+
+def database_settings(prefix):
+    """Return the settings of a database from the environment variables
+    starting with prefix or else with DB_.
+    """
+
+    def env(key, default=''):
+        return os.getenv(prefix + key, os.getenv('DB_' + key, default))
+
+    config = {
+        'ENGINE': DB_ENGINE,
+        # Seconds a connection is reused by the requests of a thread, 0
+        # closes it at the end of every request.
+        'CONN_MAX_AGE': int(env('CONN_MAX_AGE', '60')),
+    }
+    if DB_ENGINE.endswith('sqlite3'):
+        config['NAME'] = env('NAME', BASE_DIR / 'db.sqlite3')
+        config['OPTIONS'] = {
+            # Seconds a query waits for the lock of another connection.
+            'timeout': float(os.getenv('SQLITE_TIMEOUT', '20')),
+            # The transactions take the write lock when they begin.
+            'transaction_mode': os.getenv(
+                'SQLITE_TRANSACTION_MODE', 'IMMEDIATE'
+            ),
+        }
+    else:
+        config.update({
+            'NAME': env('NAME', 'django_ecommerce'),
+            'USER': env('USER'),
+            'PASSWORD': env('PASSWORD'),
+            'HOST': env('HOST'),
+            'PORT': env('PORT'),
+            'DISABLE_SERVER_SIDE_CURSORS': (
+                env('DISABLE_SERVER_SIDE_CURSORS') == 'TRUE'
+            ),
+            'OPTIONS': {'connect_timeout': int(env('CONNECT_TIMEOUT', '10'))},
+        })
+    return config
+
+
 DATABASES = {
+    'default': database_settings('DB_'),
+}
+
+if os.getenv('DB_REPLICA_NAME') or os.getenv('DB_REPLICA_HOST'):
+    DATABASES['replica'] = database_settings('DB_REPLICA_')
+    # The tests read the replica from the test database of the primary
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+# The tests always run with a replica so the routing is tested, the runner
+# adds one mirroring the primary when none is configured
+TEST_RUNNER = 'django_ecommerce.runner.ReplicaTestRunner'
+
+# The read-only endpoints read from the replica when there is one
+DATABASE_ROUTERS = ['authentication.routers.ReplicaRouter']
+
+# SQLite profile
+# https://www.sqlite.org/pragma.html
+# The pragmas are executed on every new SQLite connection. The write-ahead
+# log (SQLITE_JOURNAL_MODE=WAL) lets the readers run while a transaction
+# writes, it is stored in the header of the database file for good and
+# leaves -wal and -shm files next to it, so it is only enabled on demand.
+# synchronous=NORMAL only syncs the log at the checkpoints, busy_timeout
+# (milliseconds) makes the writers wait for the lock instead of failing with
+# "database is locked" and the database is read through a memory map and a
+# larger page cache (a negative cache_size is in KiB). An empty value keeps
+# the default of SQLite.
+
+SQLITE_PRAGMAS = {
+    'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', ''),
+    'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'busy_timeout': os.getenv('SQLITE_BUSY_TIMEOUT', '20000'),
+    'mmap_size': os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)),
+    'cache_size': os.getenv('SQLITE_CACHE_SIZE', '-64000'),
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+# The product catalog is cached in its own cache, a local-memory cache unless
+# another backend is given in the environment.
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'catalog': {
+        'BACKEND': os.getenv(
+            'CATALOG_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.getenv('CATALOG_CACHE_LOCATION', 'catalog'),
+        'TIMEOUT': int(os.getenv('CATALOG_CACHE_TIMEOUT', '300')),
+    },
 }
 
+CATALOG_CACHE_ALIAS = 'catalog'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
@@ -149,6 +259,12 @@ REST_FRAMEWORK = {
     ),
 }
 
+# Pagination
+# The default and the largest page size of the cursor paginated endpoints.
+
+PAGINATION_PAGE_SIZE = int(os.getenv('PAGINATION_PAGE_SIZE', '20'))
+PAGINATION_MAX_PAGE_SIZE = int(os.getenv('PAGINATION_MAX_PAGE_SIZE', '100'))
+
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),
@@ -159,3 +275,45 @@ SIMPLE_JWT = {
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
 }
+
+# The read requests trust the claims of the token instead of loading the user
+# from the database, and the validated tokens are cached in every process.
+
+JWT_STATELESS_READS = os.getenv('JWT_STATELESS_READS') == 'TRUE'
+JWT_TOKEN_CACHE_SIZE = int(os.getenv('JWT_TOKEN_CACHE_SIZE', '1024'))
+
+# Background jobs
+# The jobs enqueued by the views are run by the run_jobs worker. A failed job
+# is retried after JOBS_RETRY_DELAY seconds, doubled on every attempt up to
+# JOBS_RETRY_MAX_DELAY, and given up after JOBS_MAX_ATTEMPTS attempts. A
+# running job is claimed again after JOBS_TIMEOUT seconds, when its worker
+# has died. The stats of a worker are computed on the wait times and the
+# durations of its latest JOB_METRICS_MAX_SAMPLES jobs.
+
+JOBS_MAX_ATTEMPTS = int(os.getenv('JOBS_MAX_ATTEMPTS', '5'))
+JOBS_RETRY_DELAY = int(os.getenv('JOBS_RETRY_DELAY', '10'))
+JOBS_RETRY_MAX_DELAY = int(os.getenv('JOBS_RETRY_MAX_DELAY', '3600'))
+JOBS_TIMEOUT = int(os.getenv('JOBS_TIMEOUT', '300'))
+JOB_METRICS_MAX_SAMPLES = int(os.getenv('JOB_METRICS_MAX_SAMPLES', '1000'))
+
+# The stock alerts are sent when the stock of a sold product falls to this
+# number of units or below.
+
+STOCK_ALERT_THRESHOLD = int(os.getenv('STOCK_ALERT_THRESHOLD', '10'))
+
+# Email
+# https://docs.djangoproject.com/en/4.0/topics/email/
+# The emails are written to the console unless another backend is given in
+# the environment.
+
+EMAIL_BACKEND = os.getenv(
+    'EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend'
+)
+DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'webmaster@localhost')
+
+# Stock holds
+# The quantity of a cart line is held out of the available stock for
+# STOCK_HOLD_TTL seconds after it is added. The expired holds are released by
+# the release_stock_holds command.
+
+STOCK_HOLD_TTL = int(os.getenv('STOCK_HOLD_TTL', '900'))
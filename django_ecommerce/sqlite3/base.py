@@ -0,0 +1,48 @@
+"""SQLite database backend
+
+This backend is the SQLite backend of Django with the transaction_mode
+option of the newer Django versions. SQLite begins a transaction without any
+lock, so a transaction that reads before it writes, like the upsert of the
+cart or the checkout, fails with "database is locked" when another
+connection has written in between, whatever the busy timeout. With the
+transaction_mode IMMEDIATE the transactions take the write lock when they
+begin and wait for the other writers with the busy timeout instead.
+
+    'OPTIONS': {'transaction_mode': 'IMMEDIATE'}
+"""
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ("DEFERRED", "EXCLUSIVE", "IMMEDIATE")
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite database wrapper with a configurable transaction mode"""
+
+    transaction_mode = None
+
+    def get_connection_params(self):
+        """Remove the transaction mode from the options of sqlite3.connect"""
+
+        kwargs = super().get_connection_params()
+        transaction_mode = kwargs.pop("transaction_mode", None)
+        if transaction_mode and transaction_mode.upper() not in (
+            TRANSACTION_MODES
+        ):
+            raise ImproperlyConfigured(
+                "settings.DATABASES is improperly configured. The "
+                "transaction_mode must be one of " + ", ".join(
+                    TRANSACTION_MODES
+                )
+            )
+        self.transaction_mode = transaction_mode
+        return kwargs
+
+    def _start_transaction_under_autocommit(self):
+        """Begin the transaction in the transaction mode"""
+
+        if self.transaction_mode:
+            self.cursor().execute("BEGIN " + self.transaction_mode.upper())
+        else:
+            super()._start_transaction_under_autocommit()